@@ -17,7 +17,7 @@ So far only supports .zip
 import hashlib
 import inspect
 import itertools
-import multiprocessing
+import mmap
 import os
 import shutil
 import zipfile
@@ -25,7 +25,89 @@ from operator import attrgetter
 from typing import IO, Iterator
 
 import charset_normalizer
-from crossgui.widgets import ProgressBar
+from crossgui.widgets import ProgressBar, ProgressRenderer, SharedValue
+
+
+class PreadFile():
+    def __init__(self, file: IO, pos: int, close, writing):
+        '''
+        Lock-free replacement for zipfile._SharedFile
+
+        Each reader keeps its own position and reads with os.pread,
+        so the archive file position is never moved and threads
+        reading different members don't wait for each other
+
+        Args:
+            file (IO): Archive file object, must have a fileno
+            pos (int): Initial position, member header offset
+            close (Callable): Called with file when reader is closed
+            writing (Callable): Returns True if there is an open
+                writing handle on the archive
+        '''
+        self._file = file
+        self._fd = file.fileno()
+        self._pos = pos
+        self._close = close
+        self._writing = writing
+
+    @staticmethod
+    def is_supported(file: IO) -> bool:
+        '''
+        Check if file can be read with os.pread
+
+        Args:
+            file (IO): Archive file object
+
+        Returns:
+            bool: os.pread is available and file has a descriptor
+        '''
+        if not hasattr(os, "pread"):
+            return False
+        try:
+            file.fileno()
+        except (AttributeError, OSError):
+            return False
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if self._writing():
+            raise ValueError(
+                "Can't reposition in the ZIP file while "
+                "there is an open writing handle on it. "
+                "Close the writing handle before trying to read."
+            )
+        if whence == os.SEEK_SET:
+            self._pos = offset
+        elif whence == os.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = os.fstat(self._fd).st_size + offset
+        return self._pos
+
+    def read(self, n: int = -1) -> bytes:
+        if self._writing():
+            raise ValueError(
+                "Can't read from the ZIP file while there "
+                "is an open writing handle on it. "
+                "Close the writing handle before trying to read."
+            )
+        if n is None or n < 0:
+            n = max(os.fstat(self._fd).st_size - self._pos, 0)
+        data = os.pread(self._fd, n, self._pos)
+        self._pos += len(data)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            file = self._file
+            self._file = None
+            self._close(file)
 
 
 class ArchiveFile():
@@ -46,12 +128,21 @@ class ArchiveFile():
         self.progressbar = progressbar
 
         if progressbar:
-            self.prefix = multiprocessing.Array("c", 272)
-            self.prefix.value = b""
-            self.counter = multiprocessing.Value("i", 0)
-            self.unit = multiprocessing.Array("c", 6)
-            self.unit.value = b"files"
-            self.finished = multiprocessing.Value("b", False)
+            self.prefix = SharedValue(b"")
+            self.counter = SharedValue(0)
+            self.unit = SharedValue(b"files")
+            self.finished = SharedValue(False)
+            self.total = SharedValue(0)
+            #  One rendering thread for all operations
+            #  of the archive, it's restarted by each
+            self.renderer = ProgressRenderer(
+                ProgressBar(40),
+                self.prefix,
+                self.counter,
+                self.unit,
+                self.finished,
+                self.total
+            )
             self._create_progressbar(0)
 
         self.useBarPrefix = useBarPrefix
@@ -101,8 +192,8 @@ class ArchiveFile():
     def _create_progressbar(self, depth: int = 1):
         '''
         Create progress bar
-        Because we cannot restart a terminated process.
-        We need to instantiate a new.
+        Renderer is reused, so only the owner is
+        recorded for the new operation.
 
         During creation, name of the owner is recorded.
         This is an additional protection against updating and
@@ -121,10 +212,6 @@ class ArchiveFile():
                 to the owner's function. Defaults to 1.
         '''
         self._progressbarOwner = (self._get_caller_name(2), depth)
-        self.renderingProcess = multiprocessing.Process(
-            target=ProgressBar(40).start_rendering_mp,
-            args=(self.prefix, self.counter, self.unit, self.finished)
-        )
 
     def _check_owner_permission(self) -> bool:
         '''
@@ -164,18 +251,22 @@ class ArchiveFile():
         '''
         Start current progress bar
         '''
-        self.renderingProcess.start()
+        self.renderer.start()
 
-    def _update_progressbar(self):
+    def _update_progressbar(self, increment: int = 1):
         '''
         Increment progressbar counter if needed
+
+        Args:
+            increment (int, optional): Completed task units,
+                files or bytes. Defaults to 1.
         '''
-        if not self._check_owner_permission():
+        if not self.progressbar or not self._check_owner_permission():
             return
 
-        if self.progressbar and self.counter.value != -1:
+        if self.counter.value != -1:
             with self.counter.get_lock():
-                self.counter.value += 1
+                self.counter.value += increment
 
     def _reset_progressbar(self):
         '''
@@ -185,18 +276,19 @@ class ArchiveFile():
         self.counter.value = 0
         self.unit.value = b"files"
         self.finished.value = False
+        self.total.value = 0
 
     def _finish_progressbar(self):
         '''
         Finish progressbar
         '''
-        if not self._check_owner_permission():
+        if not self.progressbar or not self._check_owner_permission():
             return
 
-        if self.progressbar and self.renderingProcess.is_alive():
+        if self.renderer.is_alive():
             with self.finished.get_lock():
                 self.finished.value = True
-            self.renderingProcess.join()
+            self.renderer.join()
             self._reset_progressbar()
 
     def is_ignored(self, path: str) -> bool:
@@ -304,6 +396,18 @@ class ArchiveFile():
 
 
 class ZipFile(zipfile.ZipFile, ArchiveFile):
+    #  Batched members are written when the buffer reaches this size
+    batchSize = 16 * 1024 * 1024
+    #  Chunk size for copying member data between archives
+    #  and to files, when extraction progress is counted in bytes
+    copyBufferSize = 1024 * 1024
+    #  Sidecar index layout: header, charset, records, names blob
+    indexMagic = b"ZIPIDX01"
+    indexHeader = "<8sQqQQH"
+    indexRecord = "<QQQQIIIHHHHHHHHBBBB"
+    #  Member with hashes of other members, algorithm is appended
+    manifestPrefix = "__manifest__."
+
     def __init__(
         self,
         file: str | IO,
@@ -318,7 +422,10 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         overwriteDuplicates: bool = False,
         symlinksToFiles: bool = False,
         progressbar: bool = False,
-        useBarPrefix: bool = True
+        useBarPrefix: bool = True,
+        batchThreshold: int = 0,
+        useIndex: bool = False,
+        hashAlgorithm: str | None = None
     ):
         '''
         Better ZipFile with proper names and symlinks encoding & progressbar
@@ -358,9 +465,21 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             useBarPrefix (bool, optional): Show progress bar prefix, disable
                 this option if your program itself prints events to the terminal.
                 Defaults to True.
-
-        If you use progressbar option on Windows - run your code in the
-        "if __name__ == '__main__'" statement
+            batchThreshold (int, optional): Files smaller than this size in
+                bytes are compressed in memory and appended in batches with
+                one sequential write, without seeking back to patch headers.
+                0 disables batching. Defaults to 0.
+            useIndex (bool, optional): Load the member list from sidecar
+                index "file.idx" if it matches the archive size, mtime and
+                central directory offset, otherwise parse the central directory
+                and write the index. Index is also rewritten after the archive
+                is modified. Defaults to False.
+            hashAlgorithm (str | None, optional): hashlib algorithm, such as
+                "sha256" or "blake2b", to hash members with while they are
+                written. Hashes are stored in the "__manifest__.algorithm"
+                member on close and available through get_hash(). If the
+                archive already has a manifest, its algorithm is used.
+                Defaults to None.
         '''
         ArchiveFile.__init__(
             self,
@@ -370,6 +489,20 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             useBarPrefix=useBarPrefix
         )
 
+        #  Local headers and data of small members not yet written
+        self.batchThreshold = batchThreshold
+        self._batch = bytearray()
+
+        self.useIndex = useIndex
+
+        if hashAlgorithm is not None:
+            self.check_algorithm(hashAlgorithm)
+        self.hashAlgorithm = hashAlgorithm
+        self.hashes = {}
+        self._hashesModified = False
+        #  Found while reading central directory or index
+        self._manifestName = None
+
         super().__init__(
             file=file,
             mode=mode,
@@ -385,6 +518,9 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         self.overwriteDuplicates = overwriteDuplicates
         self.symlinksToFiles = symlinksToFiles
 
+        if self._manifestName is not None:
+            self._load_manifest(self._manifestName[len(self.manifestPrefix):])
+
     def __exit__(self, type, value, traceback):
         self.close()
 
@@ -403,6 +539,239 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         os.remove(self.filename)
         self._finish_progressbar()
 
+    def close(self):
+        '''
+        Write pending batch, then the ending records
+        '''
+        if self.fp is None:
+            return
+
+        if self._hashesModified and self.mode in ("w", "x", "a"):
+            self._write_manifest()
+
+        modified = self._didModify and self.mode in ("w", "x", "a")
+        self._flush_batch()
+        super().close()
+
+        if self.useIndex and modified:
+            self._write_index()
+
+    @staticmethod
+    def check_algorithm(algorithm: str):
+        '''
+        Check that hashlib algorithm can be used for manifest
+
+        Args:
+            algorithm (str): Algorithm name
+
+        Raises:
+            ValueError: Algorithm is unknown or its digest
+                length is variable, like of shake_128
+        '''
+        if hashlib.new(algorithm).digest_size == 0:
+            raise ValueError(
+                f"Hash algorithm \"{algorithm}\" has variable digest length"
+            )
+
+    def is_manifest(self, name: str) -> bool:
+        '''
+        Check if member is the hash manifest of the archive,
+        which is "__manifest__." with archive hashAlgorithm
+
+        Args:
+            name (str): Member name
+
+        Returns:
+            bool: Member is a manifest
+        '''
+        return (
+            self.hashAlgorithm is not None
+            and name == f"{self.manifestPrefix}{self.hashAlgorithm}"
+        )
+
+    def get_hash(self, member: zipfile.ZipInfo | str) -> str | None:
+        '''
+        Get member hash from the manifest
+
+        Args:
+            member (zipfile.ZipInfo | str): Member
+
+        Returns:
+            str | None: Hex digest computed with hashAlgorithm,
+                None if the member was written without hashing
+        '''
+        if isinstance(member, zipfile.ZipInfo):
+            member = member.filename
+        return self.hashes.get(member)
+
+    def verify_hashes(self, pwd: bytes | None = None) -> list[str]:
+        '''
+        Read members and compare them with the manifest hashes
+
+        Args:
+            pwd (bytes | None): Password to decrypt files
+
+        Returns:
+            list[str]: Names of members that are missing
+                or don't match their hash
+        '''
+        mismatched = []
+
+        for name, digest in self.hashes.items():
+            if name not in self.NameToInfo:
+                mismatched.append(name)
+                continue
+
+            memberDigest = hashlib.new(self.hashAlgorithm)
+            with self.open(name, pwd=pwd) as member:
+                while chunk := member.read(self.copyBufferSize):
+                    memberDigest.update(chunk)
+
+            if memberDigest.hexdigest() != digest:
+                mismatched.append(name)
+
+        return mismatched
+
+    def _set_hash(self, name: str, digest: str):
+        '''
+        Record member hash to be written to the manifest
+
+        Args:
+            name (str): Member name
+            digest (str): Hex digest
+        '''
+        self.hashes[name] = digest
+        self._hashesModified = True
+
+    def _load_manifest(self, algorithm: str):
+        '''
+        Read member hashes from the manifest. Member with
+        unknown algorithm or other content is a regular file
+
+        Args:
+            algorithm (str): Manifest hash algorithm
+        '''
+        try:
+            self.check_algorithm(algorithm)
+            manifest = self.read(f"{self.manifestPrefix}{algorithm}")
+            hashes = {}
+            for line in manifest.decode(
+                "utf-8", "surrogateescape"
+            ).splitlines():
+                digest, name = line.split("  ", 1)
+                hashes[name] = digest
+        except (KeyError, ValueError, RuntimeError, zipfile.BadZipFile):
+            return
+
+        self.hashAlgorithm = algorithm
+        self.hashes = hashes
+
+    def _note_manifest(self, name: str):
+        '''
+        Remember root member with manifest prefix, it's
+        loaded after the member list is read
+
+        Args:
+            name (str): Member name
+        '''
+        if (
+            name.startswith(self.manifestPrefix)
+            and name[len(self.manifestPrefix):] in hashlib.algorithms_available
+        ):
+            self._manifestName = name
+
+    def _write_manifest(self):
+        '''
+        Replace manifest member with the current hashes
+        '''
+        name = f"{self.manifestPrefix}{self.hashAlgorithm}"
+
+        if name in self.NameToInfo:
+            #  Manifest is not a task unit of the progress bar
+            progressbar, self.progressbar = self.progressbar, False
+            try:
+                self._remove_member(self.NameToInfo[name])
+            finally:
+                self.progressbar = progressbar
+
+        if self.hashes:
+            manifest = "".join(
+                f"{digest}  {member}\n"
+                for member, digest in sorted(self.hashes.items())
+            )
+            super().writestr(
+                name,
+                manifest.encode("utf-8", "surrogateescape"),
+                zipfile.ZIP_DEFLATED
+            )
+
+        self._hashesModified = False
+
+    def mkdir(self, zinfo_or_directory_name, mode=511):
+        '''
+        Creates a directory inside the zip archive.
+        '''
+        self._flush_batch()
+        super().mkdir(zinfo_or_directory_name, mode)
+
+    def _flush_batch(self):
+        '''
+        Write batched members to the archive with a single write
+        '''
+        if not self._batch:
+            return
+
+        with self._lock:
+            self.fp.seek(self.start_dir)
+            self.fp.write(self._batch)
+            self.start_dir = self.fp.tell()
+            self._batch.clear()
+
+    def _batch_member(self, zinfo: zipfile.ZipInfo, data: bytes):
+        '''
+        Compress member in memory and add it to the batch.
+        Size and CRC are known before the local header is
+        built, so there is no need to seek back and patch it
+
+        Args:
+            zinfo (zipfile.ZipInfo): Member info
+            data (bytes): Uncompressed member data
+        '''
+        zinfo.file_size = len(data)
+        zinfo.CRC = zipfile.crc32(data)
+
+        if self.hashAlgorithm and not zinfo.is_dir():
+            self._set_hash(
+                zinfo.filename, hashlib.new(self.hashAlgorithm, data).hexdigest()
+            )
+
+        compressor = zipfile._get_compressor(
+            zinfo.compress_type, zinfo._compresslevel
+        )
+        if compressor:
+            data = compressor.compress(data) + compressor.flush()
+        zinfo.compress_size = len(data)
+
+        zinfo.flag_bits = 0x00
+        if zinfo.compress_type == zipfile.ZIP_LZMA:
+            #  Compressed data includes an end-of-stream (EOS) marker
+            zinfo.flag_bits |= zipfile._MASK_COMPRESS_OPTION_1
+        if not zinfo.external_attr:
+            zinfo.external_attr = 0o600 << 16
+
+        with self._lock:
+            zinfo.header_offset = self.start_dir + len(self._batch)
+            self._writecheck(zinfo)
+            self._didModify = True
+
+            self._batch += zinfo.FileHeader(False)
+            self._batch += data
+            self.filelist.append(zinfo)
+            self.NameToInfo[zinfo.filename] = zinfo
+
+        if len(self._batch) >= self.batchSize:
+            self._flush_batch()
+
     def _RealGetContents(self):
         '''
         Read in the table of contents for the ZIP file.
@@ -431,6 +800,12 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             print("given, inferred, offset", offset_cd, inferred, concat)
         #  self.start_dir:  Position of start of central directory
         self.start_dir = offset_cd + concat
+
+        if self.useIndex and self._load_index(
+            endrec[zipfile._ECD_ENTRIES_TOTAL]
+        ):
+            return
+
         fp.seek(self.start_dir, 0)
         data = fp.read(size_cd)
         fp = zipfile.io.BytesIO(data)
@@ -494,6 +869,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             x.header_offset = x.header_offset + concat
             self.filelist.append(x)
             self.NameToInfo[x.filename] = x
+            self._note_manifest(x.filename)
 
             #  update total bytes read from central directory
             total = (
@@ -507,6 +883,193 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             if self.debug > 2:
                 print("total", total)
 
+        if self.useIndex:
+            self._write_index()
+
+    def _index_key(self, count: int) -> tuple | None:
+        '''
+        Values the sidecar index is validated against
+
+        Args:
+            count (int): Number of central directory entries
+
+        Returns:
+            tuple | None: Header values for current state of the archive,
+                None if the archive is not a file on disk
+        '''
+        if not isinstance(self.filename, str):
+            return None
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return (
+            self.indexMagic,
+            stat.st_size,
+            stat.st_mtime_ns,
+            self.start_dir,
+            count
+        )
+
+    def _load_index(self, count: int) -> bool:
+        '''
+        Fill member list from the sidecar index, skipping central
+        directory parsing and charset detection
+
+        Args:
+            count (int): Number of central directory entries
+
+        Returns:
+            bool: Index exists, matches the archive and was loaded
+        '''
+        key = self._index_key(count)
+        if key is None:
+            return False
+
+        headerSize = zipfile.struct.calcsize(self.indexHeader)
+        recordSize = zipfile.struct.calcsize(self.indexRecord)
+        filelist = []
+
+        try:
+            with open(f"{self.filename}.idx", "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                header = zipfile.struct.unpack_from(self.indexHeader, index)
+                if header[:-1] != key:
+                    return False
+
+                recordsStart = headerSize + header[-1]
+                blobStart = recordsStart + count * recordSize
+                charset = index[headerSize:recordsStart].decode() or None
+
+                with memoryview(index) as view:
+                    records = view[recordsStart:blobStart]
+                    for (
+                        header_offset,
+                        compress_size,
+                        file_size,
+                        blobOffset,
+                        nameLength,
+                        CRC,
+                        external_attr,
+                        extraLength,
+                        commentLength,
+                        flag_bits,
+                        compress_type,
+                        t,
+                        d,
+                        internal_attr,
+                        volume,
+                        create_version,
+                        create_system,
+                        extract_version,
+                        reserved
+                    ) in zipfile.struct.iter_unpack(self.indexRecord, records):
+                        start = blobStart + blobOffset
+                        end = start + nameLength
+                        x = zipfile.ZipInfo(
+                            index[start:end].decode("utf-8", "surrogatepass")
+                        )
+                        start, end = end, end + extraLength
+                        x.extra = index[start:end]
+                        start, end = end, end + commentLength
+                        x.comment = index[start:end]
+                        x.header_offset = header_offset
+                        x.compress_size = compress_size
+                        x.file_size = file_size
+                        x.CRC = CRC
+                        x.external_attr = external_attr
+                        x.flag_bits = flag_bits
+                        x.compress_type = compress_type
+                        x.internal_attr = internal_attr
+                        x.volume = volume
+                        x.create_version = create_version
+                        x.create_system = create_system
+                        x.extract_version = extract_version
+                        x.reserved = reserved
+                        x._raw_time = t
+                        x.date_time = (
+                            (d >> 9) + 1980,
+                            (d >> 5) & 0xF,
+                            d & 0x1F,
+                            t >> 11,
+                            (t >> 5) & 0x3F,
+                            (t & 0x1F) * 2
+                        )
+                        filelist.append(x)
+                        self._note_manifest(x.filename)
+                    records.release()
+
+        except (OSError, ValueError, UnicodeDecodeError, zipfile.struct.error):
+            return False
+
+        if len(filelist) != count:
+            return False
+
+        self.latestCharset = charset
+        self.filelist = filelist
+        self.NameToInfo = {x.filename: x for x in filelist}
+        return True
+
+    def _write_index(self):
+        '''
+        Write sidecar index of the current member list.
+        Index is replaced atomically, failures are ignored
+        since the archive may be on read-only media
+        '''
+        key = self._index_key(len(self.filelist))
+        if key is None:
+            return
+
+        charset = (self.latestCharset or "").encode()
+        records = bytearray()
+        blob = bytearray()
+
+        for x in self.filelist:
+            name = x.orig_filename.encode("utf-8", "surrogatepass")
+            year, month, day, hour, minute, second = x.date_time
+            records += zipfile.struct.pack(
+                self.indexRecord,
+                x.header_offset,
+                x.compress_size,
+                x.file_size,
+                len(blob),
+                len(name),
+                x.CRC,
+                x.external_attr,
+                len(x.extra),
+                len(x.comment),
+                x.flag_bits,
+                x.compress_type,
+                hour << 11 | minute << 5 | second // 2,
+                (year - 1980) << 9 | month << 5 | day,
+                x.internal_attr,
+                x.volume,
+                x.create_version,
+                x.create_system,
+                x.extract_version,
+                x.reserved
+            )
+            blob += name
+            blob += x.extra
+            blob += x.comment
+
+        indexPath = f"{self.filename}.idx"
+        tempPath = f"{indexPath}.{os.getpid()}.tmp"
+        try:
+            with open(tempPath, "wb") as index:
+                index.write(
+                    zipfile.struct.pack(self.indexHeader, *key, len(charset))
+                )
+                index.write(charset)
+                index.write(records)
+                index.write(blob)
+            os.replace(tempPath, indexPath)
+        except OSError:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+
     def open(self, name, mode="r", pwd=None, *, force_zip64=False):
         '''
         Return file-like object for 'name'.
@@ -526,6 +1089,9 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         '''
         if mode not in {"r", "w"}:
             raise ValueError('open() requires mode "r" or "w"')
+        #  Batched members must be in the file before reading or
+        #  writing through handles that use start_dir
+        self._flush_batch()
         if pwd and not isinstance(pwd, bytes):
             raise TypeError("pwd: expected bytes, got %s" % type(pwd).__name__)
         if pwd and (mode == "w"):
@@ -559,13 +1125,25 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
 
         #  Open for reading:
         self._fileRefCnt += 1
-        zef_file = zipfile._SharedFile(
-            self.fp,
-            zinfo.header_offset,
-            self._fpclose,
-            self._lock,
-            lambda: self._writing
-        )
+        if PreadFile.is_supported(self.fp):
+            #  pread bypasses the io buffer, so written data must reach the file
+            if self.mode != "r":
+                with self._lock:
+                    self.fp.flush()
+            zef_file = PreadFile(
+                self.fp,
+                zinfo.header_offset,
+                self._fpclose,
+                lambda: self._writing
+            )
+        else:
+            zef_file = zipfile._SharedFile(
+                self.fp,
+                zinfo.header_offset,
+                self._fpclose,
+                self._lock,
+                lambda: self._writing
+            )
 
         try:
             #  Skip the file header:
@@ -641,7 +1219,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         if self.is_ignored(member):
             return path
 
-        if self.progressbar and not self.renderingProcess.is_alive():
+        if self.progressbar and not self.renderer.is_alive():
             if self.useBarPrefix:
                 filename = os.path.basename(member.rstrip("/"))
                 self.prefix.value = f"Extracting \"{filename}\" : ".encode()
@@ -668,15 +1246,16 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         `members' is optional and must be a subset of the list returned
         by namelist().
         '''
-        if self.progressbar and not self.renderingProcess.is_alive():
+        if members is None:
+            members = self.namelist()
+
+        if self.progressbar and not self.renderer.is_alive():
             if self.useBarPrefix:
                 self.prefix.value = f"Extracting \"{self.arcname}\" : ".encode()
+            self._set_extraction_total(members)
             self._create_progressbar(1)
             self._start_progressbar()
 
-        if members is None:
-            members = self.namelist()
-
         if path is None:
             path = os.getcwd()
         else:
@@ -687,6 +1266,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             #  skip nested files if any
             if skip:
                 if skip in zipinfo:
+                    self._skip_extraction(zipinfo)
                     continue
                 else:
                     skip = ""
@@ -694,9 +1274,57 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
             #  name was found in ignore, add path to skip
             if targetpath == path:
                 skip = zipinfo
+                self._skip_extraction(zipinfo)
 
         self._finish_progressbar()
 
+    def _set_extraction_total(self, members: list[str | zipfile.ZipInfo]):
+        '''
+        Make progress bar determinate, sizes from the central
+        directory are counted in bytes, or members if all of
+        them are empty
+
+        Args:
+            members (list[str | zipfile.ZipInfo]): Members to extract
+        '''
+        totalMembers = totalBytes = 0
+        for member in members:
+            if not isinstance(member, zipfile.ZipInfo):
+                member = self.getinfo(member)
+            if member.is_dir() or self.is_manifest(member.filename):
+                continue
+            totalMembers += 1
+            #  Symlink size is of its description
+            if not os.path.basename(member.filename).startswith("__symlink__"):
+                totalBytes += member.file_size
+
+        if totalBytes:
+            self.unit.value = b"B"
+            self.total.value = totalBytes
+        else:
+            self.total.value = totalMembers
+
+    def _skip_extraction(self, member: str | zipfile.ZipInfo):
+        '''
+        Count member that isn't extracted as done, the same
+        way _set_extraction_total counts it, so progress bar
+        reaches its total
+
+        Args:
+            member (str | zipfile.ZipInfo): Skipped member
+        '''
+        if not self.progressbar:
+            return
+        if not isinstance(member, zipfile.ZipInfo):
+            member = self.getinfo(member)
+        if member.is_dir() or self.is_manifest(member.filename):
+            return
+
+        if self.unit.value != b"B":
+            self._update_progressbar()
+        elif not os.path.basename(member.filename).startswith("__symlink__"):
+            self._update_progressbar(member.file_size)
+
     def _extract_member(self, member, targetpath, pwd) -> str:
         '''
         Extract the ZipInfo object 'member' to a physical
@@ -707,6 +1335,9 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
 
         arcname = member.filename
 
+        if self.is_manifest(arcname):
+            return targetpath
+
         #  Symlinks real name handling
         if os.path.basename(arcname).startswith("__symlink__"):
             with self.open(member, pwd=pwd) as source:
@@ -771,14 +1402,22 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
                 os.mkdir(targetpath)
             return targetpath
 
+        countBytes = self.progressbar and self.unit.value == b"B"
+
         if symlink:
             os.symlink(symlink, targetpath, isdir)
         else:
             with self.open(member, pwd=pwd) as source, \
                 open(targetpath, "wb") as target:
-                shutil.copyfileobj(source, target)
+                if countBytes:
+                    while chunk := source.read(self.copyBufferSize):
+                        target.write(chunk)
+                        self._update_progressbar(len(chunk))
+                else:
+                    shutil.copyfileobj(source, target)
 
-        self._update_progressbar()
+        if not countBytes:
+            self._update_progressbar()
 
         return targetpath
 
@@ -801,7 +1440,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
                 os.path.basename(filename.rstrip("/"))
             )
 
-        if self.progressbar and not self.renderingProcess.is_alive():
+        if self.progressbar and not self.renderer.is_alive():
             if self.useBarPrefix:
                 member = os.path.basename(filename.rstrip("/"))
                 self.prefix.value = f"Writing \"{member}\" : ".encode()
@@ -858,7 +1497,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         create = True
 
         #  Deal with duplicates
-        if arcname in self.namelist():
+        if arcname in self.NameToInfo:
             if self.overwriteDuplicates:
                 #  If member cannot be removed, create = False
                 create = self.remove(arcname)
@@ -868,7 +1507,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
                     arcname, name = os.path.split(arcname)
                     for name in self.get_unique_filename(name):
                         name = f"{arcname}/{name}"
-                        if name not in self.namelist():
+                        if name not in self.NameToInfo:
                             arcname = name
                             break
                 else:
@@ -878,11 +1517,11 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         if not arcname.endswith("/"):
             if create:
                 if symlink is None:
-                    super().write(
+                    self._write_file(
                         filename, arcname, compress_type, compresslevel
                     )
                 else:
-                    super().writestr(
+                    self._write_str(
                         arcname, symlink, compress_type, compresslevel
                     )
 
@@ -890,7 +1529,9 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
 
         else:
             if create:
-                super().write(filename, arcname, compress_type, compresslevel)
+                self._write_file(
+                    filename, arcname, compress_type, compresslevel
+                )
 
             for file in sorted(os.listdir(filename)):
                 self._write_member(
@@ -900,6 +1541,335 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
                     compresslevel=compresslevel
                 )
 
+    def _write_file(
+        self, filename, arcname, compress_type=None, compresslevel=None
+    ):
+        '''
+        zipfile.write that batches files below batchThreshold
+        and hashes file data while streaming it
+        '''
+        batch = self.batchThreshold and self._seekable
+
+        if not batch and not self.hashAlgorithm:
+            super().write(filename, arcname, compress_type, compresslevel)
+            return
+
+        zinfo = zipfile.ZipInfo.from_file(
+            filename, arcname, strict_timestamps=self._strict_timestamps
+        )
+
+        if zinfo.is_dir():
+            if batch:
+                self._batch_member(zinfo, b"")
+            else:
+                zinfo.compress_size = 0
+                zinfo.CRC = 0
+                self.mkdir(zinfo)
+            return
+
+        zinfo.compress_type = (
+            compress_type if compress_type is not None else self.compression
+        )
+        zinfo._compresslevel = (
+            compresslevel if compresslevel is not None else self.compresslevel
+        )
+
+        if batch and zinfo.file_size < self.batchThreshold:
+            with open(filename, "rb") as file:
+                self._batch_member(zinfo, file.read())
+            return
+
+        digest = hashlib.new(self.hashAlgorithm) if self.hashAlgorithm else None
+
+        with open(filename, "rb") as source, self.open(zinfo, "w") as target:
+            while chunk := source.read(self.copyBufferSize):
+                if digest:
+                    digest.update(chunk)
+                target.write(chunk)
+
+        if digest:
+            self._set_hash(zinfo.filename, digest.hexdigest())
+
+    def _write_str(
+        self, arcname, data, compress_type=None, compresslevel=None
+    ):
+        '''
+        zipfile.writestr that batches data below batchThreshold
+        '''
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        if (
+            not self.batchThreshold
+            or not self._seekable
+            or len(data) >= self.batchThreshold
+        ):
+            super().writestr(arcname, data, compress_type, compresslevel)
+            if self.hashAlgorithm:
+                self._set_hash(
+                    self.filelist[-1].filename,
+                    hashlib.new(self.hashAlgorithm, data).hexdigest()
+                )
+            return
+
+        zinfo = zipfile.ZipInfo(
+            filename=arcname,
+            date_time=zipfile.time.localtime(zipfile.time.time())[:6]
+        )
+        zinfo.compress_type = (
+            compress_type if compress_type is not None else self.compression
+        )
+        zinfo._compresslevel = (
+            compresslevel if compresslevel is not None else self.compresslevel
+        )
+        zinfo.external_attr = 0o600 << 16
+
+        self._batch_member(zinfo, data)
+
+    def _open_raw(self, member: zipfile.ZipInfo) -> IO:
+        '''
+        Open member compressed data for reading as it is stored,
+        without decryption and decompression
+
+        Args:
+            member (zipfile.ZipInfo): Member
+
+        Raises:
+            zipfile.BadZipFile: Truncated file header
+            zipfile.BadZipFile: Bad magic number for file header
+
+        Returns:
+            IO: File-like object positioned at the start of member data,
+                read member.compress_size bytes from it and close
+        '''
+        self._flush_batch()
+        self._fileRefCnt += 1
+        if PreadFile.is_supported(self.fp):
+            if self.mode != "r":
+                with self._lock:
+                    self.fp.flush()
+            source = PreadFile(
+                self.fp,
+                member.header_offset,
+                self._fpclose,
+                lambda: self._writing
+            )
+        else:
+            source = zipfile._SharedFile(
+                self.fp,
+                member.header_offset,
+                self._fpclose,
+                self._lock,
+                lambda: self._writing
+            )
+
+        try:
+            fheader = source.read(zipfile.sizeFileHeader)
+            if len(fheader) != zipfile.sizeFileHeader:
+                raise zipfile.BadZipFile("Truncated file header")
+            fheader = zipfile.struct.unpack(zipfile.structFileHeader, fheader)
+            if fheader[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+                raise zipfile.BadZipFile("Bad magic number for file header")
+            source.seek(
+                source.tell()
+                + fheader[zipfile._FH_FILENAME_LENGTH]
+                + fheader[zipfile._FH_EXTRA_FIELD_LENGTH]
+            )
+            return source
+        except:
+            source.close()
+            raise
+
+    def copy_member(
+        self,
+        source: "ZipFile",
+        member: zipfile.ZipInfo,
+        arcname: str | None = None
+    ) -> bool:
+        '''
+        Copy member from another archive without recompression.
+        Compressed (and encrypted) data is copied byte for byte,
+        only the headers are built for the new name
+
+        Args:
+            source (ZipFile): Archive to copy from
+            member (zipfile.ZipInfo): Member of the source archive
+            arcname (str | None, optional): Name in this archive.
+                Defaults to member name.
+
+        Returns:
+            bool: Whether it was copied or not. False means the name
+                was in ignore or duplicate couldn't be removed.
+        '''
+        if arcname is None:
+            arcname = member.filename
+
+        if source.is_manifest(member.filename) or self.is_ignored(arcname):
+            return False
+
+        #  Deal with duplicates
+        if arcname in self.NameToInfo:
+            if member.is_dir():
+                #  Dir already exist
+                return True
+            if self.overwriteDuplicates:
+                if not self.remove(arcname):
+                    return False
+            else:
+                dirname, name = os.path.split(arcname)
+                for name in self.get_unique_filename(name):
+                    #  Root level member has no dirname
+                    if dirname:
+                        name = f"{dirname}/{name}"
+                    if name not in self.NameToInfo:
+                        arcname = name
+                        break
+
+        zinfo = zipfile.ZipInfo(arcname, member.date_time)
+        for attr in (
+            "compress_type",
+            "comment",
+            "create_system",
+            "create_version",
+            "extract_version",
+            "flag_bits",
+            "volume",
+            "internal_attr",
+            "external_attr",
+            "CRC",
+            "compress_size",
+            "file_size"
+        ):
+            setattr(zinfo, attr, getattr(member, attr))
+        #  Encrypted members with data descriptor are checked by
+        #  time instead of CRC, it's set only when reading archive
+        hour, minute, second = member.date_time[3:]
+        zinfo._raw_time = getattr(
+            member, "_raw_time", hour << 11 | minute << 5 | second // 2
+        )
+        #  Zip64 extra field is added back by FileHeader if needed
+        zinfo.extra = zipfile._strip_extra(member.extra, (1,))
+
+        zip64 = (
+            zinfo.file_size > zipfile.ZIP64_LIMIT
+            or zinfo.compress_size > zipfile.ZIP64_LIMIT
+        )
+        if zip64 and not self._allowZip64:
+            raise zipfile.LargeZipFile(
+                "Filesize would require ZIP64 extensions"
+            )
+
+        self._flush_batch()
+
+        data = source._open_raw(member)
+
+        try:
+            with self._lock:
+                self.fp.seek(self.start_dir)
+                zinfo.header_offset = self.fp.tell()
+                self._writecheck(zinfo)
+                self._didModify = True
+
+                self.fp.write(zinfo.FileHeader(zip64))
+
+                size = zinfo.compress_size
+                while size > 0:
+                    chunk = data.read(min(size, self.copyBufferSize))
+                    if not chunk:
+                        raise zipfile.BadZipFile(
+                            f"Truncated data of member {member.filename!r}"
+                        )
+                    self.fp.write(chunk)
+                    size -= len(chunk)
+
+                #  Sizes and CRC were written after the data in the source
+                if zinfo.flag_bits & zipfile._MASK_USE_DATA_DESCRIPTOR:
+                    self.fp.write(zipfile.struct.pack(
+                        "<LLQQ" if zip64 else "<LLLL",
+                        zipfile._DD_SIGNATURE,
+                        zinfo.CRC,
+                        zinfo.compress_size,
+                        zinfo.file_size
+                    ))
+
+                self.start_dir = self.fp.tell()
+                self.filelist.append(zinfo)
+                self.NameToInfo[zinfo.filename] = zinfo
+        finally:
+            data.close()
+
+        digest = source.get_hash(member)
+        if digest and source.hashAlgorithm == self.hashAlgorithm:
+            self._set_hash(zinfo.filename, digest)
+
+        if not zinfo.is_dir():
+            self._update_progressbar()
+
+        return True
+
+    def merge(
+        self,
+        sources: list["str | ZipFile"],
+        renames: dict[str, str] | None = None
+    ):
+        '''
+        Copy members of other archives into this one without
+        recompression. Ignore rules, renames and duplicates are
+        resolved from the central directories only.
+
+        Merging into a new archive with ignore set can be used to
+        repack an archive without some members
+
+        Args:
+            sources (list[str | ZipFile]): Archives to copy from,
+                in order of priority for duplicates
+            renames (dict[str, str] | None, optional): Member name
+                prefixes to replace {"old/dir": "new/dir"}.
+                Defaults to None.
+
+        Raises:
+            ValueError: Can't merge archive into itself
+        '''
+        if renames is None:
+            renames = {}
+        renames = {
+            old.rstrip("/"): new.rstrip("/") for old, new in renames.items()
+        }
+
+        if self.progressbar and not self.renderer.is_alive():
+            if self.useBarPrefix:
+                self.prefix.value = f"Merging into \"{self.arcname}\" : ".encode()
+            self._create_progressbar(1)
+            self._start_progressbar()
+
+        for source in sources:
+            if isinstance(source, str):
+                if os.path.abspath(source) == os.path.abspath(self.filename):
+                    raise ValueError("Can't merge archive into itself")
+                archive = ZipFile(
+                    source, "r", preferredEncoding=self.preferredEncoding
+                )
+            else:
+                archive = source
+
+            #  Keep source hashes if no algorithm was chosen
+            if self.hashAlgorithm is None and not self.hashes:
+                self.hashAlgorithm = archive.hashAlgorithm
+
+            try:
+                for member in archive.infolist():
+                    arcname = member.filename
+                    for old, new in renames.items():
+                        if arcname == old or arcname.startswith(f"{old}/"):
+                            arcname = f"{new}{arcname[len(old):]}"
+                            break
+                    self.copy_member(archive, member, arcname)
+            finally:
+                if archive is not source:
+                    archive.close()
+
+        self._finish_progressbar()
+
     def remove(
         self, member: zipfile.ZipInfo | str, pwd: bytes | None = None
     ) -> bool:
@@ -941,7 +1911,7 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         if self.is_ignored(member.filename):
             return False
 
-        if self.progressbar and not self.renderingProcess.is_alive():
+        if self.progressbar and not self.renderer.is_alive():
             if self.useBarPrefix:
                 filename = os.path.basename(member.filename.rstrip("/"))
                 self.prefix.value = f"Removing \"{filename}\" : ".encode()
@@ -1017,6 +1987,8 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         if self.is_ignored(arcname):
             return False
 
+        self._flush_batch()
+
         #  get a sorted filelist by header offset, in case the dir order
         #  doesn't match the actual entry order
         fp = self.fp
@@ -1059,6 +2031,9 @@ class ZipFile(zipfile.ZipFile, ArchiveFile):
         del self.NameToInfo[member.filename]
         self._didModify = True
 
+        if self.hashes.pop(member.filename, None) is not None:
+            self._hashesModified = True
+
         #  seek to the start of the central dir
         fp.seek(self.start_dir)
 
@@ -1093,6 +2068,23 @@ if __name__ == "__main__":
             "use '/' argument to write all files in the current directory to an archive"
         )
     )
+    parser.add_argument(
+        "-m",
+        "--merge",
+        nargs="*",
+        help=(
+            "archives to copy members from without recompression. "
+            "use with --ignore to repack an archive without some members"
+        )
+    )
+    parser.add_argument(
+        "--rename",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("OLD", "NEW"),
+        help="replace member name prefix when merging"
+    )
     parser.add_argument(
         "-r",
         "--remove",
@@ -1136,6 +2128,23 @@ if __name__ == "__main__":
         action="store_true",
         help="replace symbolic links with the files they point"
     )
+    parser.add_argument(
+        "--batch-threshold",
+        type=int,
+        default=0,
+        help="write files smaller than this size in bytes in batches"
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="keep a sidecar index next to the archive for faster opening"
+    )
+    parser.add_argument(
+        "--hash",
+        default=None,
+        metavar="ALGORITHM",
+        help="store hashes of written members in a manifest, e.g. sha256"
+    )
     parser.add_argument(
         "-l",
         "--list",
@@ -1150,7 +2159,7 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
-    if args.write or os.path.exists(args.filepath):
+    if args.write or args.merge or os.path.exists(args.filepath):
         with ZipFile(
             file=args.filepath,
             mode="a",
@@ -1158,7 +2167,10 @@ if __name__ == "__main__":
             ignore=args.ignore,
             overwriteDuplicates=args.overwrite_duplicates,
             symlinksToFiles=args.symlinks_to_files,
-            progressbar=True
+            progressbar=True,
+            batchThreshold=args.batch_threshold,
+            useIndex=args.index,
+            hashAlgorithm=args.hash
         ) as zip:
             if args.extract:
                 #  on windows users need "create symbolic links" rights
@@ -1186,6 +2198,9 @@ if __name__ == "__main__":
                         else:
                             print(f"extract: There is no member named \"{member}\"")
 
+            if args.merge:
+                zip.merge(args.merge, dict(args.rename))
+
             if args.write:
                 if "/" in args.write:
                     args.write.extend(os.listdir())
@@ -1216,6 +2231,10 @@ if __name__ == "__main__":
                     print(
                         "The following enclosed file is corrupted: {!r}".format(badfile)
                     )
+                for badfile in zip.verify_hashes(args.password):
+                    print(
+                        "The following enclosed file doesn't match its hash: {!r}".format(badfile)
+                    )
                 print("Done testing")
 
     else:
@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+
+'''
+This file is part of 2trvl/dotfiles
+Personal repository with scripts and configs
+Which is released under MIT license
+Copyright (c) 2022 Andrew Shteren
+--------------------------------------------
+        Backup Comparison Benchmark
+--------------------------------------------
+Generates paired synthetic trees with known
+differences and measures compare_backups on
+them and on their zip variants: time of the
+whole run and of its phases, peak memory,
+bytes read and read/write syscalls. Writing
+of the destination tree to zip is measured
+with and without batching of small files.
+Results are compared with a stored baseline
+
+Linux only, counters are read from procfs
+
+'''
+import inspect
+import json
+import multiprocessing
+import os
+import queue as queues
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import zipfile
+from typing import Callable
+
+import compare_backups
+from compare_backups import (
+    CmpMoves,
+    DirCmp,
+    DirCmpUtils,
+    ScanCmp,
+    SortCmp,
+    ZipCmp
+)
+
+try:
+    from archiver import ZipFile
+except ModuleNotFoundError:
+    from compare_backups import ZipFile
+
+
+#  Benchmark cases: how the backup is stored and compared
+CASES = {
+    "dir": dict(backup="backup"),
+    "dir-compact": dict(backup="backup", compact=True),
+    "dir-out-of-core": dict(backup="backup", outOfCore=True),
+    "dir-stat": dict(backup="backup", verify="stat"),
+    "zip-stored": dict(backup="backup_stored.zip"),
+    "zip-deflated": dict(backup="backup_deflated.zip"),
+    "zip-full": dict(backup="backup_deflated.zip", verify="full"),
+    "zip-manifest": dict(backup="backup_manifest.zip", verify="full"),
+    "parse_dirs": dict(function="parse_dirs"),
+    "sorted_paths": dict(function="sorted_paths"),
+    "archive": dict(function="archive", batchThreshold=64 * 1024),
+    "archive-unbatched": dict(function="archive", batchThreshold=0)
+}
+
+#  Timed phases, nested calls of the same phase are counted once
+PHASES = (
+    (compare_backups, "scan_tree"),
+    (compare_backups, "compare_backup"),
+    (compare_backups, "write_comparison"),
+    (compare_backups, "sorted_paths"),
+    (DirCmpUtils, "parse_dirs"),
+    (DirCmp, "phase1"),
+    (DirCmp, "phase2"),
+    (DirCmp, "phase3"),
+    (DirCmp, "phase4"),
+    (DirCmp, "compare_tree"),
+    (CmpMoves, "find_moved"),
+    (ZipCmp, "list_members"),
+    (ZipCmp, "compare"),
+    (ScanCmp, "compare"),
+    (SortCmp, "compare"),
+    (ZipFile, "_flush_batch")
+)
+
+
+class PhaseTimer():
+    def __init__(self):
+        '''
+        Wall time of functions and methods, summed over calls
+        and threads. Recursive calls are included in the time
+        of the outermost call only
+        '''
+        self.times = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __repr__(self) -> str:
+        return f"PhaseTimer({self.times})"
+
+    def wrap(self, owner: object, attr: str):
+        '''
+        Replace function or method with timed one
+
+        Args:
+            owner (object): Module or class
+            attr (str): Function or method name
+        '''
+        static = isinstance(
+            inspect.getattr_static(owner, attr), staticmethod
+        )
+        original = getattr(owner, attr)
+        name = f"{getattr(owner, '__name__', owner)}.{attr}"
+
+        def timed(*args, **kwargs):
+            active = self._local.__dict__.setdefault("active", set())
+            if name in active:
+                return original(*args, **kwargs)
+
+            active.add(name)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                active.discard(name)
+                with self._lock:
+                    self.times[name] = self.times.get(name, 0) + elapsed
+
+        setattr(owner, attr, staticmethod(timed) if static else timed)
+
+        #  dircmp calls phases from methodmaps, not by attribute
+        for mapName in ("methodmap", "compactMethodmap"):
+            methodmap = vars(owner).get(mapName, {})
+            for key, method in methodmap.items():
+                if method is original:
+                    methodmap[key] = timed
+
+
+def read_io() -> dict[str, int]:
+    '''
+    Returns:
+        dict[str, int]: I/O counters of the current process,
+            rchar and syscr include reads served from page cache
+    '''
+    counters = {}
+    with open("/proc/self/io", "r") as ioFile:
+        for line in ioFile:
+            name, value = line.split(":")
+            counters[name] = int(value)
+    return counters
+
+
+def write_file(path: str, size: int, rng: random.Random):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(rng.randbytes(size))
+
+
+def generate_trees(
+    rootPath: str,
+    files: int = 5000,
+    depth: int = 3,
+    fanout: int = 4,
+    new: int = 100,
+    modified: int = 100,
+    removed: int = 100,
+    moved: int = 100,
+    symlinks: int = 50,
+    fileSize: int = 16 * 1024,
+    seed: int = 0
+) -> tuple[str, str]:
+    '''
+    Generate destination tree and its backup with differences.
+    Files are the same in both trees, except for:
+        new - only in backup
+        modified - half of them with the same size
+        removed - only in destination
+        moved - under another name and dir in backup
+
+    Args:
+        rootPath (str): Directory to create trees in
+        files (int, optional): Files in destination. Defaults to 5000.
+        depth (int, optional): Dirs nesting. Defaults to 3.
+        fanout (int, optional): Subdirs of each dir. Defaults to 4.
+        new (int, optional): New files. Defaults to 100.
+        modified (int, optional): Modified files. Defaults to 100.
+        removed (int, optional): Removed files. Defaults to 100.
+        moved (int, optional): Moved files. Defaults to 100.
+        symlinks (int, optional): Symlinks to files, in both
+            trees. Defaults to 50.
+        fileSize (int, optional): Average file size, sizes are
+            from half to one and a half of it. Defaults to 16 KiB.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        tuple[str, str]: Destination and backup paths
+    '''
+    rng = random.Random(seed)
+    destination = os.path.join(rootPath, "dest")
+    backup = os.path.join(rootPath, "backup")
+
+    dirs = [""]
+    level = [""]
+    for _ in range(depth):
+        level = [
+            os.path.join(parent, f"dir{index}")
+            for parent in level
+            for index in range(fanout)
+        ]
+        dirs.extend(level)
+
+    names = [
+        os.path.join(dirs[index % len(dirs)], f"file{index}")
+        for index in range(files)
+    ]
+    changed = rng.sample(range(files), min(modified + removed + moved, files))
+    modifiedNames = {names[index] for index in changed[:modified]}
+    removedNames = {names[index] for index in changed[modified:modified + removed]}
+    movedNames = {names[index] for index in changed[modified + removed:]}
+
+    for name in names:
+        size = rng.randint(fileSize // 2, fileSize * 3 // 2)
+        data = rng.randbytes(size)
+        for tree in (destination, backup):
+            if tree == backup:
+                if name in removedNames:
+                    continue
+                if name in movedNames:
+                    name = os.path.join(
+                        rng.choice(dirs), f"moved_{os.path.basename(name)}"
+                    )
+                elif name in modifiedNames:
+                    if rng.random() < 0.5:
+                        data = data[:-1] + bytes([data[-1] ^ 0xFF])
+                    else:
+                        data += b"\0"
+            path = os.path.join(tree, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(data)
+
+    for index in range(new):
+        name = os.path.join(rng.choice(dirs), f"new{index}")
+        size = rng.randint(fileSize // 2, fileSize * 3 // 2)
+        write_file(os.path.join(backup, name), size, rng)
+
+    for index in range(symlinks):
+        name = names[rng.randrange(files)]
+        link = os.path.join(os.path.dirname(name), f"link{index}")
+        for tree in (destination, backup):
+            path = os.path.join(tree, link)
+            if not os.path.lexists(path):
+                os.symlink(os.path.basename(name), path)
+
+    return destination, backup
+
+
+def pack_backups(backup: str):
+    '''
+    Pack backup tree to zip variants next to it,
+    members are stored under "<zip name>/"
+
+    Args:
+        backup (str): Backup tree path
+    '''
+    variants = (
+        ("backup_stored.zip", zipfile.ZIP_STORED, None),
+        ("backup_deflated.zip", zipfile.ZIP_DEFLATED, None),
+        ("backup_manifest.zip", zipfile.ZIP_DEFLATED, "sha256")
+    )
+
+    for filename, compression, hashAlgorithm in variants:
+        zipPath = os.path.join(os.path.dirname(backup), filename)
+        with ZipFile(
+            zipPath,
+            "w",
+            compression,
+            progressbar=False,
+            hashAlgorithm=hashAlgorithm
+        ) as zip:
+            zip.write(backup, os.path.splitext(filename)[0])
+
+
+def run_function(case: dict, destination: str) -> Callable:
+    '''
+    Args:
+        case (dict): Function case
+        destination (str): Destination tree path
+
+    Returns:
+        Callable: Function benchmark without arguments
+    '''
+    if case["function"] == "parse_dirs":
+        def run():
+            dirs = {}
+            files = {}
+            DirCmpUtils.parse_dirs(
+                os.listdir(destination),
+                destination,
+                dirs,
+                files,
+                True,
+                destination
+            )
+        return run
+
+    if case["function"] == "archive":
+        def run():
+            zipPath = os.path.join(os.path.dirname(destination), "archive.zip")
+            with ZipFile(
+                zipPath,
+                "w",
+                zipfile.ZIP_DEFLATED,
+                progressbar=False,
+                batchThreshold=case["batchThreshold"]
+            ) as zip:
+                zip.write(destination, "archive")
+        return run
+
+    names = [*compare_backups.scan_tree(destination, [])]
+    random.Random(0).shuffle(names)
+    return lambda: compare_backups.sorted_paths(names)
+
+
+def run_case(
+    case: dict, rootPath: str, queue: multiprocessing.Queue
+):
+    '''
+    Run benchmark case in a new process and put its
+    measurements or the error traceback to queue
+
+    Args:
+        case (dict): One of CASES
+        rootPath (str): Directory with generated trees
+        queue (multiprocessing.Queue): Results queue
+    '''
+    #  Reports and progress bars are not part of the output
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+    destination = os.path.join(rootPath, "dest")
+
+    if "function" in case:
+        run = run_function(case, destination)
+    else:
+        options = {
+            name: value for name, value in case.items() if name != "backup"
+        }
+
+        def run():
+            compare_backups.compare_backups(
+                backupFilename="",
+                backupDestination=destination,
+                reportFilepath=os.path.join(rootPath, "report.txt"),
+                ignore=[],
+                path=os.path.join(rootPath, case["backup"]),
+                useCache=False,
+                **options
+            )
+
+    timer = PhaseTimer()
+    for owner, attr in PHASES:
+        timer.wrap(owner, attr)
+
+    before = read_io()
+    start = time.perf_counter()
+    try:
+        run()
+    except Exception:
+        queue.put(dict(error=traceback.format_exc()))
+        return
+    elapsed = time.perf_counter() - start
+    after = read_io()
+
+    queue.put(dict(
+        time=elapsed,
+        #  Kilobytes on Linux
+        rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        rchar=after["rchar"] - before["rchar"],
+        readBytes=after["read_bytes"] - before["read_bytes"],
+        syscr=after["syscr"] - before["syscr"],
+        syscw=after["syscw"] - before["syscw"],
+        phases=timer.times
+    ))
+
+
+def measure(case: dict, rootPath: str, repeat: int = 3) -> dict:
+    '''
+    Run case in fresh processes, so peak memory of one
+    run doesn't hide another's
+
+    Args:
+        case (dict): One of CASES
+        rootPath (str): Directory with generated trees
+        repeat (int, optional): Runs, the fastest one is kept.
+            Defaults to 3.
+
+    Returns:
+        dict: Measurements of the fastest run
+
+    Raises:
+        RuntimeError: Case failed or its process died
+    '''
+    context = multiprocessing.get_context("spawn")
+    results = []
+
+    for _ in range(repeat):
+        queue = context.Queue()
+        process = context.Process(
+            target=run_case, args=(case, rootPath, queue)
+        )
+        process.start()
+
+        #  Child killed before putting anything would block get forever,
+        #  it is checked before get to not miss result put at exit
+        result = None
+        while result is None:
+            alive = process.is_alive()
+            try:
+                result = queue.get(timeout=1)
+            except queues.Empty:
+                if not alive:
+                    process.join()
+                    raise RuntimeError(
+                        f"Case exited with code {process.exitcode}"
+                    )
+        process.join()
+
+        if "error" in result:
+            raise RuntimeError(f"Case failed\n{result['error']}")
+        results.append(result)
+
+    return min(results, key=lambda result: result["time"])
+
+
+def format_row(name: str, result: dict, baseline: dict | None) -> str:
+    '''
+    Args:
+        name (str): Case name
+        result (dict): Case measurements
+        baseline (dict | None): Baseline measurements
+
+    Returns:
+        str: Table row
+    '''
+    row = (
+        f"{name:<16}"
+        f"{result['time']:>9.3f}s"
+        f"{compare_backups.format_size(result['rss']):>11}"
+        f"{compare_backups.format_size(result['rchar']):>11}"
+        f"{result['syscr']:>9}"
+        f"{result['syscw']:>9}"
+    )
+    if baseline is not None:
+        row += (
+            f"{result['time'] / max(baseline['time'], 1e-9):>8.2f}x"
+            f"{result['rss'] / max(baseline['rss'], 1):>7.2f}x"
+        )
+    return row
+
+
+def check_regressions(
+    results: dict, baselines: dict, tolerance: float
+) -> list[str]:
+    '''
+    Args:
+        results (dict): Measurements by case
+        baselines (dict): Baseline measurements by case
+        tolerance (float): Allowed ratio to baseline
+
+    Returns:
+        list[str]: Descriptions of regressions
+    '''
+    regressions = []
+
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        for counter in ("time", "rss", "rchar", "syscr"):
+            if result[counter] > baseline[counter] * tolerance:
+                regressions.append(
+                    f"{name}: {counter} {result[counter]:.6g} "
+                    f"> {baseline[counter]:.6g} * {tolerance}"
+                )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Backup Comparison Benchmark")
+    parser.add_argument(
+        "--cases",
+        nargs="*",
+        choices=CASES,
+        default=[*CASES],
+        help="cases to run, all by default"
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=5000,
+        help="files in destination tree"
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=3,
+        help="dirs nesting"
+    )
+    parser.add_argument(
+        "--fanout",
+        type=int,
+        default=4,
+        help="subdirs of each dir"
+    )
+    parser.add_argument(
+        "--changes",
+        type=int,
+        default=100,
+        help="number of new, modified, removed and moved files each"
+    )
+    parser.add_argument(
+        "--symlinks",
+        type=int,
+        default=50,
+        help="symlinks to files in both trees"
+    )
+    parser.add_argument(
+        "--file-size",
+        type=int,
+        default=16 * 1024,
+        help="average file size in bytes"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="random seed of generated trees"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs of each case, the fastest one is reported"
+    )
+    parser.add_argument(
+        "--workdir",
+        default=None,
+        help="directory for generated trees, temporary by default. existing trees are reused"
+    )
+    parser.add_argument(
+        "--baseline",
+        default="benchmark_baseline.json",
+        help="path of stored baseline"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store results as baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="allowed ratio to baseline before a case is reported as regression"
+    )
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="benchmark_backups_")
+
+    try:
+        if not os.path.isdir(os.path.join(workdir, "dest")):
+            print(f"Generating trees in {workdir}")
+            destination, backup = generate_trees(
+                workdir,
+                files=args.files,
+                depth=args.depth,
+                fanout=args.fanout,
+                new=args.changes,
+                modified=args.changes,
+                removed=args.changes,
+                moved=args.changes,
+                symlinks=args.symlinks,
+                fileSize=args.file_size,
+                seed=args.seed
+            )
+            pack_backups(backup)
+
+        baselines = {}
+        if os.path.isfile(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as baselineFile:
+                baselines = json.load(baselineFile)
+
+        print(
+            f"{'case':<16}{'time':>10}{'peak rss':>11}{'read':>11}"
+            f"{'syscr':>9}{'syscw':>9}"
+            + (f"{'time':>9}{'rss':>8}" if baselines else "")
+        )
+
+        results = {}
+        for name in args.cases:
+            results[name] = measure(CASES[name], workdir, args.repeat)
+            print(format_row(name, results[name], baselines.get(name)))
+            for phase, elapsed in sorted(results[name]["phases"].items()):
+                print(f"    {phase:<32}{elapsed:>9.3f}s")
+
+        regressions = check_regressions(results, baselines, args.tolerance)
+        for regression in regressions:
+            print(f"Regression {regression}")
+
+        if args.save_baseline:
+            baselines.update(results)
+            with open(args.baseline, "w", encoding="utf-8") as baselineFile:
+                json.dump(baselines, baselineFile, indent=4)
+            print(f"Baseline saved to {args.baseline}")
+
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir)
+
+    sys.exit(1 if regressions else 0)
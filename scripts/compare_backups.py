@@ -13,20 +13,38 @@ compares them with the current state located
 at BACKUP_DESTINATION
 
 '''
+import array
+import csv
+import ctypes
 import filecmp
-import multiprocessing
+import hashlib
+import heapq
+import json
 import os
+import select
 import shutil
+import stat
+import struct
+import sys
 import tempfile
-from itertools import filterfalse
-from typing import IO
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, filterfalse
+from typing import IO, Callable, Iterable, Iterator
 
-from crossgui.widgets import ProgressBar
+from crossgui.widgets import (
+    ProgressBar,
+    ProgressManager,
+    ProgressRenderer,
+    SharedValue
+)
 
 try:
     from archiver import ZipFile
 except ModuleNotFoundError:
-    import zipfile
     class ZipFile(zipfile.ZipFile):
         def __init__(
             self,
@@ -37,22 +55,19 @@ except ModuleNotFoundError:
             symlinksToFiles = False,
             progressbar = True,
             useBarPrefix = True,
+            useIndex = False,
             **kwargs
         ):
             super().__init__(*args, **kwargs)
+            self.hashAlgorithm = None
+            self.hashes = {}
 
-if os.name == "nt":
-    import ctypes
-
-    if ZipFile.__module__ == "archiver":
-        try:
-            from common import run_as_admin
-        except ModuleNotFoundError:
-            def run_as_admin():
-                print("Make sure you run this script as administrator")
-    else:
-        run_as_admin = lambda: None
+        def is_manifest(self, name: str) -> bool:
+            return False
 
+#  Errors of a single backup that don't stop comparing the others:
+#  unreadable or removed files, damaged zip or wrong password
+BACKUP_ERRORS = (OSError, RuntimeError, ValueError, zipfile.BadZipFile)
 
 class DirCmpUtils():
     @staticmethod
@@ -191,26 +206,559 @@ class DirCmpUtils():
 
         Overwrites files list with changes
         '''
-        for file in files.copy():
-            files.append(f"{subdir}{os.sep}{file}")
-            files.remove(file)
+        files[:] = [f"{subdir}{os.sep}{file}" for file in files]
+
+    @staticmethod
+    def deduplicate(values: list):
+        '''
+        Remove repeated values from the list,
+        keeping the first occurrence order
+
+        Args:
+            values (list): Values to deduplicate
+
+        Overwrites values list with changes
+        '''
+        values[:] = dict.fromkeys(values)
 
     @staticmethod
-    def update_list(values: list, target: list):
+    def replace_names(files: list[str], names: dict[str, str]):
+        '''
+        Remove old names from the list and add new
+        names to the end, if they are not in it
+
+        Args:
+            files (list[str]): Filenames to convert
+            names (dict[str, str]): Names to replace
+                in format {"oldname": "newname"}
+
+        Overwrites files list with changes
+        '''
+        files[:] = filterfalse(names.__contains__, files)
+        files[:] = dict.fromkeys([*files, *names.values()])
+
+
+class CmpStats():
+    def __init__(self):
+        '''
+        Live counters of a comparison, shared by its threads
+
+        Counters are plain ints updated under a lock, so
+        updating them costs much less than shared memory
+        values. CmpProgress publishes them periodically
+        '''
+        self.dirs = 0
+        self.files = 0
+        self.bytesRead = 0
+        #  Size of compared left files, used for ETA
+        self.processed = 0
+        #  Left tree totals, known after pre-scan
+        self.totalFiles = None
+        self.totalBytes = None
+        #  Comparisons sharing counters, each of them processes
+        #  the whole left tree once
+        self.comparisons = 1
+        #  Count left files which aren't compared, needed
+        #  only for ETA, so it's set when pre-scan starts
+        self.tracking = False
+        self.startTime = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"CmpStats({self.format()})"
+
+    def add(
+        self,
+        dirs: int = 0,
+        files: int = 0,
+        bytesRead: int = 0,
+        processed: int = 0
+    ):
+        '''
+        Increase counters
+
+        Args:
+            dirs (int, optional): Directories scanned. Defaults to 0.
+            files (int, optional): Files compared. Defaults to 0.
+            bytesRead (int, optional): Bytes read. Defaults to 0.
+            processed (int, optional): Size of compared
+                left files. Defaults to 0.
+        '''
+        with self._lock:
+            self.dirs += dirs
+            self.files += files
+            self.bytesRead += bytesRead
+            self.processed += processed
+
+    def skip(self, entries: Iterable[os.DirEntry]):
+        '''
+        Count left files that are not compared, like left only
+        or unreadable ones, as processed. Pre-scan counts them
+        too, so without this ETA would never reach zero. Does
+        nothing unless tracking is set, entries are iterated
+        lazily, so callers don't list anything for it then
+
+        Args:
+            entries (Iterable[os.DirEntry]): Left files entries,
+                directories are skipped
+        '''
+        if not self.tracking:
+            return
+
+        size = 0
+        for entry in entries:
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    size += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        self.add(processed=size)
+
+    def prescan(
+        self, rootPath: str, ignore: list[str], stop: threading.Event
+    ):
+        '''
+        Count files and their size in the left tree, reading
+        only metadata. Totals are set when the scan is done
+
+        Args:
+            rootPath (str): Left directory path
+            ignore (list[str]): Names to skip
+            stop (threading.Event): Stop scanning when set
+        '''
+        files = size = 0
+        try:
+            for name, entry in iter_tree(rootPath, ignore, []):
+                if stop.is_set():
+                    return
+                if name.endswith(os.sep):
+                    continue
+                files += 1
+                size += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            return
+        self.totalFiles, self.totalBytes = files, size
+
+    def format(self) -> str:
+        '''
+        Format counters, throughput and ETA
+
+        Returns:
+            str: Counters text
+        '''
+        elapsed = max(time.monotonic() - self.startTime, 1e-3)
+        text = (
+            f"{self.dirs} dirs, {self.files} files, "
+            f"{format_size(self.bytesRead)}, "
+            f"{format_size(self.bytesRead / elapsed)}/s"
+        )
+        if self.totalBytes and self.processed:
+            total = self.totalBytes * self.comparisons
+            remaining = max(total - self.processed, 0)
+            text += f", ETA {format_time(remaining * elapsed / self.processed)}"
+        return text
+
+
+class CmpProgress():
+    '''
+    Progress bar of a comparison, rendered in a thread
+    shared by all comparisons, and entries it finds
+    passed to report while it runs
+    '''
+    #  Postfix buffer size, counters text is truncated to it
+    postfixSize = 96
+    #  Created on first use and restarted by each comparison
+    renderer = None
+    #  Called with status and name of each entry found,
+    #  set by comparisons from their onEntry argument
+    onEntry = None
+    #  Statuses comparison passes to onEntry
+    streamedStatuses = ("new", "modified", "removed", "error")
+
+    def emit(self, status: str, name: str):
+        '''
+        Pass entry to onEntry if it's set
+
+        Args:
+            status (str): One of streamedStatuses
+            name (str): Entry name in the DirCmp format
+        '''
+        if self.onEntry is not None:
+            self.onEntry(status, name)
+
+    def start_progressbar(
+        self,
+        stats: CmpStats | None = None,
+        prescanPath: str | None = None,
+        ignore: list[str] = None
+    ):
+        '''
+        Start rendering progress bar
+
+        Args:
+            stats (CmpStats | None, optional): Counters to show,
+                published by a thread, so updating them doesn't
+                take the progress bar locks. Defaults to None.
+            prescanPath (str | None, optional): Directory to count
+                in background for ETA. Defaults to None.
+            ignore (list[str], optional): Names to skip in pre-scan.
+                Defaults to [].
+        '''
+        if CmpProgress.renderer is None:
+            #  Counters are shown in postfix, so the
+            #  progress bar counter is omitted
+            CmpProgress.renderer = ProgressRenderer(
+                ProgressBar(size=40, clearMode=True),
+                SharedValue(b""),
+                SharedValue(-1),
+                SharedValue(b""),
+                SharedValue(False)
+            )
+        self.renderer = CmpProgress.renderer
+        self.postfix, self.finished = self.renderer.args[2:4]
+        self.postfix.value = b"in process"
+        self.finished.value = False
+        self.renderer.start()
+
+        self.progressStats = stats
+        self._stopProgress = threading.Event()
+        self._progressThreads = []
+
+        if stats is not None:
+            self._progressThreads.append(
+                threading.Thread(target=self.publish_progress, daemon=True)
+            )
+            if prescanPath is not None:
+                stats.tracking = True
+                self._progressThreads.append(
+                    threading.Thread(
+                        target=stats.prescan,
+                        args=(prescanPath, ignore or [], self._stopProgress),
+                        daemon=True
+                    )
+                )
+            for thread in self._progressThreads:
+                thread.start()
+
+    def publish_progress(self):
+        '''
+        Copy counters to progress bar postfix until finished
+        '''
+        while not self._stopProgress.wait(0.1):
+            self.set_postfix(self.progressStats.format())
+
+    def set_postfix(self, text: str):
+        text = text.encode()[:self.postfixSize - 1]
+        with self.postfix.get_lock():
+            self.postfix.value = text
+
+    def finish_progressbar(self):
+        '''
+        Finish progressbar if it exists
+        '''
+        if "renderer" in vars(self):
+            self._stopProgress.set()
+            for thread in self._progressThreads:
+                thread.join()
+
+            postfix = "finished"
+            if self.progressStats is not None:
+                postfix += f", {self.progressStats.format().split(', ETA')[0]}"
+
+            self.set_postfix(postfix)
+            with self.finished.get_lock():
+                self.finished.value = True
+            self.renderer.join()
+            del self.renderer
+
+
+class CmpMoves():
+    '''
+    Detection of files moved between left only and right only names
+    '''
+    def find_moved(self) -> dict[str, str]:
+        '''
+        Match left only and right only files by size, then by
+        content checksum. Only files which sizes collide are read
+
+        Returns:
+            dict[str, str]: Moved files in format {"leftname": "rightname"}
+        '''
+        leftSizes = self.group_by_size(self.left_only, False)
+        rightSizes = self.group_by_size(self.right_only, True)
+        self.moved = {}
+
+        for size in sorted(leftSizes.keys() & rightSizes.keys()):
+            leftChecksums = self.group_by_checksum(leftSizes[size], False)
+            rightChecksums = self.group_by_checksum(rightSizes[size], True)
+
+            #  Files with the same content are paired in names order
+            for checksum in leftChecksums.keys() & rightChecksums.keys():
+                self.moved.update(
+                    zip(leftChecksums[checksum], rightChecksums[checksum])
+                )
+
+        return self.moved
+
+    def group_by_size(self, names: dict[str, str], right: bool) -> dict:
+        '''
+        Group regular files by size
+
+        Args:
+            names (dict[str, str]): Left only or right only files
+            right (bool): Files are on the right side
+
+        Returns:
+            dict: Files in format {size: ["name"]}
+        '''
+        sizes = {}
+        for name in sorted(names):
+            if name.endswith(os.sep):
+                continue
+            try:
+                size = self.file_size(name, right)
+            except OSError:
+                continue
+            if size is not None:
+                sizes.setdefault(size, []).append(name)
+        return sizes
+
+    def group_by_checksum(self, names: list[str], right: bool) -> dict:
+        '''
+        Group files by content checksum
+
+        Args:
+            names (list[str]): Files of the same size
+            right (bool): Files are on the right side
+
+        Returns:
+            dict: Files in format {checksum: ["name"]}
+        '''
+        checksums = {}
+        for name in names:
+            try:
+                checksum = self.file_checksum(name, right)
+            except (OSError, RuntimeError, ValueError, zipfile.BadZipFile):
+                continue
+            checksums.setdefault(checksum, []).append(name)
+        return checksums
+
+    def file_size(self, name: str, right: bool) -> int | None:
+        '''
+        Get size of left or right file
+
+        Args:
+            name (str): Filename relative to directory path
+            right (bool): File is on the right side
+
+        Returns:
+            int | None: Size or None if it's not a regular file
+        '''
+        fileStat = os.lstat(os.path.join(self.right if right else self.left, name))
+        if stat.S_ISREG(fileStat.st_mode):
+            return fileStat.st_size
+
+    def file_checksum(self, name: str, right: bool) -> tuple[int, str]:
+        '''
+        Get left or right file CRC32 and sha256
+
+        Args:
+            name (str): Filename relative to directory path
+            right (bool): File is on the right side
+
+        Returns:
+            tuple[int, str]: CRC32 and hex digest
+        '''
+        if not right and self.hashCache is not None:
+            return self.hashCache.checksums(name)
+        return file_checksums(
+            os.path.join(self.right if right else self.left, name),
+            "sha256",
+            FileCmp.bufferSize
+        )
+
+
+class FileCmp():
+    #  Comparison tiers from the fastest to the most accurate
+    levels = ("stat", "sample", "full")
+    #  Chunk size for reading files in full comparison
+    bufferSize = 1024 * 1024
+    #  Size of head, middle and tail blocks in sampled comparison
+    sampleSize = 64 * 1024
+    #  FAT and zip store modification time with 2 seconds resolution
+    mtimeResolution = 2
+
+    def __init__(
+        self,
+        verify: str = "full",
+        hashCache: "HashCache" = None,
+        stats: CmpStats | None = None
+    ):
+        '''
+        Files comparator with tiers, each next tier is used
+        only for files the previous one could not resolve:
+            stat - files with different size are different,
+                at this level files with the same size and
+                modification time are considered the same
+            sample - compare head, middle and tail blocks
+            full - compare whole files content
+
+        Args:
+            verify (str, optional): Most accurate tier to use.
+                Defaults to "full".
+            hashCache (HashCache, optional): Cache of left files
+                checksums used by full comparison. Defaults to None.
+            stats (CmpStats | None, optional): Counters to update,
+                can be shared by several comparators. Defaults to None.
+
+        Raises:
+            ValueError: Unknown verify level
+        '''
+        if verify not in self.levels:
+            raise ValueError(
+                f"Unknown verify level {verify}, use one of {self.levels}"
+            )
+
+        self.verify = verify
+        self.hashCache = hashCache
+        #  Number of files resolved by each tier
+        self.resolved = dict.fromkeys(self.levels, 0)
+        self.stats = CmpStats() if stats is None else stats
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"FileCmp(verify=\"{self.verify}\", resolved={self.resolved})"
+
+    def resolve(self, tier: str, same: bool, size: int = 0) -> bool:
+        '''
+        Count file resolved by tier
+
+        Args:
+            tier (str): Comparison tier
+            same (bool): Comparison result
+            size (int, optional): Left file size. Defaults to 0.
+
+        Returns:
+            bool: Comparison result
+        '''
+        with self._lock:
+            self.resolved[tier] += 1
+        self.stats.add(files=1, processed=size)
+        return same
+
+    def compare(self, left: str, right: str, name: str | None = None) -> bool:
+        '''
+        Compare two files
+
+        Args:
+            left (str): Left filepath
+            right (str): Right filepath
+            name (str | None, optional): Left file name in
+                hashCache. Defaults to None, cache isn't used.
+
+        Returns:
+            bool: Files are the same
+        '''
+        leftStat = os.stat(left)
+        rightStat = os.stat(right)
+
+        if not stat.S_ISREG(leftStat.st_mode) or not stat.S_ISREG(rightStat.st_mode):
+            return self.resolve("stat", False)
+        size = leftStat.st_size
+        if size != rightStat.st_size:
+            return self.resolve("stat", False, size)
+        if self.verify == "stat":
+            return self.resolve(
+                "stat",
+                abs(leftStat.st_mtime - rightStat.st_mtime) < self.mtimeResolution,
+                size
+            )
+
+        #  Samples of small files cover them entirely,
+        #  so they are compared fully at once
+        if size > 3 * self.sampleSize:
+            if not self.compare_samples(left, right, size):
+                return self.resolve("sample", False, size)
+            if self.verify == "sample":
+                return self.resolve("sample", True, size)
+
+        if self.hashCache is not None and name is not None:
+            same = (
+                self.hashCache.checksums(name, leftStat)
+                == file_checksums(right, self.hashCache.algorithm, self.bufferSize)
+            )
+            self.stats.add(bytesRead=size)
+        else:
+            same = self.compare_contents(left, right)
+        return self.resolve("full", same, size)
+
+    def compare_samples(self, left: str, right: str, size: int) -> bool:
+        '''
+        Compare head, middle and tail blocks of files
+
+        Args:
+            left (str): Left filepath
+            right (str): Right filepath
+            size (int): Files size
+
+        Returns:
+            bool: Blocks are the same
         '''
-        dictionary.update for list
-        Adds values to the list only if they are not in it
+        offsets = (0, (size - self.sampleSize) // 2, size - self.sampleSize)
+
+        with open(left, "rb") as leftFile, open(right, "rb") as rightFile:
+            for offset in offsets:
+                leftFile.seek(offset)
+                rightFile.seek(offset)
+                self.stats.add(bytesRead=2 * self.sampleSize)
+                if leftFile.read(self.sampleSize) != rightFile.read(self.sampleSize):
+                    return False
+
+        return True
+
+    def compare_contents(self, left: str, right: str) -> bool:
+        '''
+        Compare files content chunk by chunk
 
         Args:
-            values (list): Values to add
-            target (list): List
+            left (str): Left filepath
+            right (str): Right filepath
+
+        Returns:
+            bool: Files are the same
         '''
-        for value in values:
-            if value not in target:
-                target.append(value)
+        with open(left, "rb") as leftFile, open(right, "rb") as rightFile:
+            while True:
+                chunk = leftFile.read(self.bufferSize)
+                self.stats.add(bytesRead=2 * len(chunk))
+                if chunk != rightFile.read(self.bufferSize):
+                    return False
+                if not chunk:
+                    return True
 
 
-class DirCmp(filecmp.dircmp):
+class DirCmp(CmpProgress, CmpMoves, filecmp.dircmp):
+    #  New and removed entries are known only after merging
+    #  subdirectories, so only files comparison is streamed
+    streamedStatuses = ("modified", "error")
+    #  Attributes loaded from subdirectories, accessing them
+    #  in this order computes subdirectory comparison fully
+    subdirAttrs = (
+        "left_only_dirs",
+        "right_only_dirs",
+        "left_only",
+        "right_only",
+        "left_list",
+        "right_list",
+        "diff_files",
+        "same_files",
+        "funny_files",
+        "common_dirs",
+        "common_files",
+        "common_funny",
+        "common"
+    )
+
     def __init__(
         self,
         leftPath: str,
@@ -220,6 +768,14 @@ class DirCmp(filecmp.dircmp):
         subdirMode: bool = False,
         leftBasePath: str = "",
         rightBasePath: str = "",
+        hashCache: "HashCache" = None,
+        verify: str = "full",
+        workers: int = 1,
+        comparator: FileCmp | None = None,
+        executor: ThreadPoolExecutor | None = None,
+        slots: threading.Semaphore | None = None,
+        compact: bool = False,
+        onEntry: Callable[[str, str], None] | None = None,
         progressbar: bool = False
     ):
         '''
@@ -241,14 +797,47 @@ class DirCmp(filecmp.dircmp):
             rightBasePath (str, optional): System argument, points
                 to the root of the right directory. Needed to
                 calculate names. Defaults to "".
+            hashCache (HashCache, optional): Cache of left directory
+                files checksums. If set, files are compared by checksums
+                and left files are read only if they have changed since
+                the last run. Defaults to None.
+            verify (str, optional): Most accurate tier of files
+                comparison, one of FileCmp.levels. Defaults to "full".
+            workers (int, optional): Number of threads comparing
+                subdirectories. Subdirectory is compared in the calling
+                thread when all workers are busy, so results are the
+                same as with one worker. Defaults to 1.
+            comparator (FileCmp | None, optional): System argument,
+                files comparator shared by subdirectories.
+                Defaults to None.
+            executor (ThreadPoolExecutor | None, optional): System
+                argument, thread pool shared by subdirectories.
+                Defaults to None.
+            slots (threading.Semaphore | None, optional): System
+                argument, number of free workers in the executor.
+                Defaults to None.
+            compact (bool, optional): Walk both directories in the
+                calling thread and keep results in PathTree, where each
+                node stores only its name component. left_only,
+                right_only, diff_files, same_files and funny_files are
+                built from the tree once, on first access. Other
+                dircmp attributes raise AttributeError, workers
+                must be 1. Defaults to False.
+            onEntry (Callable[[str, str], None] | None, optional):
+                Called with status and name of modified and error
+                files as they are compared, with new and removed
+                entries too in compact mode. Defaults to None.
             progressbar (bool, optional): Render progress bar while
                 running or not. If True an object of type ProgressBar
                 is created, to stop it set the finished variable to True.
                 Defaults to False.
 
-        If you use progressbar option on Windows - run your code in the
-        "if __name__ == '__main__'" statement
+        Raises:
+            ValueError: Compact mode with several workers
         '''
+        if compact and workers > 1:
+            raise ValueError("Compact mode compares in one thread")
+
         super().__init__(leftPath, rightPath, ignore, hide)
         self.subdirMode = subdirMode
 
@@ -259,29 +848,48 @@ class DirCmp(filecmp.dircmp):
             self.leftBasePath = leftBasePath
             self.rightBasePath = rightBasePath
 
+        #  Threads are started on first submit, so creating
+        #  executor for comparison that is never run is cheap
+        if not subdirMode and workers > 1 and not compact:
+            executor = ThreadPoolExecutor(workers)
+            slots = threading.Semaphore(workers)
+
+        if comparator is None:
+            comparator = FileCmp(verify, hashCache)
+
+        self.hashCache = hashCache
+        self.comparator = comparator
+        self.comparator.stats.add(dirs=1)
+        self.workers = workers
+        self.executor = executor
+        self.slots = slots
+        self.compact = compact
+        self.onEntry = onEntry
         self.progressbar = progressbar
 
+        #  Results are computed lazily by dircmp.__getattr__,
+        #  compact mode maps them to the tree phases instead
+        if compact:
+            self.methodmap = self.compactMethodmap
+            self.streamedStatuses = CmpProgress.streamedStatuses
+
         if progressbar:
-            prefix = multiprocessing.Array("c", 1)
-            prefix.value = b""
-            self.postfix = multiprocessing.Array("c", 11)
-            self.postfix.value = b"in process"
-            self.finished = multiprocessing.Value("b", False)
-            #  This class is designed in such way that when
-            #  accessing a variable, make multiple function
-            #  calls, so we omit counter, since it is impossible
-            #  to track number of indexed files for sure
-            self.renderingProcess = multiprocessing.Process(
-                target=ProgressBar(size=40, clearMode=True).start_rendering_mp,
-                args=(
-                    prefix,
-                    multiprocessing.Value("i", -1),
-                    self.postfix,
-                    self.finished
-                ),
-                daemon=True
+            self.start_progressbar(
+                self.comparator.stats, self.left, self.ignore
+            )
+
+    def __getattr__(self, attr: str):
+        #  Listings of directories aren't kept in compact mode
+        if (
+            vars(self).get("compact")
+            and attr in DirCmp.methodmap
+            and attr not in self.compactMethodmap
+        ):
+            raise AttributeError(
+                f"{attr} is unavailable in compact mode, results are "
+                f"{', '.join(self.compactMethodmap)}"
             )
-            self.renderingProcess.start()
+        return super().__getattr__(attr)
 
     def __enter__(self) -> "DirCmp":
         return self
@@ -296,20 +904,13 @@ class DirCmp(filecmp.dircmp):
             f"rightPath=\"{self.right}\", "
             f"ignore={self.ignore}, "
             f"hide={self.hide}, "
+            f"verify=\"{self.comparator.verify}\", "
+            f"workers={self.workers}, "
+            f"compact={self.compact}, "
             f"progressbar={self.progressbar}"
             ")"
         )
 
-    def finish_progressbar(self):
-        '''
-        Finish progressbar if it exists
-        '''
-        if hasattr(self, "renderingProcess"):
-            with self.postfix.get_lock(), self.finished.get_lock():
-                self.postfix.value = f"finished".encode()
-                self.finished.value = True
-            self.renderingProcess.join()
-
     def phase1(self):
         '''
         Compute common names but with subdirs
@@ -329,6 +930,7 @@ class DirCmp(filecmp.dircmp):
         self.right_only = list(
             map(right.__getitem__, filterfalse(left.__contains__, right))
         )
+        self.comparator.stats.skip(self.left_entries(self.left_only))
 
         #  SubdirMode : Convert filenames to subdir/names
         if self.subdirMode:
@@ -352,38 +954,103 @@ class DirCmp(filecmp.dircmp):
         self.left_only = DirCmpUtils.list_to_dict(self.left_only, self.left)
         self.right_only = DirCmpUtils.list_to_dict(self.right_only, self.right)
 
-        #  Recursively parse common dirs
-        for dir in self.common_dirs:
-            left = os.path.join(self.leftBasePath, dir)
-            right = os.path.join(self.rightBasePath, dir)
-            compared = DirCmp(
-                leftPath=left,
-                rightPath=right,
-                subdirMode=True,
-                leftBasePath=self.leftBasePath,
-                rightBasePath=self.rightBasePath
-            )
-            #  Load subdirs values
-            self.left_only_dirs.update(compared.left_only_dirs)
-            self.right_only_dirs.update(compared.right_only_dirs)
-            self.left_only.update(compared.left_only)
-            self.right_only.update(compared.right_only)
-            #  Prevent adding same values when recursing
-            DirCmpUtils.update_list(compared.left_list, self.left_list)
-            DirCmpUtils.update_list(compared.right_list, self.right_list)
-            DirCmpUtils.update_list(compared.diff_files, self.diff_files)
-            DirCmpUtils.update_list(compared.same_files, self.same_files)
-            DirCmpUtils.update_list(compared.funny_files, self.funny_files)
-            DirCmpUtils.update_list(compared.common_dirs, self.common_dirs)
-            DirCmpUtils.update_list(compared.common_files, self.common_files)
-            DirCmpUtils.update_list(compared.common_funny, self.common_funny)
-            DirCmpUtils.update_list(compared.common, self.common)
+        #  Recursively parse common dirs, in worker
+        #  threads if there are free ones
+        subdirs = []
+        try:
+            for dir in self.common_dirs:
+                if (
+                    self.slots is not None
+                    and self.slots.acquire(blocking=False)
+                ):
+                    subdirs.append(
+                        self.executor.submit(self.compare_subdir, dir, True)
+                    )
+                else:
+                    subdirs.append(self.compare_subdir(dir))
+
+            #  Merge in the original order
+            for compared in subdirs:
+                if isinstance(compared, Future):
+                    compared = compared.result()
+                #  Load subdirs values
+                self.left_only_dirs.update(compared.left_only_dirs)
+                self.right_only_dirs.update(compared.right_only_dirs)
+                self.left_only.update(compared.left_only)
+                self.right_only.update(compared.right_only)
+                for attr in self.subdirAttrs[4:]:
+                    getattr(self, attr).extend(getattr(compared, attr))
+        finally:
+            #  Root comparison owns the executor, subdirectories
+            #  still queued are dropped if one of them failed
+            if not self.subdirMode and self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+
+        #  Prevent adding same values when recursing
+        if subdirs:
+            for attr in self.subdirAttrs[4:]:
+                DirCmpUtils.deduplicate(getattr(self, attr))
 
         #  Force parse left_only_dirs and right_only_dirs
         #  Cast dir names to dir/ format
         if not self.common_dirs:
             self.phase5()
 
+    def left_entries(self, names: list[str]) -> Iterator[os.DirEntry]:
+        '''
+        Iterate over left directory entries, with contents
+        of subdirectories
+
+        Args:
+            names (list[str]): Names in the left directory
+
+        Yields:
+            os.DirEntry: File or directory entry
+        '''
+        names = set(names)
+        with os.scandir(self.left) as scanner:
+            entries = [entry for entry in scanner if entry.name in names]
+
+        for entry in entries:
+            yield entry
+            if entry.is_dir(follow_symlinks=False):
+                for _, subentry in iter_tree(entry.path, self.ignore, []):
+                    yield subentry
+
+    def compare_subdir(self, dir: str, release: bool = False) -> "DirCmp":
+        '''
+        Compare common subdirectory, computing all
+        attributes needed to merge it into the parent
+
+        Args:
+            dir (str): Subdirectory name relative to base paths
+            release (bool, optional): Release worker slot when
+                done. Defaults to False.
+
+        Returns:
+            DirCmp: Subdirectory comparison
+        '''
+        try:
+            compared = DirCmp(
+                leftPath=os.path.join(self.leftBasePath, dir),
+                rightPath=os.path.join(self.rightBasePath, dir),
+                subdirMode=True,
+                leftBasePath=self.leftBasePath,
+                rightBasePath=self.rightBasePath,
+                hashCache=self.hashCache,
+                workers=self.workers,
+                comparator=self.comparator,
+                executor=self.executor,
+                slots=self.slots,
+                onEntry=self.onEntry
+            )
+            for attr in self.subdirAttrs:
+                getattr(compared, attr)
+            return compared
+        finally:
+            if release:
+                self.slots.release()
+
     def phase2(self):
         '''
         Add conversion dir names to dir/ format
@@ -401,26 +1068,80 @@ class DirCmp(filecmp.dircmp):
 
         self.common_dirs = DirCmpUtils.dict_to_list(common_dirs)
 
-        for dir in self.common_dirs:
-            oldDir = dir.split(os.sep)[-2]
-            self.common.remove(oldDir)
-            self.common.append(dir)
+        DirCmpUtils.replace_names(
+            self.common,
+            dict((dir.split(os.sep)[-2], dir) for dir in self.common_dirs)
+        )
+        names = dict((dir[:-1], dir) for dir in self.common_dirs)
+        DirCmpUtils.replace_names(self.left_list, names)
+        DirCmpUtils.replace_names(self.right_list, names)
 
-            oldDir = dir[:-1]
-            self.left_list.remove(oldDir)
-            self.right_list.remove(oldDir)
+    def phase3(self):
+        '''
+        Compare files content with tiered comparator
+        '''
+        self.same_files, self.diff_files, self.funny_files = [], [], []
+        subdir = os.path.relpath(self.left, self.leftBasePath)
 
-            self.left_list.append(dir)
-            self.right_list.append(dir)
+        for name in self.common_files:
+            path = os.path.normpath(os.path.join(subdir, name))
+            try:
+                same = self.comparator.compare(
+                    os.path.join(self.left, name),
+                    os.path.join(self.right, name),
+                    path
+                )
+            except OSError:
+                self.comparator.stats.skip(self.left_entries([name]))
+                self.funny_files.append(name)
+                self.emit("error", path)
+                continue
+            if same:
+                self.same_files.append(name)
+            else:
+                self.diff_files.append(name)
+                self.emit("modified", path)
 
-    def phase3(self):
+    @property
+    def resolved(self) -> dict[str, int]:
         '''
-        Compare files content, not only os.stat attributes
+        Number of files resolved by each comparison tier
         '''
-        xx = filecmp.cmpfiles(
-            a=self.left, b=self.right, common=self.common_files, shallow=False
+        return self.comparator.resolved
+
+    def file_size(self, name: str, right: bool) -> int | None:
+        '''
+        Get size of left or right file
+
+        Args:
+            name (str): Filename relative to base path
+            right (bool): File is on the right side
+
+        Returns:
+            int | None: Size or None if it's not a regular file
+        '''
+        basePath = self.rightBasePath if right else self.leftBasePath
+        fileStat = os.lstat(os.path.join(basePath, name))
+        if stat.S_ISREG(fileStat.st_mode):
+            return fileStat.st_size
+
+    def file_checksum(self, name: str, right: bool) -> tuple[int, str]:
+        '''
+        Get left or right file CRC32 and sha256
+
+        Args:
+            name (str): Filename relative to base path
+            right (bool): File is on the right side
+
+        Returns:
+            tuple[int, str]: CRC32 and hex digest
+        '''
+        if not right and self.hashCache is not None:
+            return self.hashCache.checksums(os.path.normpath(name))
+        basePath = self.rightBasePath if right else self.leftBasePath
+        return file_checksums(
+            os.path.join(basePath, name), "sha256", FileCmp.bufferSize
         )
-        self.same_files, self.diff_files, self.funny_files = xx
 
     def phase4(self):
         '''
@@ -448,14 +1169,11 @@ class DirCmp(filecmp.dircmp):
             self.leftBasePath
         )
         #  Remove old dir names without /
-        for dir in self.left_only_dirs.keys():
-            self.left_only.pop(dir[:-1], None)
-            if dir[:-1] in self.left_list:
-                self.left_list.remove(dir[:-1])
+        names = dict((dir[:-1], dir) for dir in self.left_only_dirs)
+        for dir in names:
+            self.left_only.pop(dir, None)
         self.left_only.update(self.left_only_dirs)
-        DirCmpUtils.update_list(
-            DirCmpUtils.dict_to_list(self.left_only_dirs), self.left_list
-        )
+        DirCmpUtils.replace_names(self.left_list, names)
 
         self.right_only_dirs = {}
         DirCmpUtils.parse_dirs(
@@ -466,14 +1184,11 @@ class DirCmp(filecmp.dircmp):
             True,
             self.rightBasePath
         )
-        for dir in self.right_only_dirs.keys():
-            self.right_only.pop(dir[:-1], None)
-            if dir[:-1] in self.right_list:
-                self.right_list.remove(dir[:-1])
+        names = dict((dir[:-1], dir) for dir in self.right_only_dirs)
+        for dir in names:
+            self.right_only.pop(dir, None)
         self.right_only.update(self.right_only_dirs)
-        DirCmpUtils.update_list(
-            DirCmpUtils.dict_to_list(self.right_only_dirs), self.right_list
-        )
+        DirCmpUtils.replace_names(self.right_list, names)
 
     methodmap = dict(
         subdirs=phase4,
@@ -492,84 +1207,2793 @@ class DirCmp(filecmp.dircmp):
         right_list=filecmp.dircmp.phase0
     )
 
+    def list_dir(self, path: str) -> dict[str, os.DirEntry]:
+        '''
+        List directory entries, skipping ignored and hidden names
 
-def contains_only(string: str, substring: str, exclude: list[str] = []) -> bool:
-    '''
-    Check if a string contains a substring
-    and does not contain any other substrings
+        Args:
+            path (str): Directory path
 
-    Args:
-        string (str): String
-        substring (str): Substring to look for in the string
-        exclude (list[str], optional): Substrings that should
-            not be in the string. Defaults to [].
+        Returns:
+            dict[str, os.DirEntry]: Entries in format {"normcase name": entry}
+        '''
+        with os.scandir(path) as scanner:
+            return dict(
+                (os.path.normcase(entry.name), entry)
+                for entry in scanner
+                if entry.name not in self.ignore
+                and entry.name not in self.hide
+            )
 
-    Returns:
-        bool: A substring was found in a string and no
-            substrings were found from exclude
-    '''
-    if not substring in string:
-        return False
-    if exclude:
-        if any(substring in string for substring in exclude):
-            return False
-    return True
+    def compare_tree(self):
+        '''
+        Compact mode: walk both directories and store results in the tree
+        '''
+        self.tree = tree = PathTree()
+        #  Common dirs to compare: (node, "subdir/")
+        subdirs = [(-1, "")]
 
+        while subdirs:
+            parent, subdir = subdirs.pop()
+            try:
+                left = self.list_dir(os.path.join(self.left, subdir))
+                right = self.list_dir(os.path.join(self.right, subdir))
+            except OSError:
+                if parent < 0:
+                    raise
+                tree.set_status(parent, PathTree.ERROR)
+                self.emit_node(parent)
+                continue
 
-def insert_to_sorted(strings: list[str], sortedStrings: list[str]):
-    '''
-    Insert strings into an already sorted list
+            for key in sorted(left.keys() | right.keys()):
+                if key not in right:
+                    self.add_tree_only(parent, left[key], PathTree.REMOVED)
+                    continue
+                if key not in left:
+                    self.add_tree_only(parent, right[key], PathTree.NEW)
+                    continue
 
-    Args:
-        strings (list[str]): Strings to insert
-        sortedStrings (list[str]): Sorted list
+                leftEntry, rightEntry = left[key], right[key]
+                name = leftEntry.name
+                isDir = leftEntry.is_dir(follow_symlinks=False)
 
-    Overwrites sortedStrings with inserted strings into it
+                if isDir != rightEntry.is_dir(follow_symlinks=False):
+                    node = tree.add(parent, name, PathTree.ERROR, False)
+                    self.emit_node(node)
+                elif isDir:
+                    node = tree.add(parent, name, PathTree.SAME, True)
+                    subdirs.append((node, f"{subdir}{name}{os.sep}"))
+                    self.comparator.stats.add(dirs=1)
+                else:
+                    status = self.compare_tree_files(
+                        f"{subdir}{name}", leftEntry, rightEntry
+                    )
+                    node = tree.add(parent, name, status, False)
+                    if status != PathTree.SAME:
+                        self.emit_node(node)
+
+    def add_tree_only(self, parent: int, entry: os.DirEntry, status: int):
+        '''
+        Compact mode: add entry present only on one side, with its contents
+
+        Args:
+            parent (int): Parent node index
+            entry (os.DirEntry): Directory entry
+            status (int): PathTree.NEW or PathTree.REMOVED
+        '''
+        entries = [(parent, entry)]
+
+        while entries:
+            parent, entry = entries.pop()
+            isDir = entry.is_dir(follow_symlinks=False)
+            node = self.tree.add(parent, entry.name, status, isDir)
+            self.emit_node(node)
+            if not isDir:
+                if status == PathTree.REMOVED:
+                    self.comparator.stats.skip([entry])
+                continue
+
+            try:
+                subentries = self.list_dir(entry.path)
+            except OSError:
+                continue
+            for key in sorted(subentries, reverse=True):
+                entries.append((node, subentries[key]))
+
+    def emit_node(self, node: int):
+        '''
+        Compact mode: pass tree node to onEntry if it's set
+
+        Args:
+            node (int): Node index
+        '''
+        if self.onEntry is not None:
+            self.emit(
+                PathTree.statusNames[self.tree.get_status(node)],
+                self.tree.path(node)
+            )
+
+    def compare_tree_files(
+        self, name: str, left: os.DirEntry, right: os.DirEntry
+    ) -> int:
+        '''
+        Compact mode: compare files present in both directories
+
+        Args:
+            name (str): Filename relative to leftPath
+            left (os.DirEntry): Left file
+            right (os.DirEntry): Right file
+
+        Returns:
+            int: PathTree status
+        '''
+        try:
+            if left.is_symlink() and right.is_symlink():
+                same = os.readlink(left.path) == os.readlink(right.path)
+                self.comparator.stats.skip([left])
+            else:
+                same = self.comparator.compare(left.path, right.path, name)
+        except OSError:
+            self.comparator.stats.skip([left])
+            return PathTree.ERROR
+        return PathTree.SAME if same else PathTree.MODIFIED
+
+    def select_tree_dict(self, status: int, rootPath: str) -> dict[str, str]:
+        '''
+        Build names with status in format {"subdir/name": "dirpath"}
+
+        Args:
+            status (int): Node status
+            rootPath (str): Directory to join with names dirs
+
+        Returns:
+            dict[str, str]: Names and directories they are in
+        '''
+        return dict(
+            (
+                self.tree.path(node),
+                os.path.normpath(
+                    os.path.join(
+                        rootPath, self.tree.path(self.tree.parents[node])
+                    )
+                )
+            )
+            for node in self.tree.select(status)
+        )
+
+    def phase_tree_only(self):
+        '''
+        Compact mode: build left_only and right_only from the tree
+        '''
+        self.left_only = self.select_tree_dict(PathTree.REMOVED, self.left)
+        self.right_only = self.select_tree_dict(PathTree.NEW, self.right)
+
+    def phase_tree_files(self):
+        '''
+        Compact mode: build diff_files, same_files
+        and funny_files from the tree
+        '''
+        tree = self.tree
+        self.diff_files = list(
+            map(tree.path, tree.select(PathTree.MODIFIED))
+        )
+        self.same_files = [
+            tree.path(node)
+            for node in tree.select(PathTree.SAME)
+            if not tree.is_dir(node)
+        ]
+        self.funny_files = list(map(tree.path, tree.select(PathTree.ERROR)))
+
+    compactMethodmap = dict(
+        tree=compare_tree,
+        same_files=phase_tree_files,
+        diff_files=phase_tree_files,
+        funny_files=phase_tree_files,
+        left_only=phase_tree_only,
+        right_only=phase_tree_only
+    )
+
+
+class ZipCmp(CmpProgress, CmpMoves):
+    #  Comparison tiers. Compressed members can't be read at
+    #  offsets, so sampling is replaced with whole file CRC32
+    levels = ("stat", "crc", "full")
+    #  Chunk size for reading files when computing checksums
+    bufferSize = 1024 * 1024
+
+    def __init__(
+        self,
+        leftPath: str,
+        zip: ZipFile,
+        rootName: str = "",
+        ignore: list[str] = None,
+        verify: str = "crc",
+        pwd: bytes | None = None,
+        hashCache: "HashCache" = None,
+        leftEntries: dict[str, os.DirEntry] | None = None,
+        leftErrors: list[str] = None,
+        stats: CmpStats | None = None,
+        extractPath: str | None = None,
+        onEntry: Callable[[str, str], None] | None = None,
+        progressbar: bool = False
+    ):
+        '''
+        Compare directory with zip archive using its central
+        directory, without extracting the archive
+
+        Files are compared in tiers like in FileCmp, each next
+        tier is used only for files the previous one could not
+        resolve. Results have the same format as in DirCmp
+
+        Args:
+            leftPath (str): Left directory path
+            zip (ZipFile): Right side archive, opened for reading
+            rootName (str, optional): Archive folder which contents
+                are compared with leftPath. Members outside of it
+                are skipped. Defaults to "", whole archive.
+            ignore (list[str], optional): List of names to ignore.
+                Defaults to filecmp.DEFAULT_IGNORES.
+            verify (str, optional): Most accurate tier of files
+                comparison, one of ZipCmp.levels. "sample" of
+                FileCmp.levels is the same as "crc". Defaults to "crc".
+                stat - compare size and modification time,
+                crc - compare CRC32 of whole file on disk with the
+                    stored one, files of other size are not read,
+                full - also compare files which CRC32 match, using
+                    manifest hashes if archive has them, otherwise
+                    by decompressing members and comparing them
+                    with files in memory.
+            pwd (bytes | None, optional): Password to decrypt members
+                when full comparison is used. Defaults to None.
+            hashCache (HashCache, optional): Cache of leftPath files
+                checksums, files are read only if they have changed
+                since the last run. Defaults to None.
+            leftEntries (dict[str, os.DirEntry] | None, optional):
+                leftPath scanned with scan_tree, to share one scan
+                between comparisons. Defaults to None, scan leftPath.
+            leftErrors (list[str], optional): Subdirectories that
+                couldn't be listed when scanning leftEntries.
+                Defaults to None.
+            stats (CmpStats | None, optional): Counters to update.
+                Defaults to None.
+            extractPath (str | None, optional): Directory to extract
+                differing and missing on disk members to after
+                comparison. Defaults to None.
+            onEntry (Callable[[str, str], None] | None, optional):
+                Called with status and name of each new, modified,
+                removed and error entry as it's found.
+                Defaults to None.
+            progressbar (bool, optional): Render progress bar while
+                running or not. Defaults to False.
+
+        Raises:
+            ValueError: Unknown verify level
+        '''
+        if verify == "sample":
+            verify = "crc"
+        if verify not in self.levels:
+            raise ValueError(
+                f"Unknown verify level {verify}, use one of {self.levels}"
+            )
+
+        self.left = leftPath
+        self.zip = zip
+        self.rootName = rootName
+        self.ignore = filecmp.DEFAULT_IGNORES if ignore is None else ignore
+        self.verify = verify
+        self.pwd = pwd
+        self.hashCache = hashCache
+        self.leftEntries = leftEntries
+        self.leftErrors = leftErrors or []
+        self.stats = CmpStats() if stats is None else stats
+        self.extractPath = extractPath
+        self.extracted = 0
+        self.onEntry = onEntry
+        self.progressbar = progressbar
+        self.resolved = dict.fromkeys(self.levels, 0)
+
+        if progressbar:
+            self.start_progressbar()
+
+        self.left_only = {}
+        self.right_only = {}
+        self.diff_files = []
+        self.same_files = []
+        self.funny_files = []
+
+        try:
+            self.compare()
+            if extractPath:
+                self.extracted = self.extract_differing(extractPath)
+        except BaseException:
+            #  Comparison is lost, so progress bar is finished here
+            self.finish_progressbar()
+            raise
+
+    def __enter__(self) -> "ZipCmp":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.finish_progressbar()
+
+    def __repr__(self) -> str:
+        return (
+            "zipcmp("
+            f"leftPath=\"{self.left}\", "
+            f"zip=\"{self.zip.filename}\", "
+            f"rootName=\"{self.rootName}\", "
+            f"ignore={self.ignore}, "
+            f"verify=\"{self.verify}\", "
+            f"progressbar={self.progressbar}"
+            ")"
+        )
+
+    def list_members(self) -> dict[str, tuple]:
+        '''
+        Parse archive members of rootName folder in the DirCmp
+        names format, including directories without own entries
+
+        Names that are absolute or contain ".." are not compared,
+        they are stored in unsafeMembers and reported as errors
+
+        Returns:
+            dict[str, tuple]: {"subdir/name": (ZipInfo, symlink target)},
+                ZipInfo is None for implicit directories, symlink target
+                is None for anything but symlinks
+        '''
+        members = {}
+        self.unsafeMembers = []
+        prefix = f"{self.rootName}/" if self.rootName else ""
+
+        for info in self.zip.infolist():
+            name = info.filename
+            if not name.startswith(prefix) or self.zip.is_manifest(name):
+                continue
+            name = name[len(prefix):]
+            if not name:
+                continue
+
+            symlink = None
+            #  Symlinks real name handling
+            if os.path.basename(name).startswith("__symlink__"):
+                with self.zip.open(info, pwd=self.pwd) as source:
+                    filename, symlink, isdir = (
+                        source.readline().decode().split(",")
+                    )
+                name = f"{os.path.dirname(name)}/{filename}".lstrip("/")
+
+            if (
+                name.startswith(("/", "\\"))
+                or os.path.splitdrive(name)[0]
+                or ".." in name.replace("\\", "/").split("/")
+            ):
+                self.unsafeMembers.append(name)
+                continue
+            parts = [part for part in name.split("/") if part not in ("", ".")]
+            if not parts:
+                continue
+            if self.ignore and frozenset(parts).intersection(self.ignore):
+                continue
+
+            #  Directories might have no entries of their own
+            for depth in range(1, len(parts)):
+                subdir = os.sep.join(parts[:depth]) + os.sep
+                members.setdefault(subdir, (None, None))
+
+            name = os.sep.join(parts)
+            if info.is_dir() and symlink is None:
+                name += os.sep
+            members[name] = (info, symlink)
+
+        return members
+
+    def compare(self):
+        '''
+        Compare left directory with archive members
+        '''
+        errors = list(self.leftErrors)
+        left = self.leftEntries
+        if left is None:
+            left = scan_tree(self.left, self.ignore, errors)
+        right = self.members = self.list_members()
+
+        for name in left.keys() - right.keys():
+            self.left_only[name] = os.path.join(
+                self.left, os.path.dirname(name.rstrip(os.sep))
+            )
+            self.emit("removed", name)
+        self.stats.skip(map(left.__getitem__, self.left_only))
+        for name in right.keys() - left.keys():
+            self.right_only[name] = os.path.join(
+                self.zip.filename,
+                self.rootName,
+                os.path.dirname(name.rstrip(os.sep))
+            )
+            self.emit("new", name)
+
+        for name in left.keys() & right.keys():
+            if name.endswith(os.sep):
+                continue
+            try:
+                tier, same = self.compare_file(name, left[name], *right[name])
+                size = left[name].stat(follow_symlinks=False).st_size
+            except (OSError, RuntimeError, ValueError, zipfile.BadZipFile):
+                self.stats.skip([left[name]])
+                self.funny_files.append(name)
+                self.emit("error", name)
+                continue
+            self.resolved[tier] += 1
+            self.stats.add(files=1, processed=size)
+            if same:
+                self.same_files.append(name)
+            else:
+                self.diff_files.append(name)
+                self.emit("modified", name)
+
+        for name in chain(errors, self.unsafeMembers):
+            self.funny_files.append(name)
+            self.emit("error", name)
+
+    def file_size(self, name: str, right: bool) -> int | None:
+        '''
+        Get size of file on disk or archive member
+
+        Args:
+            name (str): Filename relative to leftPath
+            right (bool): File is archive member
+
+        Returns:
+            int | None: Size or None if it's not a regular file
+        '''
+        if right:
+            info, symlink = self.members[name]
+            if symlink is None:
+                return info.file_size
+            return None
+
+        fileStat = os.lstat(os.path.join(self.left, name))
+        if stat.S_ISREG(fileStat.st_mode):
+            return fileStat.st_size
+
+    def file_checksum(self, name: str, right: bool) -> int:
+        '''
+        Get CRC32 of file on disk or archive member
+
+        Args:
+            name (str): Filename relative to leftPath
+            right (bool): File is archive member
+
+        Returns:
+            int: CRC32
+        '''
+        if right:
+            return self.members[name][0].CRC
+        if self.hashCache is not None:
+            return self.hashCache.checksums(name)[0]
+        return file_checksums(os.path.join(self.left, name))[0]
+
+    def compare_file(
+        self,
+        name: str,
+        entry: os.DirEntry,
+        info: zipfile.ZipInfo,
+        symlink: str | None
+    ) -> tuple[str, bool]:
+        '''
+        Compare file on disk with archive member
+
+        Args:
+            name (str): File name relative to leftPath
+            entry (os.DirEntry): File on disk
+            info (zipfile.ZipInfo): Archive member
+            symlink (str | None): Member symlink target
+
+        Returns:
+            tuple[str, bool]: Tier which resolved the
+                comparison and files are the same
+        '''
+        if symlink is not None:
+            return "stat", (
+                entry.is_symlink() and os.readlink(entry.path) == symlink
+            )
+
+        fileStat = entry.stat()
+        if fileStat.st_size != info.file_size:
+            return "stat", False
+        if self.verify == "stat":
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            return "stat", (
+                abs(fileStat.st_mtime - mtime) < FileCmp.mtimeResolution
+            )
+
+        expected = None
+        if self.verify == "full" and self.zip.hashAlgorithm:
+            expected = self.zip.hashes.get(info.filename)
+
+        #  Without manifest the member is decompressed anyway, streaming
+        #  it is a single read of the file instead of two, checksums for
+        #  the cache are computed in the same pass
+        if self.verify == "full" and expected is None:
+            if self.hashCache is None:
+                return "full", self.compare_contents(entry.path, info)
+            cached = self.hashCache.cached(name, fileStat)
+            if cached is not None and cached[0] != info.CRC:
+                return "crc", False
+            return "full", self.compare_contents(
+                entry.path, info, None if cached else (name, fileStat)
+            )
+
+        if self.hashCache is not None and (
+            expected is None
+            or self.zip.hashAlgorithm == self.hashCache.algorithm
+        ):
+            crc, digest = self.hashCache.checksums(name, fileStat)
+        else:
+            crc, digest = file_checksums(
+                entry.path,
+                self.zip.hashAlgorithm if expected else None,
+                self.bufferSize
+            )
+
+        if crc != info.CRC:
+            return "crc", False
+        if self.verify == "crc":
+            return "crc", True
+        if expected is not None:
+            return "full", digest == expected
+        return "full", self.compare_contents(entry.path, info)
+
+    def compare_contents(
+        self,
+        path: str,
+        info: zipfile.ZipInfo,
+        cacheKey: tuple[str, os.stat_result] | None = None
+    ) -> bool:
+        '''
+        Decompress member and compare it with file chunk
+        by chunk in memory, stops at the first difference
+
+        Args:
+            path (str): File path
+            info (zipfile.ZipInfo): Archive member
+            cacheKey (tuple[str, os.stat_result] | None, optional):
+                Name and stat of file to store its checksums in
+                hashCache, if it is read to the end. Defaults to None.
+
+        Returns:
+            bool: Files are the same
+        '''
+        crc = 0
+        digest = hashlib.new(self.hashCache.algorithm) if cacheKey else None
+
+        with self.zip.open(info, pwd=self.pwd) as member, \
+            open(path, "rb") as file:
+            while True:
+                chunk = member.read(self.bufferSize)
+                if chunk != file.read(len(chunk)):
+                    return False
+                if not chunk:
+                    break
+                if digest:
+                    crc = zlib.crc32(chunk, crc)
+                    digest.update(chunk)
+
+        if digest:
+            self.hashCache.store(*cacheKey, crc, digest.hexdigest())
+        return True
+
+    def extract_differing(self, path: str) -> int:
+        '''
+        Extract members which differ from files on disk or
+        are missing there, names are relative to rootName
+
+        Members that would be written through a symlink
+        pointing outside of path are added to funny_files
+
+        Args:
+            path (str): Directory to extract to
+
+        Returns:
+            int: Number of extracted members
+        '''
+        extracted = 0
+
+        for name in sorted((*self.diff_files, *self.right_only)):
+            info, symlink = self.members[name]
+            try:
+                targetPath = safe_path(path, name)
+            except ValueError:
+                self.funny_files.append(name)
+                self.emit("error", name)
+                continue
+
+            if info is None or (info.is_dir() and symlink is None):
+                os.makedirs(targetPath, exist_ok=True)
+                continue
+
+            os.makedirs(os.path.dirname(targetPath), exist_ok=True)
+            if os.path.lexists(targetPath):
+                os.remove(targetPath)
+
+            if symlink is not None:
+                os.symlink(symlink, targetPath)
+            else:
+                with self.zip.open(info, pwd=self.pwd) as member, \
+                    open(targetPath, "wb") as file:
+                    shutil.copyfileobj(member, file, self.bufferSize)
+                date = time.mktime(info.date_time + (0, 0, -1))
+                os.utime(targetPath, (date, date))
+            extracted += 1
+
+        return extracted
+
+
+class PathTree():
+    #  Node statuses
+    SAME = 0
+    NEW = 1
+    REMOVED = 2
+    MODIFIED = 3
+    ERROR = 4
+    #  Report statuses of node statuses
+    statusNames = ("same", "new", "removed", "modified", "error")
+    #  Status flag of directory nodes
+    DIR = 0x80
+
+    def __init__(self):
+        '''
+        Compact tree of relative paths. Each node keeps only
+        its name component, interned so that repeated names
+        are stored once, index of the parent node and status
+        byte. Full paths are built on demand
+        '''
+        self.names = []
+        self.parents = array.array("i")
+        self.status = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, parent: int, name: str, status: int, isDir: bool) -> int:
+        '''
+        Add node
+
+        Args:
+            parent (int): Parent node index, -1 for root children
+            name (str): Name component
+            status (int): Node status
+            isDir (bool): Node is directory
+
+        Returns:
+            int: Node index
+        '''
+        self.names.append(sys.intern(name))
+        self.parents.append(parent)
+        self.status.append(status | self.DIR if isDir else status)
+        return len(self.names) - 1
+
+    def is_dir(self, node: int) -> bool:
+        return bool(self.status[node] & self.DIR)
+
+    def get_status(self, node: int) -> int:
+        return self.status[node] & ~self.DIR
+
+    def set_status(self, node: int, status: int):
+        self.status[node] = self.status[node] & self.DIR | status
+
+    def path(self, node: int) -> str:
+        '''
+        Build node path relative to the tree root
+
+        Args:
+            node (int): Node index, -1 for root
+
+        Returns:
+            str: Path in format "subdir/name",
+                directory paths end with os.sep
+        '''
+        if node < 0:
+            return ""
+
+        parts = []
+        isDir = self.is_dir(node)
+        while node >= 0:
+            parts.append(self.names[node])
+            node = self.parents[node]
+        parts.reverse()
+
+        path = os.sep.join(parts)
+        return f"{path}{os.sep}" if isDir else path
+
+    def select(self, status: int) -> Iterator[int]:
+        '''
+        Iterate over nodes with status
+
+        Args:
+            status (int): Node status
+
+        Yields:
+            int: Node index
+        '''
+        for node, value in enumerate(self.status):
+            if value & ~self.DIR == status:
+                yield node
+
+
+class ScanCmp(CmpProgress, CmpMoves):
+    def __init__(
+        self,
+        leftPath: str,
+        rightPath: str,
+        ignore: list[str] = None,
+        verify: str = "full",
+        hashCache: "HashCache" = None,
+        leftEntries: dict[str, os.DirEntry] | None = None,
+        leftErrors: list[str] = None,
+        stats: CmpStats | None = None,
+        onEntry: Callable[[str, str], None] | None = None,
+        progressbar: bool = False
+    ):
+        '''
+        Compare directories scanned with scan_tree. Left scan
+        can be shared by comparisons with several backups, so
+        left directory is listed once. Results have the same
+        format as in DirCmp
+
+        Args:
+            leftPath (str): Left directory path
+            rightPath (str): Right directory path
+            ignore (list[str], optional): List of names to ignore.
+                Defaults to filecmp.DEFAULT_IGNORES.
+            verify (str, optional): Most accurate tier of files
+                comparison, one of FileCmp.levels. Defaults to "full".
+            hashCache (HashCache, optional): Cache of left directory
+                files checksums. Defaults to None.
+            leftEntries (dict[str, os.DirEntry] | None, optional):
+                leftPath scanned with scan_tree. Defaults to None,
+                scan leftPath.
+            leftErrors (list[str], optional): Subdirectories that
+                couldn't be listed when scanning leftEntries.
+                Defaults to None.
+            stats (CmpStats | None, optional): Counters to update.
+                Defaults to None.
+            onEntry (Callable[[str, str], None] | None, optional):
+                Called with status and name of each new, modified,
+                removed and error entry as it's found.
+                Defaults to None.
+            progressbar (bool, optional): Render progress bar while
+                running or not. Defaults to False.
+        '''
+        self.left = leftPath
+        self.right = rightPath
+        self.ignore = filecmp.DEFAULT_IGNORES if ignore is None else ignore
+        self.hashCache = hashCache
+        self.leftEntries = leftEntries
+        self.leftErrors = leftErrors or []
+        self.comparator = FileCmp(verify, hashCache, stats)
+        self.onEntry = onEntry
+        self.progressbar = progressbar
+
+        if progressbar:
+            self.start_progressbar(
+                self.comparator.stats, self.left, self.ignore
+            )
+
+        self.left_only = {}
+        self.right_only = {}
+        self.diff_files = []
+        self.same_files = []
+        self.funny_files = []
+
+        try:
+            self.compare()
+        except BaseException:
+            #  Comparison is lost, so progress bar is finished here
+            self.finish_progressbar()
+            raise
+
+    def __enter__(self) -> "ScanCmp":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.finish_progressbar()
+
+    def __repr__(self) -> str:
+        return (
+            "scancmp("
+            f"leftPath=\"{self.left}\", "
+            f"rightPath=\"{self.right}\", "
+            f"ignore={self.ignore}, "
+            f"verify=\"{self.comparator.verify}\", "
+            f"progressbar={self.progressbar}"
+            ")"
+        )
+
+    @property
+    def resolved(self) -> dict[str, int]:
+        '''
+        Number of files resolved by each comparison tier
+        '''
+        return self.comparator.resolved
+
+    def compare(self):
+        '''
+        Compare scanned directories
+        '''
+        errors = list(self.leftErrors)
+        left = self.leftEntries
+        if left is None:
+            left = scan_tree(self.left, self.ignore, errors)
+        right = scan_tree(self.right, self.ignore, errors)
+
+        scanned = right if self.leftEntries else (*left, *right)
+        self.comparator.stats.add(
+            dirs=sum(name.endswith(os.sep) for name in scanned)
+        )
+
+        for name in left.keys() - right.keys():
+            self.left_only[name] = os.path.join(
+                self.left, os.path.dirname(name.rstrip(os.sep))
+            )
+            self.emit("removed", name)
+        self.comparator.stats.skip(map(left.__getitem__, self.left_only))
+        for name in right.keys() - left.keys():
+            self.right_only[name] = os.path.join(
+                self.right, os.path.dirname(name.rstrip(os.sep))
+            )
+            self.emit("new", name)
+
+        for name in sorted(left.keys() & right.keys()):
+            if name.endswith(os.sep):
+                continue
+            leftEntry, rightEntry = left[name], right[name]
+            try:
+                if leftEntry.is_symlink() != rightEntry.is_symlink():
+                    #  Regular file replaced with symlink or the other way
+                    same = self.comparator.resolve("stat", False)
+                    self.comparator.stats.skip([leftEntry])
+                elif leftEntry.is_symlink():
+                    same = os.readlink(leftEntry.path) == os.readlink(rightEntry.path)
+                    self.comparator.stats.skip([leftEntry])
+                else:
+                    same = self.comparator.compare(
+                        leftEntry.path, rightEntry.path, name
+                    )
+            except OSError:
+                self.comparator.stats.skip([leftEntry])
+                self.funny_files.append(name)
+                self.emit("error", name)
+                continue
+            if same:
+                self.same_files.append(name)
+            else:
+                self.diff_files.append(name)
+                self.emit("modified", name)
+
+        for name in errors:
+            self.funny_files.append(name)
+            self.emit("error", name)
+
+
+class SortCmp(CmpProgress):
+    #  Number of records sorted in memory before spilling to disk
+    runSize = 1000000
+    #  Run record: size, mtime_ns, path length, followed by the path.
+    #  Size is -1 for directories and other non-regular files
+    record = "<qqH"
+    #  Report sections in the order they are written
+    sections = ("New", "Modified", "Removed", "Error")
+
+    def __init__(
+        self,
+        leftPath: str,
+        rightPath: str,
+        ignore: list[str] = None,
+        verify: str = "full",
+        tempDir: str | None = None,
+        onEntry: Callable[[str, str], None] | None = None,
+        progressbar: bool = False
+    ):
+        '''
+        Out-of-core directories comparison for very large trees
+
+        Each tree is streamed into sorted runs of records on disk,
+        the runs are merged and the two sorted streams are joined
+        by path. Report sections are written to disk as well, so
+        memory use doesn't depend on the number of files. Hash
+        cache isn't supported, since it keeps all entries in memory
+
+        Args:
+            leftPath (str): Left directory path
+            rightPath (str): Right directory path
+            ignore (list[str], optional): List of names to ignore.
+                Defaults to filecmp.DEFAULT_IGNORES.
+            verify (str, optional): Most accurate tier of files
+                comparison, one of FileCmp.levels. Defaults to "full".
+            tempDir (str | None, optional): Directory for runs and
+                report sections. Defaults to the system temp directory.
+            onEntry (Callable[[str, str], None] | None, optional):
+                Called with status and name of each new, modified,
+                removed and error entry as it's found.
+                Defaults to None.
+            progressbar (bool, optional): Render progress bar while
+                running or not. Defaults to False.
+        '''
+        self.left = leftPath
+        self.right = rightPath
+        self.ignore = filecmp.DEFAULT_IGNORES if ignore is None else ignore
+        self.comparator = FileCmp(verify)
+        self.onEntry = onEntry
+        self.progressbar = progressbar
+        self.counts = dict.fromkeys(self.sections, 0)
+
+        self._tempDir = tempfile.TemporaryDirectory(dir=tempDir)
+
+        if progressbar:
+            self.start_progressbar(
+                self.comparator.stats, self.left, self.ignore
+            )
+
+        try:
+            self.compare()
+        except BaseException:
+            #  Comparison is lost, so progress bar is finished here
+            self.finish_progressbar()
+            self.close()
+            raise
+
+    def __enter__(self) -> "SortCmp":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.finish_progressbar()
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            "sortcmp("
+            f"leftPath=\"{self.left}\", "
+            f"rightPath=\"{self.right}\", "
+            f"ignore={self.ignore}, "
+            f"verify=\"{self.comparator.verify}\", "
+            f"progressbar={self.progressbar}"
+            ")"
+        )
+
+    @property
+    def resolved(self) -> dict[str, int]:
+        '''
+        Number of files resolved by each comparison tier
+        '''
+        return self.comparator.resolved
+
+    def close(self):
+        '''
+        Remove runs and report sections from disk
+        '''
+        self._tempDir.cleanup()
+
+    def section_path(self, title: str) -> str:
+        return os.path.join(self._tempDir.name, f"{title.lower()}.txt")
+
+    def section_names(self, title: str) -> Iterator[str]:
+        '''
+        Read names of report section back from disk
+
+        Args:
+            title (str): Section title
+
+        Yields:
+            Iterator[str]: Names in the DirCmp format
+        '''
+        if not self.counts[title]:
+            return
+
+        with open(
+            self.section_path(title),
+            "r",
+            encoding="utf-8",
+            errors="surrogateescape"
+        ) as section:
+            for line in section:
+                yield line[4:].rstrip("\n")
+
+    def compare(self):
+        '''
+        Merge-join sorted trees and write report sections
+        '''
+        self.errors = []
+        left = self.sorted_records(self.left, "left")
+        right = self.sorted_records(self.right, "right")
+
+        outputs = dict(
+            (
+                title,
+                open(
+                    self.section_path(title),
+                    "w",
+                    encoding="utf-8",
+                    errors="surrogateescape"
+                )
+            )
+            for title in self.sections
+        )
+
+        def write(title: str, name: bytes):
+            name = os.fsdecode(name)
+            self.counts[title] += 1
+            print(f"    {name}", file=outputs[title])
+            self.emit(title.lower(), name)
+
+        try:
+            leftRecord = next(left, None)
+            rightRecord = next(right, None)
+
+            while leftRecord is not None or rightRecord is not None:
+                if rightRecord is None or (
+                    leftRecord is not None and leftRecord[0] < rightRecord[0]
+                ):
+                    write("Removed", leftRecord[0])
+                    self.comparator.stats.add(processed=max(leftRecord[1], 0))
+                    leftRecord = next(left, None)
+                elif leftRecord is None or rightRecord[0] < leftRecord[0]:
+                    write("New", rightRecord[0])
+                    rightRecord = next(right, None)
+                else:
+                    title = self.compare_records(leftRecord, rightRecord)
+                    if title is not None:
+                        write(title, leftRecord[0])
+                    leftRecord = next(left, None)
+                    rightRecord = next(right, None)
+
+            for name in self.errors:
+                write("Error", os.fsencode(name))
+
+        finally:
+            for output in outputs.values():
+                output.close()
+
+    def compare_records(self, left: tuple, right: tuple) -> str | None:
+        '''
+        Compare files present in both trees
+
+        Args:
+            left (tuple): Left record (path, size, mtime_ns)
+            right (tuple): Right record (path, size, mtime_ns)
+
+        Returns:
+            str | None: Report section or None if files are the same
+        '''
+        name = os.fsdecode(left[0])
+        if name.endswith(os.sep):
+            return None
+        #  Regular file replaced with symlink or the other way
+        if (left[1] < 0) != (right[1] < 0):
+            self.comparator.resolve("stat", False)
+            return "Modified"
+        #  Non-regular files are compared as symlinks
+        if left[1] < 0:
+            try:
+                same = (
+                    os.readlink(os.path.join(self.left, name))
+                    == os.readlink(os.path.join(self.right, name))
+                )
+            except OSError:
+                return "Error"
+            return None if same else "Modified"
+        if left[1] != right[1]:
+            self.comparator.resolve("stat", False)
+            return "Modified"
+
+        try:
+            same = self.comparator.compare(
+                os.path.join(self.left, name),
+                os.path.join(self.right, name),
+                name
+            )
+        except OSError:
+            self.comparator.stats.add(processed=left[1])
+            return "Error"
+        return None if same else "Modified"
+
+    def sorted_records(self, rootPath: str, side: str) -> Iterator[tuple]:
+        '''
+        Stream tree records sorted by path, spilling
+        sorted runs to disk when they don't fit in memory
+
+        Args:
+            rootPath (str): Directory path
+            side (str): Runs filename prefix
+
+        Returns:
+            Iterator[tuple]: Records (path, size, mtime_ns)
+        '''
+        runs = []
+        records = []
+
+        for name, entry in iter_tree(rootPath, self.ignore, self.errors):
+            try:
+                fileStat = entry.stat(follow_symlinks=False)
+            except OSError:
+                self.errors.append(name)
+                continue
+            size = fileStat.st_size if stat.S_ISREG(fileStat.st_mode) else -1
+            records.append((os.fsencode(name), size, fileStat.st_mtime_ns))
+
+            if len(records) >= self.runSize:
+                runs.append(self.write_run(records, f"{side}{len(runs)}"))
+                records = []
+
+        records.sort()
+        if not runs:
+            return iter(records)
+
+        runs.append(self.write_run(records, f"{side}{len(runs)}"))
+        return heapq.merge(*map(self.read_run, runs))
+
+    def write_run(self, records: list[tuple], name: str) -> str:
+        '''
+        Sort records and write them to disk
+
+        Args:
+            records (list[tuple]): Records (path, size, mtime_ns)
+            name (str): Run filename
+
+        Returns:
+            str: Run filepath
+        '''
+        records.sort()
+        path = os.path.join(self._tempDir.name, f"{name}.run")
+
+        with open(path, "wb") as file:
+            for filename, size, mtime in records:
+                file.write(struct.pack(self.record, size, mtime, len(filename)))
+                file.write(filename)
+
+        return path
+
+    def read_run(self, path: str) -> Iterator[tuple]:
+        '''
+        Read sorted run from disk
+
+        Args:
+            path (str): Run filepath
+
+        Yields:
+            tuple: Records (path, size, mtime_ns)
+        '''
+        headerSize = struct.calcsize(self.record)
+
+        with open(path, "rb") as file:
+            while header := file.read(headerSize):
+                size, mtime, length = struct.unpack(self.record, header)
+                yield file.read(length), size, mtime
+
+
+class HashCache():
+    #  Strong hash stored next to CRC32, same as archiver manifests use
+    algorithm = "sha256"
+    #  Cache file layout: magic, then records followed by the path
+    magic = b"HCACHE01"
+    record = "<QqQI32sH"
+
+    def __init__(self, rootPath: str, cachePath: str | None = None):
+        '''
+        Persistent cache of files checksums in a directory tree.
+        Checksums are reused while file size, mtime and inode
+        stay the same
+
+        Entries are validated by os.stat on every lookup and the
+        cache file is replaced atomically, so concurrent runs can
+        only lose each other updates, never read wrong checksums
+
+        Args:
+            rootPath (str): Directory, which files are cached
+            cachePath (str | None, optional): Cache file path.
+                Defaults to the user cache directory.
+        '''
+        self.rootPath = os.path.abspath(rootPath)
+        if cachePath is None:
+            cachePath = self.default_path(self.rootPath)
+        self.cachePath = cachePath
+
+        #  {"subdir/name": (size, mtime_ns, inode, crc32, digest)}
+        self.entries = {}
+        self._used = set()
+        #  Files being read: {"subdir/name": threading.Event}
+        self._reading = {}
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def __repr__(self) -> str:
+        return (
+            "HashCache("
+            f"rootPath=\"{self.rootPath}\", "
+            f"cachePath=\"{self.cachePath}\""
+            ")"
+        )
+
+    @staticmethod
+    def default_path(rootPath: str) -> str:
+        '''
+        Cache file path for directory in the user cache directory
+
+        Args:
+            rootPath (str): Absolute directory path
+
+        Returns:
+            str: Cache file path
+        '''
+        if os.name == "nt":
+            cacheDir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+        else:
+            cacheDir = os.environ.get(
+                "XDG_CACHE_HOME", os.path.expanduser("~/.cache")
+            )
+        name = hashlib.sha1(os.fsencode(rootPath)).hexdigest()
+        return os.path.join(cacheDir, "compare_backups", f"{name}.cache")
+
+    def load(self):
+        '''
+        Read cache file, broken or missing cache is treated as empty
+        '''
+        try:
+            with open(self.cachePath, "rb") as file:
+                data = file.read()
+        except OSError:
+            return
+
+        if not data.startswith(self.magic):
+            return
+
+        entries = {}
+        offset = len(self.magic)
+        recordSize = struct.calcsize(self.record)
+
+        try:
+            while offset < len(data):
+                size, mtime, inode, crc, digest, length = struct.unpack_from(
+                    self.record, data, offset
+                )
+                offset += recordSize
+                name = data[offset:offset+length].decode(
+                    "utf-8", "surrogateescape"
+                )
+                offset += length
+                entries[name] = (size, mtime, inode, crc, digest.hex())
+        except struct.error:
+            return
+
+        self.entries = entries
+
+    def save(self):
+        '''
+        Write entries looked up since the cache was loaded, so
+        files that no longer exist are dropped. Errors are ignored
+        '''
+        with self._lock:
+            data = bytearray(self.magic)
+            for name in self._used:
+                entry = self.entries.get(name)
+                if entry is None:
+                    continue
+                size, mtime, inode, crc, digest = entry
+                encoded = name.encode("utf-8", "surrogateescape")
+                data += struct.pack(
+                    self.record,
+                    size,
+                    mtime,
+                    inode,
+                    crc,
+                    bytes.fromhex(digest),
+                    len(encoded)
+                )
+                data += encoded
+
+        tempPath = f"{self.cachePath}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cachePath), exist_ok=True)
+            with open(tempPath, "wb") as file:
+                file.write(data)
+            os.replace(tempPath, self.cachePath)
+        except OSError:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+
+    def cached(
+        self, name: str, fileStat: os.stat_result
+    ) -> tuple[int, str] | None:
+        '''
+        Get cached checksums without reading file
+
+        Args:
+            name (str): File name relative to rootPath
+            fileStat (os.stat_result): File stat
+
+        Returns:
+            tuple[int, str] | None: CRC32 and hex digest or
+                None if file has changed since checksums were cached
+        '''
+        key = (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino)
+        with self._lock:
+            self._used.add(name)
+            entry = self.entries.get(name)
+        if entry is not None and entry[:3] == key:
+            return entry[3], entry[4]
+        return None
+
+    def store(
+        self, name: str, fileStat: os.stat_result, crc: int, digest: str
+    ):
+        '''
+        Cache checksums computed while file was read elsewhere,
+        unless file was modified while reading
+
+        Args:
+            name (str): File name relative to rootPath
+            fileStat (os.stat_result): File stat before reading
+            crc (int): CRC32
+            digest (str): Hex digest of algorithm
+        '''
+        key = (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino)
+        try:
+            newStat = os.stat(os.path.join(self.rootPath, name))
+        except OSError:
+            return
+        if key == (newStat.st_size, newStat.st_mtime_ns, newStat.st_ino):
+            with self._lock:
+                self._used.add(name)
+                self.entries[name] = (*key, crc, digest)
+
+    def checksums(
+        self, name: str, fileStat: os.stat_result | None = None
+    ) -> tuple[int, str]:
+        '''
+        Get file CRC32 and hash, reading file only if it
+        has changed since checksums were cached
+
+        Args:
+            name (str): File name relative to rootPath
+            fileStat (os.stat_result | None, optional): File
+                stat if it is already known. Defaults to None.
+
+        Returns:
+            tuple[int, str]: CRC32 and hex digest
+        '''
+        path = os.path.join(self.rootPath, name)
+        if fileStat is None:
+            fileStat = os.stat(path)
+        key = (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino)
+
+        with self._lock:
+            self._used.add(name)
+            entry = self.entries.get(name)
+            if entry is not None and entry[:3] == key:
+                return entry[3], entry[4]
+            #  Wait for other thread reading the same file
+            reading = self._reading.get(name)
+            if reading is None:
+                self._reading[name] = threading.Event()
+
+        if reading is not None:
+            reading.wait()
+            with self._lock:
+                entry = self.entries.get(name)
+            if entry is not None and entry[:3] == key:
+                return entry[3], entry[4]
+            return file_checksums(path, self.algorithm)
+
+        try:
+            crc, digest = file_checksums(path, self.algorithm)
+
+            #  Don't cache checksums of a file modified while reading
+            newStat = os.stat(path)
+            if key == (newStat.st_size, newStat.st_mtime_ns, newStat.st_ino):
+                with self._lock:
+                    self.entries[name] = (*key, crc, digest)
+        finally:
+            with self._lock:
+                self._reading.pop(name).set()
+
+        return crc, digest
+
+
+class Inotify():
+    #  inotify_event header: wd, mask, cookie, name length
+    eventHeader = "iIII"
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self):
+        '''
+        Minimal inotify binding through libc
+
+        Raises:
+            OSError: inotify is not available
+        '''
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def __enter__(self) -> "Inotify":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def close(self):
+        os.close(self.fd)
+
+    def add_watch(self, path: str, mask: int) -> int:
+        '''
+        Watch path, watching the same inode again
+        returns its existing watch descriptor
+
+        Args:
+            path (str): Directory path
+            mask (int): Events to watch
+
+        Raises:
+            OSError: Watch can't be added, ENOSPC
+                if watches limit is reached
+
+        Returns:
+            int: Watch descriptor
+        '''
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self) -> Iterator[tuple[int, int, str]]:
+        '''
+        Wait for events and read them
+
+        Yields:
+            tuple[int, int, str]: Watch descriptor, mask and name
+        '''
+        data = os.read(self.fd, 64 * 1024)
+        headerSize = struct.calcsize(self.eventHeader)
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, cookie, length = struct.unpack_from(
+                self.eventHeader, data, offset
+            )
+            offset += headerSize
+            name = data[offset:offset+length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+
+class SnapshotEntry():
+    def __init__(self, rootPath: str, name: str, isDir: bool, isSymlink: bool):
+        '''
+        Directory entry restored from ChangeJournal snapshot,
+        with the os.DirEntry methods used by comparisons
+
+        Args:
+            rootPath (str): Directory path
+            name (str): Entry name in format "subdir/name"
+            isDir (bool): Entry is directory
+            isSymlink (bool): Entry is symbolic link
+        '''
+        self.name = os.path.basename(name.rstrip(os.sep))
+        self.path = os.path.join(rootPath, name.rstrip(os.sep))
+        self._isDir = isDir
+        self._isSymlink = isSymlink
+        self._stat = None
+
+    def __repr__(self) -> str:
+        return f"<SnapshotEntry '{self.name}'>"
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        if follow_symlinks and self._isSymlink:
+            return os.path.isdir(self.path)
+        return self._isDir
+
+    def is_symlink(self) -> bool:
+        return self._isSymlink
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if follow_symlinks and self._isSymlink:
+            return os.stat(self.path)
+        if self._stat is None:
+            self._stat = os.lstat(self.path)
+        return self._stat
+
+
+class ChangeJournal():
+    #  Events marking entry as changed
+    mask = (
+        Inotify.IN_MODIFY
+        | Inotify.IN_ATTRIB
+        | Inotify.IN_CLOSE_WRITE
+        | Inotify.IN_MOVED_FROM
+        | Inotify.IN_MOVED_TO
+        | Inotify.IN_CREATE
+        | Inotify.IN_DELETE
+        | Inotify.IN_DELETE_SELF
+        | Inotify.IN_ONLYDIR
+        | Inotify.IN_DONT_FOLLOW
+    )
+
+    def __init__(self, rootPath: str, journalPath: str | None = None):
+        '''
+        Journal of paths changed in a directory tree since
+        the last comparison, written by watch() running as
+        a daemon and consumed by scan()
+
+        Journal is a text file with records "changed name".
+        Records "start" and "overflow" mean that some changes
+        were missed, then the next scan is a full scan. The
+        tree state after the last scan is kept in a snapshot,
+        which is updated from the journal
+
+        Args:
+            rootPath (str): Watched directory
+            journalPath (str | None, optional): Journal path,
+                snapshot and pid files are stored next to it.
+                Defaults to the user cache directory.
+        '''
+        self.rootPath = os.path.abspath(rootPath)
+        if journalPath is None:
+            cachePath = HashCache.default_path(self.rootPath)
+            journalPath = f"{os.path.splitext(cachePath)[0]}.journal"
+        self.journalPath = journalPath
+        self.snapshotPath = f"{journalPath}.snapshot"
+        self.pidPath = f"{journalPath}.pid"
+
+    def __repr__(self) -> str:
+        return (
+            "ChangeJournal("
+            f"rootPath=\"{self.rootPath}\", "
+            f"journalPath=\"{self.journalPath}\""
+            ")"
+        )
+
+    def append(self, records: list[str]):
+        '''
+        Append records to journal. File is reopened on each
+        write, so that scan() can take it away by renaming
+
+        Args:
+            records (list[str]): Records
+        '''
+        with open(
+            self.journalPath, "a", encoding="utf-8", errors="surrogateescape"
+        ) as journal:
+            journal.writelines(f"{record}\n" for record in records)
+
+    def watch(
+        self, ignore: list[str] = [], ready: threading.Event | None = None
+    ):
+        '''
+        Follow the tree with inotify and write changes to
+        journal, runs until interrupted. Linux only
+
+        Args:
+            ignore (list[str], optional): Names to skip. Defaults to [].
+            ready (threading.Event | None, optional): Set when the
+                whole tree is watched. Defaults to None.
+
+        Raises:
+            OSError: inotify is not available
+        '''
+        os.makedirs(os.path.dirname(self.journalPath), exist_ok=True)
+        with open(self.pidPath, "w") as pidFile:
+            pidFile.write(str(os.getpid()))
+
+        #  Changes before watches are added are unknown
+        self.append(["start"])
+        watches = {}
+
+        with Inotify() as inotify:
+            def add_watches(name: str):
+                #  Watch directory "name/" and its subdirectories
+                path = os.path.join(self.rootPath, name)
+                subdirs = [name, *(
+                    f"{name}{subname}"
+                    for subname, entry in iter_tree(path, ignore, [])
+                    if subname.endswith(os.sep)
+                )]
+                for subdir in subdirs:
+                    path = os.path.join(self.rootPath, subdir)
+                    try:
+                        watches[inotify.add_watch(path, self.mask)] = subdir
+                    except FileNotFoundError:
+                        pass
+
+            try:
+                add_watches("")
+            except OSError:
+                self.append(["overflow"])
+                raise
+
+            if ready is not None:
+                ready.set()
+
+            try:
+                while True:
+                    records = []
+                    for wd, mask, name in inotify.read_events():
+                        if mask & Inotify.IN_Q_OVERFLOW:
+                            records.append("overflow")
+                            continue
+                        if mask & Inotify.IN_IGNORED:
+                            watches.pop(wd, None)
+                            continue
+                        if wd not in watches or name in ignore:
+                            continue
+
+                        name = os.path.join(watches[wd], name)
+                        if mask & Inotify.IN_ISDIR:
+                            name += os.sep
+                            if mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO):
+                                try:
+                                    add_watches(name)
+                                except OSError:
+                                    records.append("overflow")
+                        records.append(f"changed {name}")
+
+                    if records:
+                        self.append(list(dict.fromkeys(records)))
+            finally:
+                try:
+                    os.remove(self.pidPath)
+                except OSError:
+                    pass
+
+    def is_watched(self) -> bool:
+        '''
+        Check that watch() is running for the tree
+
+        Returns:
+            bool: Watcher process is alive
+        '''
+        try:
+            with open(self.pidPath, "r") as pidFile:
+                os.kill(int(pidFile.read()), 0)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def take(self) -> set[str] | None:
+        '''
+        Take changes from journal, starting a new one
+
+        Returns:
+            set[str] | None: Changed names or None if
+                changes were missed and full scan is needed
+        '''
+        if not self.is_watched():
+            return None
+
+        takenPath = f"{self.journalPath}.{os.getpid()}.taken"
+        try:
+            os.replace(self.journalPath, takenPath)
+        except FileNotFoundError:
+            return set()
+        except OSError:
+            return None
+
+        changes = set()
+        try:
+            with open(
+                takenPath, "r", encoding="utf-8", errors="surrogateescape"
+            ) as journal:
+                for record in journal:
+                    record = record.rstrip("\n")
+                    if not record.startswith("changed "):
+                        return None
+                    changes.add(record[len("changed "):])
+        except OSError:
+            return None
+        finally:
+            try:
+                os.remove(takenPath)
+            except OSError:
+                pass
+
+        return changes
+
+    def load_snapshot(self) -> dict[str, tuple[bool, bool]] | None:
+        '''
+        Read tree snapshot
+
+        Returns:
+            dict[str, tuple[bool, bool]] | None: Names in format
+                {"subdir/name": (isDir, isSymlink)} or None if
+                there is no snapshot
+        '''
+        names = {}
+        try:
+            with open(
+                self.snapshotPath, "r", encoding="utf-8", errors="surrogateescape"
+            ) as snapshot:
+                for line in snapshot:
+                    kind, name = line.rstrip("\n").split(" ", 1)
+                    names[name] = (kind == "d", kind == "l")
+        except (OSError, ValueError):
+            return None
+        return names
+
+    def save_snapshot(self, entries: dict):
+        '''
+        Write tree snapshot atomically, errors are ignored
+
+        Args:
+            entries (dict): Entries in scan_tree format
+        '''
+        tempPath = f"{self.snapshotPath}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshotPath), exist_ok=True)
+            with open(
+                tempPath, "w", encoding="utf-8", errors="surrogateescape"
+            ) as snapshot:
+                for name, entry in entries.items():
+                    if entry.is_symlink():
+                        kind = "l"
+                    elif name.endswith(os.sep):
+                        kind = "d"
+                    else:
+                        kind = "f"
+                    snapshot.write(f"{kind} {name}\n")
+            os.replace(tempPath, self.snapshotPath)
+        except OSError:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+
+    def scan(
+        self,
+        ignore: list[str],
+        errors: list[str] = None,
+        previous: dict[str, os.DirEntry] | None = None
+    ) -> dict[str, os.DirEntry]:
+        '''
+        Scan tree, listing only changed paths when journal
+        is complete, otherwise the whole tree
+
+        Args:
+            ignore (list[str]): Names to skip together with their contents
+            errors (list[str], optional): List, where to write
+                subdirectories that couldn't be listed. Defaults to None.
+            previous (dict[str, os.DirEntry] | None, optional): Entries
+                returned by the last scan, kept in memory. Unchanged
+                entries are reused instead of the snapshot ones.
+                Defaults to None.
+
+        Returns:
+            dict[str, os.DirEntry]: Entries in scan_tree format
+        '''
+        changes = self.take()
+        if changes is None:
+            names = None
+        elif previous is not None:
+            names = previous
+        else:
+            names = self.load_snapshot()
+        if names is not None:
+            changes = set(name.rstrip(os.sep) for name in changes)
+
+        if names is None:
+            self.fullScan = True
+            entries = scan_tree(self.rootPath, ignore, errors)
+            self.save_snapshot(entries)
+            return entries
+
+        self.fullScan = False
+        entries = {}
+
+        #  Drop changed names with their contents, then list them again
+        for name, entry in names.items():
+            parent = name.rstrip(os.sep)
+            while parent and parent not in changes:
+                parent = os.path.dirname(parent)
+            if parent:
+                continue
+            if names is previous:
+                entries[name] = entry
+            else:
+                entries[name] = SnapshotEntry(self.rootPath, name, *entry)
+
+        for name in changes:
+            path = os.path.join(self.rootPath, name)
+            parent = os.path.dirname(name)
+            #  Skip names in removed dirs and dirs listed again
+            if parent and f"{parent}{os.sep}" not in entries:
+                continue
+            try:
+                fileStat = os.lstat(path)
+            except OSError:
+                continue
+
+            if stat.S_ISDIR(fileStat.st_mode):
+                name = f"{name}{os.sep}"
+                entries[name] = SnapshotEntry(self.rootPath, name, True, False)
+                for subname, entry in iter_tree(path, ignore, errors):
+                    entries[f"{name}{subname}"] = entry
+            else:
+                entries[name] = SnapshotEntry(
+                    self.rootPath, name, False, stat.S_ISLNK(fileStat.st_mode)
+                )
+
+        self.save_snapshot(entries)
+        return entries
+
+
+class DeltaArchive():
+    #  Member with paths deleted since the base, one per line
+    tombstonesName = "__deleted__"
+
+    def __init__(self, deltaPath: str, preferredEncoding: str = "cp866"):
+        '''
+        Zip with files changed since a backup and tombstones of
+        deleted ones. Applying it to the backup brings the backup
+        to the state of the compared destination
+
+        Members are stored under "<backup name>/" like in full
+        zip backups, tombstones are relative to that folder and
+        use "/" separators, directories end with "/"
+
+        Args:
+            deltaPath (str): Delta zip path
+            preferredEncoding (str, optional): Encoding to use when
+                guessing zip filenames original. Defaults to "cp866".
+        '''
+        self.deltaPath = deltaPath
+        self.preferredEncoding = preferredEncoding
+
+    def __repr__(self) -> str:
+        return (
+            "deltaarchive("
+            f"deltaPath=\"{self.deltaPath}\", "
+            f"preferredEncoding=\"{self.preferredEncoding}\""
+            ")"
+        )
+
+    @staticmethod
+    def changes(compared: CmpProgress) -> tuple[Iterator[str], Iterator[str]]:
+        '''
+        Names to write and names to delete, moved files
+        are written to the new path and deleted at the old one
+
+        Args:
+            compared (CmpProgress): Comparison, destination on the left
+
+        Returns:
+            tuple[Iterator[str], Iterator[str]]: Changed and deleted names
+        '''
+        if isinstance(compared, SortCmp):
+            changed = (
+                *compared.section_names("Removed"),
+                *compared.section_names("Modified")
+            )
+            return changed, compared.section_names("New")
+
+        return (
+            (*compared.left_only, *compared.diff_files),
+            iter(compared.right_only)
+        )
+
+    def write(
+        self, compared: CmpProgress, leftPath: str, rootName: str
+    ) -> tuple[int, int]:
+        '''
+        Write destination files that differ from the backup
+
+        Args:
+            compared (CmpProgress): Comparison, destination on the left
+            leftPath (str): Destination path
+            rootName (str): Backup name, root folder of members
+
+        Returns:
+            tuple[int, int]: Numbers of written and deleted names
+        '''
+        changed, deleted = self.changes(compared)
+        written = 0
+
+        with ZipFile(
+            file=self.deltaPath,
+            mode="w",
+            compression=zipfile.ZIP_DEFLATED,
+            preferredEncoding=self.preferredEncoding,
+            progressbar=False
+        ) as delta:
+            for name in changed:
+                path = os.path.join(leftPath, name)
+                arcname = f"{rootName}/{name.replace(os.sep, '/')}"
+                try:
+                    if name.endswith(os.sep):
+                        delta.mkdir(arcname)
+                    else:
+                        delta.write(path, arcname)
+                except OSError:
+                    #  File was removed after comparison
+                    continue
+                written += 1
+
+            deleted = [name.replace(os.sep, "/") for name in deleted]
+            delta.writestr(
+                self.tombstonesName,
+                "".join(f"{name}\n" for name in deleted).encode(
+                    "utf-8", "surrogateescape"
+                ),
+                zipfile.ZIP_DEFLATED
+            )
+
+        return written, len(deleted)
+
+    def read_tombstones(self, delta: ZipFile) -> set[str]:
+        '''
+        Args:
+            delta (ZipFile): Opened delta
+
+        Returns:
+            set[str]: Deleted names relative to the backup root
+        '''
+        tombstones = delta.read(self.tombstonesName)
+        return set(tombstones.decode("utf-8", "surrogateescape").splitlines())
+
+    def members(
+        self, archive: ZipFile, pwd: bytes | None = None
+    ) -> Iterator[tuple[zipfile.ZipInfo, str, tuple | None]]:
+        '''
+        Archive members with names relative to the root folder
+
+        Args:
+            archive (ZipFile): Delta or backup
+            pwd (bytes | None, optional): Password to decrypt files.
+                Defaults to None.
+
+        Yields:
+            Iterator[tuple[zipfile.ZipInfo, str, tuple | None]]: Member,
+                its name without root folder and symlink target with
+                is directory flag, which is None for anything but symlinks
+        '''
+        for info in archive.infolist():
+            name = info.filename
+            if name == self.tombstonesName or archive.is_manifest(name):
+                continue
+            name = name.partition("/")[2]
+            if not name:
+                continue
+
+            symlink = None
+            #  Symlinks real name handling
+            if os.path.basename(name).startswith("__symlink__"):
+                with archive.open(info, pwd=pwd) as source:
+                    filename, symlink, isdir = (
+                        source.readline().decode().split(",")
+                    )
+                name = f"{os.path.dirname(name)}/{filename}".lstrip("/")
+                symlink = (symlink, isdir == "True")
+
+            yield info, name, symlink
+
+    def apply(self, basePath: str, pwd: bytes | None = None):
+        '''
+        Fold delta into the backup it was made for
+
+        Args:
+            basePath (str): Backup directory or zip path
+            pwd (bytes | None, optional): Password to decrypt
+                backup files. Defaults to None.
+        '''
+        if os.path.splitext(basePath)[1] == ".zip":
+            self.apply_zip(basePath, pwd)
+        else:
+            self.apply_dir(basePath)
+
+    def apply_dir(self, basePath: str):
+        '''
+        Delete tombstones from backup directory, then
+        extract delta members over it
+
+        Args:
+            basePath (str): Backup directory path
+
+        Raises:
+            ValueError: Name in delta points outside of backup,
+                checked for all names before backup is changed
+        '''
+        with ZipFile(
+            file=self.deltaPath,
+            mode="r",
+            preferredEncoding=self.preferredEncoding,
+            progressbar=False
+        ) as delta:
+            tombstones = sorted(self.read_tombstones(delta), reverse=True)
+            members = list(self.members(delta))
+            for name in chain(tombstones, (name for _, name, _ in members)):
+                safe_path(basePath, name)
+            #  Members must not be written through links of delta
+            links = tuple(
+                f"{name.rstrip('/')}/" for _, name, symlink in members
+                if symlink is not None
+            )
+            for _, name, _ in members:
+                if name.startswith(links):
+                    raise ValueError(f"Member \"{name}\" is inside a symlink")
+
+            #  Contents are deleted before their directories
+            for name in tombstones:
+                path = safe_path(basePath, name)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                elif os.path.lexists(path):
+                    os.remove(path)
+
+            for info, name, symlink in members:
+                #  Checked again, as previous members may be links
+                path = safe_path(basePath, name)
+
+                if info.is_dir() and symlink is None:
+                    os.makedirs(path, exist_ok=True)
+                    continue
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                elif os.path.lexists(path):
+                    os.remove(path)
+
+                if symlink is not None:
+                    os.symlink(symlink[0], path, symlink[1])
+                    continue
+
+                with delta.open(info) as source, open(path, "wb") as target:
+                    shutil.copyfileobj(source, target, FileCmp.bufferSize)
+                date = time.mktime((*info.date_time, 0, 0, -1))
+                os.utime(path, (date, date))
+
+    def apply_zip(self, basePath: str, pwd: bytes | None = None):
+        '''
+        Rewrite backup zip with delta members in place of the
+        changed ones and without tombstones. Members are copied
+        without recompression, the backup is replaced at the end
+
+        Args:
+            basePath (str): Backup zip path
+            pwd (bytes | None, optional): Password to decrypt
+                backup files. Defaults to None.
+        '''
+        rootName = os.path.splitext(os.path.basename(basePath))[0]
+        tempPath = f"{basePath}.delta"
+
+        #  Partly written zip is removed, backup stays as it was
+        try:
+            with ZipFile(
+                file=self.deltaPath,
+                mode="r",
+                preferredEncoding=self.preferredEncoding,
+                progressbar=False
+            ) as delta, ZipFile(
+                file=basePath,
+                mode="r",
+                preferredEncoding=self.preferredEncoding,
+                progressbar=False
+            ) as base:
+                deleted = self.read_tombstones(delta)
+                rootDir = base.NameToInfo.get(f"{rootName}/")
+
+                with ZipFile(
+                    file=tempPath,
+                    mode="w",
+                    preferredEncoding=self.preferredEncoding,
+                    progressbar=False,
+                    hashAlgorithm=base.hashAlgorithm
+                ) as target:
+                    if rootDir is not None:
+                        target.copy_member(base, rootDir)
+
+                    for info, name, symlink in self.members(delta):
+                        deleted.add(name)
+                        arcname = info.filename.partition("/")[2]
+                        target.copy_member(
+                            delta, info, f"{rootName}/{arcname}"
+                        )
+
+                    for info, name, symlink in self.members(base, pwd):
+                        #  Deleted name or a name in deleted directory
+                        parts = name.rstrip("/").split("/")
+                        if name in deleted or any(
+                            f"{'/'.join(parts[:depth])}/" in deleted
+                            for depth in range(1, len(parts))
+                        ):
+                            continue
+                        target.copy_member(base, info)
+
+            os.replace(tempPath, basePath)
+        except BaseException:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+            raise
+
+
+class ReportWriter():
+    formats = ("text", "jsonl", "csv")
+    #  Report is written with one syscall per buffer
+    bufferSize = 1024 * 1024
+    csvFields = ("backup", "status", "path", "target")
+
+    def __init__(self, reportFilepath: str, format: str = "text"):
+        '''
+        Buffered comparison report in one of formats:
+            "text": sections of indented paths, each dir is
+                followed by its files
+            "jsonl": {"backup", "status", "path"} object per line,
+                moved files also have "target" path in backup,
+                comparison ends with {"status": "summary"} object,
+                or {"status": "failed", "error"} if it failed
+            "csv": rows of csvFields, with header
+
+        Paths in machine-readable formats are relative to the
+        compared folders and keep the native separator, dirs end
+        with it. Machine-readable formats get modified and error
+        entries while comparison runs, new and removed ones too if
+        moves aren't detected, see entry_writer(). Text sections
+        are sorted, so they are written once comparison finished
+
+        Args:
+            reportFilepath (str): Report path
+            format (str, optional): One of formats.
+                Defaults to "text".
+
+        Raises:
+            ValueError: Unknown format
+        '''
+        if format not in self.formats:
+            raise ValueError(f"Unknown report format \"{format}\"")
+
+        self.reportFilepath = reportFilepath
+        self.format = format
+        self.output = open(
+            reportFilepath,
+            "w",
+            encoding="utf-8",
+            errors="surrogateescape",
+            buffering=self.bufferSize,
+            newline="" if format == "csv" else None
+        )
+        self.backup = None
+        #  Entries of comparisons running at the same time
+        #  are written from their threads
+        self._lock = threading.Lock()
+
+        if format == "csv":
+            self.csv = csv.writer(self.output)
+            self.csv.writerow(self.csvFields)
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            "reportwriter("
+            f"reportFilepath=\"{self.reportFilepath}\", "
+            f"format=\"{self.format}\""
+            ")"
+        )
+
+    def close(self):
+        self.output.close()
+
+    def begin(self, backupDestination: str, backupFilepath: str):
+        '''
+        Start comparison entries
+
+        Args:
+            backupDestination (str): Left path
+            backupFilepath (str): Backup path
+        '''
+        self.backup = backupFilepath
+
+        if self.format == "text":
+            self.output.write(f"( {backupDestination}, {backupFilepath} ):\n\n")
+
+    def write_section(
+        self, title: str, names: Iterator[str], ordered: bool = False
+    ):
+        '''
+        Args:
+            title (str): Section title, status in lower case
+            names (Iterator[str]): Entries names
+            ordered (bool, optional): Names are already in report
+                order, so text format doesn't sort them.
+                Defaults to False.
+        '''
+        if self.format != "text":
+            self.write_entries(self.backup, title.lower(), names)
+        elif ordered:
+            names = iter(names)
+            name = next(names, None)
+            if name is not None:
+                self.output.write(f"{title}:\n    {name}\n")
+                self.output.writelines(f"    {name}\n" for name in names)
+        else:
+            print_files(title, names, self.output)
+
+    def write_moved(self, moved: dict[str, str]):
+        '''
+        Args:
+            moved (dict[str, str]): {"destination name": "backup name"}
+        '''
+        if self.format == "jsonl":
+            with self._lock:
+                self.output.writelines(
+                    "{}\n".format(json.dumps(
+                        dict(
+                            backup=self.backup,
+                            status="moved",
+                            path=old,
+                            target=new
+                        ),
+                        ensure_ascii=False
+                    ))
+                    for old, new in moved.items()
+                )
+        elif self.format == "csv":
+            with self._lock:
+                self.csv.writerows(
+                    (self.backup, "moved", old, new)
+                    for old, new in moved.items()
+                )
+        else:
+            print_files(
+                "Moved",
+                [f"{old} -> {new}" for old, new in moved.items()],
+                self.output
+            )
+
+    def write_entries(self, backup: str, status: str, names: Iterable[str]):
+        '''
+        Write entries in machine-readable format, can be
+        called from several threads
+
+        Args:
+            backup (str): Backup path
+            status (str): Entries status
+            names (Iterable[str]): Entries names
+        '''
+        with self._lock:
+            if self.format == "jsonl":
+                self.output.writelines(
+                    "{}\n".format(json.dumps(
+                        dict(backup=backup, status=status, path=name),
+                        ensure_ascii=False
+                    ))
+                    for name in names
+                )
+            else:
+                self.csv.writerows(
+                    (backup, status, name, "") for name in names
+                )
+
+    def streamed_statuses(self, detectMoves: bool = True) -> frozenset[str]:
+        '''
+        Statuses written while comparison runs. Text sections
+        are sorted and moved files are known only when both new
+        and removed ones are, so they are written after it
+
+        Args:
+            detectMoves (bool, optional): Moves are detected
+                in comparison. Defaults to True.
+
+        Returns:
+            frozenset[str]: Statuses
+        '''
+        if self.format == "text":
+            return frozenset()
+        if detectMoves:
+            return frozenset(("modified", "error"))
+        return frozenset(("new", "modified", "removed", "error"))
+
+    def entry_writer(
+        self, backupFilepath: str, detectMoves: bool = True
+    ) -> Callable[[str, str], None] | None:
+        '''
+        Make onEntry callback of comparison, which writes
+        its entries with streamed_statuses
+
+        Args:
+            backupFilepath (str): Backup path
+            detectMoves (bool, optional): Moves are detected
+                in comparison. Defaults to True.
+
+        Returns:
+            Callable[[str, str], None] | None: Callback or
+                None if nothing is written while comparing
+        '''
+        statuses = self.streamed_statuses(detectMoves)
+        if not statuses:
+            return None
+
+        def write(status: str, name: str):
+            if status in statuses:
+                self.write_entries(backupFilepath, status, (name,))
+
+        return write
+
+    def end(self, counts: dict[str, int], resolved: dict[str, int]) -> str:
+        '''
+        Finish comparison entries with summary
+
+        Args:
+            counts (dict[str, int]): Number of entries by status
+            resolved (dict[str, int]): Number of files resolved
+                by each comparison tier
+
+        Returns:
+            str: Summary in text format
+        '''
+        summary = "( {} )\n( resolved by {} )".format(
+            ", ".join(f"{status}: {count}" for status, count in counts.items()),
+            ", ".join(f"{tier}: {count}" for tier, count in resolved.items())
+        )
+
+        with self._lock:
+            if self.format == "jsonl":
+                record = dict(
+                    backup=self.backup,
+                    status="summary",
+                    **counts,
+                    resolved=resolved
+                )
+                self.output.write(f"{json.dumps(record, ensure_ascii=False)}\n")
+            elif self.format == "text":
+                self.output.write(f"\n{summary}\n")
+
+            self.output.flush()
+        return summary
+
+    def fail(self, error: Exception) -> str:
+        '''
+        Finish comparison entries with error that stopped it,
+        csv row has error message in place of path
+
+        Args:
+            error (Exception): Error
+
+        Returns:
+            str: Summary in text format
+        '''
+        message = f"{type(error).__name__}: {error}"
+
+        with self._lock:
+            if self.format == "jsonl":
+                record = dict(backup=self.backup, status="failed", error=message)
+                self.output.write(f"{json.dumps(record, ensure_ascii=False)}\n")
+            elif self.format == "csv":
+                self.csv.writerow((self.backup, "failed", message, ""))
+            else:
+                self.output.write(f"Failed:\n    {message}\n\n( failed )\n")
+
+            self.output.flush()
+        return f"( failed, {message} )"
+
+
+class BackupFinder():
+    def __init__(
+        self,
+        backupFilename: str,
+        depth: int = 0,
+        timeout: float = 10.0,
+        cachePath: str | None = None,
+        useCache: bool = True
+    ):
+        '''
+        Looks for backup on all drives at the same time, so
+        a spun-down disk or a stale network mount only delays
+        the search by timeout
+
+        Drive results are cached by mount ID with modification
+        times of searched directories. Cached results are used
+        while the same filesystem is mounted and the directories
+        are not changed, which takes stat calls instead of listing
+
+        Args:
+            backupFilename (str): Filename with extension
+            depth (int, optional): Subdirectories levels to search
+                below drive root. Defaults to 0.
+            timeout (float, optional): Seconds to wait for drives
+                to respond. Defaults to 10.0.
+            cachePath (str | None, optional): Cache file path.
+                Defaults to the user cache directory.
+            useCache (bool, optional): Read and write the cache.
+                Defaults to True.
+        '''
+        self.backupFilename = backupFilename
+        self.depth = depth
+        self.timeout = timeout
+        self.useCache = useCache
+        if cachePath is None:
+            cachePath = HashCache.default_path(f"backups:{backupFilename}")
+            cachePath = f"{os.path.splitext(cachePath)[0]}.mounts"
+        self.cachePath = cachePath
+
+    def __repr__(self) -> str:
+        return (
+            "backupfinder("
+            f"backupFilename=\"{self.backupFilename}\", "
+            f"depth={self.depth}, "
+            f"timeout={self.timeout}, "
+            f"cachePath=\"{self.cachePath}\", "
+            f"useCache={self.useCache}"
+            ")"
+        )
+
+    @staticmethod
+    def mount_ids() -> dict[str, str]:
+        '''
+        Mounted filesystems IDs from procfs
+
+        Returns:
+            dict[str, str]: {"mount point": "mount ID:major:minor"},
+                empty if procfs is not available
+        '''
+        mounts = {}
+
+        try:
+            with open("/proc/self/mountinfo", "r") as mountsFile:
+                for mount in mountsFile:
+                    fields = mount.split()
+                    mounts[fields[4]] = f"{fields[0]}:{fields[2]}"
+        except OSError:
+            pass
+
+        return mounts
+
+    def load(self) -> dict[str, dict]:
+        '''
+        Returns:
+            dict[str, dict]: Drives results by mount ID,
+                empty if cache is missing or broken
+        '''
+        if not self.useCache:
+            return {}
+
+        try:
+            with open(self.cachePath, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, cache: dict[str, dict]):
+        '''
+        Write drives results. Errors are ignored
+
+        Args:
+            cache (dict[str, dict]): Drives results by mount ID
+        '''
+        if not self.useCache:
+            return
+
+        tempPath = f"{self.cachePath}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cachePath), exist_ok=True)
+            with open(tempPath, "w", encoding="utf-8") as file:
+                json.dump(cache, file, ensure_ascii=False)
+            os.replace(tempPath, self.cachePath)
+        except OSError:
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+
+    def probe(self, drive: str, cached: dict | None = None) -> dict:
+        '''
+        Search drive for backups, breadth first
+
+        Args:
+            drive (str): Drive path
+            cached (dict | None, optional): Previous result for
+                this drive. Defaults to None.
+
+        Returns:
+            dict: {"drive", "depth", "dirs": {"subdir": mtime_ns},
+                "backups": ["subdir/backup"]}, paths relative
+        '''
+        if (
+            cached is not None
+            and cached["drive"] == drive
+            and cached["depth"] == self.depth
+        ):
+            try:
+                if all(
+                    os.stat(os.path.join(drive, subdir)).st_mtime_ns == mtime
+                    for subdir, mtime in cached["dirs"].items()
+                ):
+                    return cached
+            except OSError:
+                pass
+
+        result = dict(drive=drive, depth=self.depth, dirs={}, backups=[])
+        pending = [("", 0)]
+
+        for subdir, level in pending:
+            path = os.path.join(drive, subdir)
+            try:
+                #  Directory changed while listing is searched again
+                mtime = os.stat(path).st_mtime_ns
+                with os.scandir(path) as entries:
+                    entries = [*entries]
+            except OSError:
+                continue
+            result["dirs"][subdir] = mtime
+
+            for entry in entries:
+                name = os.path.join(subdir, entry.name)
+                if entry.name == self.backupFilename:
+                    result["backups"].append(name)
+                elif (
+                    level < self.depth
+                    and not entry.name.startswith(".")
+                    and entry.is_dir(follow_symlinks=False)
+                ):
+                    pending.append((name, level + 1))
+
+        return result
+
+    def find(self, drives: set[str]) -> list[str]:
+        '''
+        Probe drives concurrently, drives which didn't
+        respond within timeout are skipped
+
+        Args:
+            drives (set[str]): Drives paths
+
+        Returns:
+            list[str]: Backups paths
+        '''
+        cache = self.load()
+        mountIds = self.mount_ids()
+        results = {}
+
+        def probe(drive: str):
+            results[drive] = self.probe(drive, cache.get(mountIds.get(drive)))
+
+        #  Threads blocked on unresponsive drives don't delay exit
+        threads = {
+            drive: threading.Thread(target=probe, args=(drive,), daemon=True)
+            for drive in sorted(drives)
+        }
+        for thread in threads.values():
+            thread.start()
+
+        deadline = time.monotonic() + self.timeout
+        for drive, thread in threads.items():
+            thread.join(max(0, deadline - time.monotonic()))
+            if thread.is_alive():
+                print(f"Skipped {drive}, drive is not responding")
+
+        #  Keep results of mounted drives only
+        mounted = set(mountIds.values())
+        cache = {
+            mountId: result
+            for mountId, result in cache.items()
+            if mountId in mounted
+        }
+        backups = []
+
+        for drive in threads:
+            result = results.get(drive)
+            if result is None:
+                continue
+            if drive in mountIds:
+                cache[mountIds[drive]] = result
+            backups.extend(
+                os.path.join(drive, backup) for backup in result["backups"]
+            )
+
+        self.save(cache)
+        return backups
+
+
+def scan_tree(
+    rootPath: str, ignore: list[str], errors: list[str] = None
+) -> dict[str, os.DirEntry]:
+    '''
+    Recursively list directory entries, without following symlinks
+
+    Args:
+        rootPath (str): Directory path
+        ignore (list[str]): Names to skip together with their contents
+        errors (list[str], optional): List, where to write
+            subdirectories that couldn't be listed. Defaults to None.
+
+    Returns:
+        dict[str, os.DirEntry]: Entries in format {"subdir/name": entry},
+            directory names end with os.sep
+    '''
+    return dict(iter_tree(rootPath, ignore, errors))
+
+
+def iter_tree(
+    rootPath: str, ignore: list[str], errors: list[str] = None
+) -> Iterator[tuple[str, os.DirEntry]]:
+    '''
+    Recursively iterate over directory entries, without following symlinks
+
+    Args:
+        rootPath (str): Directory path
+        ignore (list[str]): Names to skip together with their contents
+        errors (list[str], optional): List, where to write
+            subdirectories that couldn't be listed. Defaults to None.
+
+    Yields:
+        tuple[str, os.DirEntry]: Entry name in format "subdir/name",
+            directory names end with os.sep, and entry
+    '''
+    subdirs = [""]
+
+    while subdirs:
+        subdir = subdirs.pop()
+        try:
+            with os.scandir(os.path.join(rootPath, subdir)) as scanner:
+                for entry in scanner:
+                    if entry.name in ignore:
+                        continue
+                    name = f"{subdir}{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        name += os.sep
+                        subdirs.append(name)
+                    yield name, entry
+        except OSError:
+            if errors is None or not subdir:
+                raise
+            errors.append(subdir)
+
+
+def format_size(size: float) -> str:
+    '''
+    Format size in bytes with binary unit
+
+    Args:
+        size (float): Size in bytes
+
+    Returns:
+        str: Size, for example "1.5 MiB"
     '''
-    for string in strings:
-        for sortedString in sortedStrings:
-            if sortedString > string:
-                index = sortedStrings.index(sortedString)
-                sortedStrings.insert(index, string)
-                break
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
 
 
-def sorted_paths(files: list[str]) -> list[str]:
+def format_time(seconds: float) -> str:
     '''
-    Sort files by dirs
+    Format duration as hours, minutes and seconds
 
     Args:
-        files (list[str]): Files to sort
+        seconds (float): Duration
 
     Returns:
-        list[str]: Sorted files
+        str: Duration, for example "01:02:03"
+    '''
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def safe_path(basePath: str, name: str) -> str:
+    '''
+    Join archive member name to base path, refusing names
+    that would be written outside of it. Same as baseline
+    ZipFile._extract_member, but unsafe names are rejected
+    instead of being cleaned
+
+    Parent directory is resolved at call time, so links
+    created by previous members are not followed out
+
+    Args:
+        basePath (str): Directory to write to
+        name (str): Relative name, "/" or native separated
+
+    Raises:
+        ValueError: Name is absolute, contains ".."
+            or resolves outside of base path
+
+    Returns:
+        str: Path inside base path
+    '''
+    relative = name.replace("/", os.sep)
+    if os.path.altsep:
+        relative = relative.replace(os.path.altsep, os.sep)
+    drive, relative = os.path.splitdrive(relative)
+    parts = [part for part in relative.split(os.sep) if part not in ("", ".")]
+
+    if drive or os.path.isabs(relative) or ".." in parts or not parts:
+        raise ValueError(f"Unsafe member name \"{name}\"")
+
+    path = os.path.join(basePath, *parts)
+    base = os.path.realpath(basePath)
+    parent = os.path.realpath(os.path.dirname(path))
+    if os.path.commonpath((base, parent)) != base:
+        raise ValueError(
+            f"Member \"{name}\" resolves outside of \"{basePath}\""
+        )
+    return path
+
+
+def file_checksums(
+    filepath: str, algorithm: str | None = None, bufferSize: int = 1024 * 1024
+) -> tuple[int, str | None]:
+    '''
+    Compute CRC32 and optionally a strong hash of file
+    in a single pass
+
+    Args:
+        filepath (str): File path
+        algorithm (str | None, optional): hashlib algorithm name.
+            Defaults to None.
+        bufferSize (int, optional): Read chunk size.
+            Defaults to 1 MiB.
+
+    Returns:
+        tuple[int, str | None]: CRC32 and hex digest
     '''
-    files = files.copy()
-    files.sort()
-    dirs = []
+    crc = 0
+    digest = hashlib.new(algorithm) if algorithm else None
 
-    #  Find dirs
-    for file in files.copy():
-        if file.endswith(os.sep):
-            files.remove(file)
-            dirs.append(file)
+    with open(filepath, "rb") as file:
+        while chunk := file.read(bufferSize):
+            crc = zlib.crc32(chunk, crc)
+            if digest:
+                digest.update(chunk)
 
-    if not dirs:
-        return files
+    return crc, digest.hexdigest() if digest else None
 
-    dirs.sort()
-    sortedFiles = []
 
-    for dir in dirs.copy():
-        sortedFiles.append(dir)
-        dirs.remove(dir)
-        for file in files.copy():
-            if contains_only(file, dir, dirs):
-                files.remove(file)
-                sortedFiles.append(file)
+def sorted_paths(files: list[str]) -> list[str]:
+    '''
+    Sort files by dirs: each dir is followed by its
+    files, which are not in other dirs from the list
+
+    Args:
+        files (list[str]): Files to sort
+
+    Returns:
+        list[str]: Sorted files
+    '''
+    dirs = set(filter(lambda file: file.endswith(os.sep), files))
+
+    def group(file: str) -> tuple[str, bool, str]:
+        #  Find the deepest parent dir in the list
+        parent = file
+        while parent and parent not in dirs:
+            parent = os.path.dirname(parent.rstrip(os.sep))
+            parent = parent and f"{parent}{os.sep}"
+        parent = parent or file
+        return parent, parent != file, file
 
-    insert_to_sorted(files, sortedFiles)
-    return sortedFiles
+    return sorted(files, key=group)
 
 
 def print_files(title: str, files: list[str], output: IO):
@@ -582,9 +4006,8 @@ def print_files(title: str, files: list[str], output: IO):
         output (IO): Output source. Use sys.stdout for printing in terminal
     '''
     if files:
-        print(f"{title}:", file=output, flush=True)
-        for file in sorted_paths(files):
-            print(f"    {file}", file=output, flush=True)
+        output.write(f"{title}:\n")
+        output.writelines(f"    {file}\n" for file in sorted_paths(files))
 
 
 def get_storage_drives() -> set[str]:
@@ -644,14 +4067,453 @@ def get_storage_drives() -> set[str]:
     return drives
 
 
+def compare_backup(
+    backupFilepath: str,
+    backupDestination: str,
+    backupPassword: bytes | None = None,
+    preferredEncoding: str = "cp866",
+    ignore: list[str] = [".git"],
+    verify: str | None = None,
+    hashCache: HashCache = None,
+    workers: int = 8,
+    outOfCore: bool = False,
+    compact: bool = False,
+    useIndex: bool = False,
+    leftEntries: dict[str, os.DirEntry] | None = None,
+    leftErrors: list[str] = None,
+    stats: CmpStats | None = None,
+    extractPath: str | None = None,
+    onEntry: Callable[[str, str], None] | None = None,
+    progressbar: bool = True
+) -> CmpProgress:
+    '''
+    Compare backup with backupDestination
+
+    Args:
+        backupFilepath (str): Backup directory or zip path
+        backupDestination (str): Path of backup with
+            which to compare.
+        leftEntries (dict[str, os.DirEntry] | None, optional):
+            backupDestination scanned with scan_tree, shared by
+            several comparisons. Directory backups are compared
+            with ScanCmp then. Defaults to None.
+        leftErrors (list[str], optional): Subdirectories that
+            couldn't be listed when scanning leftEntries.
+            Defaults to None.
+        stats (CmpStats | None, optional): Counters shared by
+            several comparisons. Defaults to None.
+        extractPath (str | None, optional): Directory to extract
+            zip backup members that differ from destination to.
+            Defaults to None.
+        onEntry (Callable[[str, str], None] | None, optional):
+            Called with status and name of entries as comparison
+            finds them, made by ReportWriter.entry_writer().
+            Defaults to None.
+        progressbar (bool, optional): Render progress bar of
+            this comparison. Defaults to True.
+
+    Other arguments are the same as in compare_backups
+
+    Returns:
+        CmpProgress: Comparison, call finish_progressbar()
+            after reading its results
+    '''
+    backupName, backupExtension = os.path.splitext(
+        os.path.basename(backupFilepath)
+    )
+
+    if backupExtension == ".zip":
+        with ZipFile(
+            file=backupFilepath,
+            mode="r",
+            preferredEncoding=preferredEncoding,
+            ignore=ignore,
+            progressbar=False,
+            useIndex=useIndex
+        ) as zip:
+            return ZipCmp(
+                leftPath=backupDestination,
+                zip=zip,
+                rootName=backupName,
+                ignore=ignore,
+                verify=verify or "crc",
+                pwd=backupPassword,
+                hashCache=hashCache,
+                leftEntries=leftEntries,
+                leftErrors=leftErrors,
+                stats=stats,
+                extractPath=extractPath,
+                onEntry=onEntry,
+                progressbar=progressbar
+            )
+
+    if leftEntries is not None:
+        return ScanCmp(
+            leftPath=backupDestination,
+            rightPath=backupFilepath,
+            ignore=ignore,
+            verify=verify or "full",
+            hashCache=hashCache,
+            leftEntries=leftEntries,
+            leftErrors=leftErrors,
+            stats=stats,
+            onEntry=onEntry,
+            progressbar=progressbar
+        )
+
+    if outOfCore:
+        return SortCmp(
+            leftPath=backupDestination,
+            rightPath=backupFilepath,
+            ignore=ignore,
+            verify=verify or "full",
+            onEntry=onEntry,
+            progressbar=progressbar
+        )
+
+    return DirCmp(
+        leftPath=backupDestination,
+        rightPath=backupFilepath,
+        ignore=ignore,
+        hashCache=hashCache,
+        verify=verify or "full",
+        workers=1 if compact else workers,
+        compact=compact,
+        onEntry=onEntry,
+        progressbar=progressbar
+    )
+
+
+def write_comparison(
+    compared: CmpProgress,
+    backupDestination: str,
+    backupFilepath: str,
+    report: ReportWriter,
+    detectMoves: bool = True
+) -> str:
+    '''
+    Write comparison section to report. Entries comparison
+    passed to onEntry made by report.entry_writer() are already
+    written, the rest is written here, since moved files are
+    found only among all new and removed ones
+
+    Args:
+        compared (CmpProgress): Comparison
+        backupDestination (str): Left path
+        backupFilepath (str): Backup path
+        report (ReportWriter): Report
+        detectMoves (bool, optional): Report moved files
+            in "Moved" section. Defaults to True.
+
+    Returns:
+        str: Summary with files counts
+    '''
+    report.begin(backupDestination, backupFilepath)
+
+    #  Out-of-core comparison doesn't detect moves
+    detectMoves = detectMoves and not isinstance(compared, SortCmp)
+    streamed = frozenset()
+    if compared.onEntry is not None:
+        streamed = report.streamed_statuses(detectMoves).intersection(
+            compared.streamedStatuses
+        )
+
+    if isinstance(compared, SortCmp):
+        #  Sections are streamed from disk in path order
+        for title in compared.sections:
+            if title.lower() not in streamed:
+                report.write_section(
+                    title, compared.section_names(title), ordered=True
+                )
+        counts = dict(
+            new=compared.counts["New"],
+            modified=compared.counts["Modified"],
+            removed=compared.counts["Removed"]
+        )
+        compared.close()
+    else:
+        moved = compared.find_moved() if detectMoves else {}
+        new = [
+            *filterfalse(
+                set(moved.values()).__contains__, compared.right_only
+            )
+        ]
+        removed = [*filterfalse(moved.__contains__, compared.left_only)]
+        counts = dict(
+            new=len(new),
+            modified=len(compared.diff_files),
+            removed=len(removed),
+            moved=len(moved)
+        )
+
+        if "new" not in streamed:
+            report.write_section("New", new)
+        if "modified" not in streamed:
+            report.write_section("Modified", compared.diff_files)
+        if "removed" not in streamed:
+            report.write_section("Removed", removed)
+        report.write_moved(moved)
+        if "error" not in streamed:
+            report.write_section("Error", compared.funny_files)
+
+    return report.end(counts, compared.resolved)
+
+
+def write_failure(
+    error: Exception,
+    backupDestination: str,
+    backupFilepath: str,
+    report: ReportWriter
+) -> str:
+    '''
+    Write comparison section of backup that couldn't be compared
+
+    Args:
+        error (Exception): Error that stopped comparison
+        backupDestination (str): Left path
+        backupFilepath (str): Backup path
+        report (ReportWriter): Report
+
+    Returns:
+        str: Summary with error
+    '''
+    if report.backup != backupFilepath:
+        report.begin(backupDestination, backupFilepath)
+    return report.fail(error)
+
+
+def write_delta(
+    compared: CmpProgress,
+    backupDestination: str,
+    backupFilepath: str,
+    deltaFilepath: str,
+    preferredEncoding: str = "cp866"
+) -> str:
+    '''
+    Write destination changes since the backup to delta zip
+
+    Args:
+        compared (CmpProgress): Comparison
+        backupDestination (str): Left path
+        backupFilepath (str): Backup path
+        deltaFilepath (str): Delta zip path
+        preferredEncoding (str, optional): Encoding to use
+            when guessing zip filenames original.
+            Defaults to "cp866".
+
+    Returns:
+        str: Summary with files counts
+    '''
+    rootName = os.path.basename(backupFilepath)
+    if rootName.endswith(".zip"):
+        rootName = rootName[:-len(".zip")]
+
+    written, deleted = DeltaArchive(deltaFilepath, preferredEncoding).write(
+        compared, backupDestination, rootName
+    )
+
+    return f"( delta {deltaFilepath}, written: {written}, deleted: {deleted} )"
+
+
+def numbered_paths(path: str, backups: list[str]) -> dict[str, str]:
+    '''
+    Output path for each backup, paths of backups after
+    the first one get a number before extension
+
+    Args:
+        path (str): Output path
+        backups (list[str]): Backups paths
+
+    Returns:
+        dict[str, str]: {"backup path": "output path"}
+    '''
+    name, extension = os.path.splitext(path)
+    return {
+        backupFilepath: f"{name}.{number}{extension}" if number else path
+        for number, backupFilepath in enumerate(backups)
+    }
+
+
+def format_extracted(compared: CmpProgress) -> str:
+    '''
+    Args:
+        compared (CmpProgress): Comparison
+
+    Returns:
+        str: Summary line of extracted members,
+            empty if nothing was extracted
+    '''
+    if not isinstance(compared, ZipCmp) or not compared.extractPath:
+        return ""
+    return f"\n( extracted {compared.extracted} to {compared.extractPath} )"
+
+
+def publish_comparisons(
+    manager: ProgressManager,
+    backups: list[str],
+    backupsStats: list[CmpStats],
+    comparisons: list[Future],
+    leftEntries: dict[str, os.DirEntry]
+):
+    '''
+    Add a bar of each comparison to manager and copy
+    their counters to it until all of them are done
+
+    Args:
+        manager (ProgressManager): Rendered progress bars
+        backups (list[str]): Backups paths
+        backupsStats (list[CmpStats]): Counters of comparisons
+        comparisons (list[Future]): Running comparisons
+        leftEntries (dict[str, os.DirEntry]): Destination
+            scanned with scan_tree, its size is the total
+            of each bar
+    '''
+    handles = []
+    for backupFilepath in backups:
+        drive = os.path.dirname(backupFilepath)
+        if len(drive) > 24:
+            drive = f"...{drive[-21:]}"
+        handles.append(manager.add(f"{drive:<24} : "))
+
+    #  Entries are stated by comparisons anyway, so
+    #  this costs nothing when their stat is cached
+    total = 0
+    for name, entry in leftEntries.items():
+        if name.endswith(os.sep):
+            continue
+        try:
+            total += entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+    for handle in handles:
+        handle.total = total
+
+    while True:
+        for handle, stats, comparison in zip(
+            handles, backupsStats, comparisons
+        ):
+            handle.counter = stats.processed
+            if comparison.done():
+                handle.finish()
+        if all(handle.finished for handle in handles):
+            break
+        time.sleep(manager.timeout)
+
+
+def compare_entries(
+    backups: list[str],
+    leftEntries: dict[str, os.DirEntry],
+    leftErrors: list[str],
+    report: ReportWriter,
+    detectMoves: bool = True,
+    deltaFilepaths: dict[str, str] | None = None,
+    extractPaths: dict[str, str] | None = None,
+    progressbar: bool = True,
+    **options
+) -> list[str]:
+    '''
+    Compare scanned destination with all backups at
+    the same time and write comparisons to report
+
+    Args:
+        backups (list[str]): Backups paths
+        leftEntries (dict[str, os.DirEntry]): Destination
+            scanned with scan_tree
+        leftErrors (list[str]): Subdirectories that couldn't
+            be listed when scanning leftEntries
+        report (ReportWriter): Report
+        detectMoves (bool, optional): Report moved files
+            in "Moved" section. Defaults to True.
+        deltaFilepaths (dict[str, str] | None, optional): Delta
+            zip path for each backup. Defaults to None.
+        extractPaths (dict[str, str] | None, optional): Directory
+            to extract differing members of each zip backup to.
+            Defaults to None.
+        progressbar (bool, optional): Render progress bar of
+            each comparison and their total. Defaults to True.
+
+    Other arguments are passed to compare_backup
+
+    Returns:
+        list[str]: Summaries of comparisons
+    '''
+    backupDestination = options["backupDestination"]
+    if extractPaths is None:
+        extractPaths = {}
+
+    #  Left only files are counted as processed, so bars reach total
+    backupsStats = [CmpStats() for _ in backups]
+    for stats in backupsStats:
+        stats.tracking = progressbar
+
+    with ThreadPoolExecutor(len(backups)) as executor:
+        comparisons = [
+            executor.submit(
+                compare_backup,
+                backupFilepath,
+                **options,
+                leftEntries=leftEntries,
+                leftErrors=leftErrors,
+                stats=stats,
+                extractPath=extractPaths.get(backupFilepath),
+                onEntry=report.entry_writer(backupFilepath, detectMoves),
+                progressbar=False
+            )
+            for backupFilepath, stats in zip(backups, backupsStats)
+        ]
+        if progressbar:
+            with ProgressManager(unit="B") as manager:
+                publish_comparisons(
+                    manager, backups, backupsStats, comparisons, leftEntries
+                )
+
+    #  Backup that fails is reported, others are still compared
+    summaries = []
+    for backupFilepath, comparison in zip(backups, comparisons):
+        try:
+            compared = comparison.result()
+            summary = write_comparison(
+                compared, backupDestination, backupFilepath, report, detectMoves
+            )
+            if deltaFilepaths:
+                summary = "{}\n{}".format(summary, write_delta(
+                    compared,
+                    backupDestination,
+                    backupFilepath,
+                    deltaFilepaths[backupFilepath],
+                    options.get("preferredEncoding", "cp866")
+                ))
+            summary += format_extracted(compared)
+        except BACKUP_ERRORS as error:
+            summary = write_failure(
+                error, backupDestination, backupFilepath, report
+            )
+        summaries.append(summary)
+
+    return summaries
+
+
 def compare_backups(
     backupFilename: str,
     backupDestination: str,
     backupPassword: bytes | None = None,
     reportFilepath: str = "compared.txt",
+    reportFormat: str = "text",
     preferredEncoding: str = "cp866",
     ignore: list[str] = [".git"],
-    path: str | None = None
+    path: str | None = None,
+    verify: str | None = None,
+    useCache: bool = True,
+    workers: int = 8,
+    detectMoves: bool = True,
+    outOfCore: bool = False,
+    compact: bool = False,
+    useJournal: bool = False,
+    deltaFilepath: str | None = None,
+    searchDepth: int = 0,
+    probeTimeout: float = 10.0,
+    extractPath: str | None = None,
+    useIndex: bool = False
 ):
     '''
     Detects backups on connected drives and
@@ -667,6 +4529,8 @@ def compare_backups(
             to extract a backup from an encrypted archive
         reportFilepath (str, optional): Path of detailed
             report. Defaults to "compared.txt".
+        reportFormat (str, optional): Detailed report format,
+            one of ReportWriter.formats. Defaults to "text".
         preferredEncoding (str, optional): Encoding to use
             when guessing zip filenames original.
             Defaults to "cp866".
@@ -675,105 +4539,189 @@ def compare_backups(
         path (str | None, optional): Path of backup to
             compare with backupDestination. Disables
             auto discovery. Defaults to None
+        verify (str | None, optional): Most accurate tier of
+            files comparison: "stat", "sample" or "full". For
+            zip backups "sample" is replaced with "crc", which
+            compares CRC32 of whole files, and "full" also
+            compares manifest hashes or decompressed data.
+            Defaults to None, "crc" for zip and "full" for
+            directories
+        useCache (bool, optional): Keep checksums of
+            backupDestination files in the user cache
+            directory, so that only files changed since
+            the last run are read. Defaults to True
+        workers (int, optional): Number of threads comparing
+            backup directory subdirectories, compact mode uses
+            one. Defaults to 8
+        detectMoves (bool, optional): Report files which content
+            was found under another name in "Moved" section
+            instead of "New" and "Removed". Defaults to True
+        outOfCore (bool, optional): Compare backup directory
+            using sorted runs on disk, for trees which don't fit
+            in memory. Moves are not detected and hash cache
+            isn't used in this mode, as it's loaded in memory.
+            Defaults to False
+        compact (bool, optional): Compare backup directory
+            keeping results in a compact path tree, instead of
+            full paths lists. Can't be combined with outOfCore.
+            Defaults to False
+        useJournal (bool, optional): List only destination
+            paths changed since the last comparison, using
+            journal written by ChangeJournal.watch(). Falls
+            back to full scan if journal is incomplete.
+            Defaults to False
+        deltaFilepath (str | None, optional): Path of zip to
+            write destination files that differ from the backup
+            to, with a list of deleted ones. Apply it with
+            DeltaArchive.apply() to update the backup instead
+            of making a new one. Backups after the first get
+            a number before extension. Defaults to None
+        searchDepth (int, optional): Subdirectories levels
+            below drives roots to look for backupFilename in.
+            Defaults to 0
+        probeTimeout (float, optional): Seconds to wait for
+            drives to respond, others are skipped.
+            Defaults to 10.0
+        extractPath (str | None, optional): Directory to extract
+            zip backup members that differ from destination or
+            are missing there to. Backups after the first get
+            a number after directory name. Defaults to None
+        useIndex (bool, optional): Load zip backups member list
+            from sidecar index, writing it next to the backup if
+            it's missing or outdated. Otherwise backup drives are
+            only read. Defaults to False
+
+    Raises:
+        ValueError: Both outOfCore and compact are set
     '''
+    if outOfCore and compact:
+        raise ValueError("outOfCore and compact can't be combined")
+
     if path:
         path = path.rstrip("/").rstrip("\\")
-        path, backupFilename = os.path.split(path)
-        drives = {path}
+        backups = [path] if os.path.exists(path) else []
     else:
-        drives = get_storage_drives()
+        backups = BackupFinder(
+            backupFilename, searchDepth, probeTimeout, useCache=useCache
+        ).find(get_storage_drives())
 
-    report = open(reportFilepath, "w", encoding="utf-8")
-    backupName, backupExtension = os.path.splitext(backupFilename)
+    for backupFilepath in backups:
+        print(f"Found backup in {os.path.dirname(backupFilepath)}")
 
-    for drive in drives.copy():
-        try:
-            if backupFilename in os.listdir(drive):
-                print(f"Found backup in {drive}")
-                backupFilepath = os.path.join(drive, backupFilename)
-
-                if backupExtension:
-                    #  windows create symbolic links rights
-                    if os.name == "nt":
-                        run_as_admin()
-
-                    print(f"Extracting {backupFilepath}")
-
-                    if backupExtension == ".zip":
-                        with ZipFile(
-                            file=backupFilepath,
-                            mode="r",
-                            preferredEncoding=preferredEncoding,
-                            ignore=ignore,
-                            progressbar=True,
-                            useBarPrefix=False
-                        ) as zip:
-                            zip.extractall(
-                                path=tempfile.gettempdir(), pwd=backupPassword
-                            )
+    report = ReportWriter(reportFilepath, reportFormat)
+    hashCache = None
+    if useCache and not outOfCore:
+        hashCache = HashCache(backupDestination)
 
-                    backupFilepath = os.path.join(
-                        tempfile.gettempdir(), backupName
-                    )
+    options = dict(
+        backupDestination=backupDestination,
+        backupPassword=backupPassword,
+        preferredEncoding=preferredEncoding,
+        ignore=ignore,
+        verify=verify,
+        hashCache=hashCache,
+        workers=workers,
+        outOfCore=outOfCore,
+        compact=compact,
+        useIndex=useIndex
+    )
 
-                print(f"Comparing with {backupDestination}")
-                compared = DirCmp(
-                    leftPath=backupDestination,
-                    rightPath=backupFilepath,
-                    ignore=ignore,
-                    progressbar=True
-                )
+    journal = ChangeJournal(backupDestination) if useJournal else None
 
-                print(
-                    f"( {backupDestination}, {os.path.join(drive, backupFilename)} ):",
-                    end="\n\n",
-                    file=report,
-                    flush=True
-                )
-                print_files(
-                    "New",
-                    DirCmpUtils.dict_to_list(compared.right_only),
-                    report
-                )
-                print_files(
-                    "Modified",
-                    compared.diff_files,
-                    report
-                )
-                print_files(
-                    "Removed",
-                    DirCmpUtils.dict_to_list(compared.left_only),
-                    report
-                )
-                print_files(
-                    "Error",
-                    compared.funny_files,
-                    report
-                )
-                print(
-                    f"\n( new: {len(compared.right_only)}, modified: {len(compared.diff_files)}, removed: {len(compared.left_only)} )",
-                    end="\n",
-                    file=report,
-                    flush=True
-                )
+    deltaFilepaths = {}
+    if deltaFilepath:
+        deltaFilepaths = numbered_paths(deltaFilepath, backups)
+    extractPaths = {}
+    if extractPath:
+        extractPaths = numbered_paths(extractPath, backups)
 
-                compared.finish_progressbar()
+    #  Scan destination once and compare it
+    #  with all backups at the same time
+    if (
+        backups
+        and (len(backups) > 1 or journal is not None)
+        and not outOfCore
+        and not compact
+    ):
+        if len(backups) > 1:
+            print(f"Comparing {len(backups)} backups with {backupDestination}")
+        else:
+            print(f"Comparing with {backupDestination}")
 
-                print(
-                    f"( new: {len(compared.right_only)}, modified: {len(compared.diff_files)}, removed: {len(compared.left_only)} )",
-                    end="\n\n"
-                )
+        #  Comparisons render their own bars after the scan
+        progress = CmpProgress()
+        progress.start_progressbar()
 
-                if backupExtension:
-                    shutil.rmtree(backupFilepath)
+        leftErrors = []
+        if journal is not None:
+            leftEntries = journal.scan(ignore, leftErrors)
+        else:
+            leftEntries = scan_tree(backupDestination, ignore, leftErrors)
+        progress.finish_progressbar()
 
-            else:
-                raise FileNotFoundError
+        summaries = compare_entries(
+            backups,
+            leftEntries,
+            leftErrors,
+            report,
+            detectMoves,
+            deltaFilepaths,
+            extractPaths,
+            **options
+        )
+
+        if journal is not None and journal.fullScan:
+            print("Change journal is incomplete, destination was fully scanned")
+
+        for backupFilepath, summary in zip(backups, summaries):
+            print(f"{backupFilepath}:")
+            print(summary, end="\n\n")
+
+    else:
+        for backupFilepath in backups:
+            print(f"Comparing with {backupDestination}")
+            compared = None
+            try:
+                compared = compare_backup(
+                    backupFilepath,
+                    **options,
+                    extractPath=extractPaths.get(backupFilepath),
+                    onEntry=report.entry_writer(
+                        backupFilepath, detectMoves and not outOfCore
+                    )
+                )
+                #  Out-of-core report sections are removed after writing
+                if deltaFilepath:
+                    delta = write_delta(
+                        compared,
+                        backupDestination,
+                        backupFilepath,
+                        deltaFilepaths[backupFilepath],
+                        preferredEncoding
+                    )
+                summary = write_comparison(
+                    compared,
+                    backupDestination,
+                    backupFilepath,
+                    report,
+                    detectMoves
+                )
+                if deltaFilepath:
+                    summary = f"{summary}\n{delta}"
+                summary += format_extracted(compared)
+            except BACKUP_ERRORS as error:
+                summary = write_failure(
+                    error, backupDestination, backupFilepath, report
+                )
+            finally:
+                if compared is not None:
+                    compared.finish_progressbar()
+            print(summary, end="\n\n")
 
-        except (PermissionError, FileNotFoundError):
-            drives.remove(drive)
+    if hashCache is not None:
+        hashCache.save()
 
-    if drives:
+    if backups:
         print(f"View {os.path.basename(reportFilepath)} for detailed report")
     else:
         print("No backups found")
@@ -781,6 +4729,147 @@ def compare_backups(
     report.close()
 
 
+def monitor_drives(
+    backupFilename: str,
+    backupDestination: str,
+    backupPassword: bytes | None = None,
+    reportFilepath: str = "compared.txt",
+    reportFormat: str = "text",
+    preferredEncoding: str = "cp866",
+    ignore: list[str] = [".git"],
+    verify: str | None = None,
+    useCache: bool = True,
+    workers: int = 8,
+    detectMoves: bool = True,
+    searchDepth: int = 0,
+    probeTimeout: float = 10.0,
+    useIndex: bool = False
+):
+    '''
+    Wait for drives to be mounted and compare backups found
+    on them with backupDestination, runs until interrupted.
+    Linux only
+
+    Destination is scanned once and kept in memory, changes
+    are followed with ChangeJournal.watch() running in
+    a thread, so a comparison starts without a full scan.
+    If inotify is unavailable, it's scanned after each mount.
+    Report is rewritten for each mounted drive, errors are
+    printed and the next drive is waited for
+
+    Arguments are the same as in compare_backups
+    '''
+    hashCache = HashCache(backupDestination) if useCache else None
+    finder = BackupFinder(
+        backupFilename, searchDepth, probeTimeout, useCache=useCache
+    )
+    options = dict(
+        backupDestination=backupDestination,
+        backupPassword=backupPassword,
+        preferredEncoding=preferredEncoding,
+        ignore=ignore,
+        verify=verify,
+        hashCache=hashCache,
+        workers=workers,
+        useIndex=useIndex
+    )
+
+    journal = ChangeJournal(backupDestination)
+
+    #  Watcher started with --watch is used as it is
+    if not journal.is_watched():
+        ready = threading.Event()
+
+        def watch():
+            try:
+                journal.watch(ignore, ready)
+            except OSError:
+                pass
+            finally:
+                ready.set()
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        ready.wait()
+
+        if not watcher.is_alive():
+            print("Can't follow destination changes, it will be fully scanned")
+            journal = None
+
+    leftEntries = None
+    if journal is not None:
+        #  Kept scanned, so comparison starts without a full scan
+        leftEntries = journal.scan(ignore, [])
+    drives = get_storage_drives()
+
+    with open("/proc/self/mounts", "r") as mountsFile:
+        #  Mounts table change is reported as an exceptional condition
+        poller = select.poll()
+        poller.register(mountsFile, select.POLLPRI | select.POLLERR)
+        print(f"Waiting for drives with {backupFilename}")
+
+        while True:
+            poller.poll()
+            mountsFile.seek(0)
+            mountsFile.read()
+
+            mounted = get_storage_drives()
+            mounted, drives = mounted - drives, mounted
+            if not mounted:
+                continue
+
+            #  Errors of a mount event are reported and the
+            #  next one is waited for, like after a comparison
+            progress = None
+            try:
+                backups = finder.find(mounted)
+                if not backups:
+                    continue
+                for backupFilepath in backups:
+                    print(f"Found backup in {os.path.dirname(backupFilepath)}")
+
+                progress = CmpProgress()
+                progress.start_progressbar()
+
+                #  Destination is scanned after the mount, as it
+                #  could change a lot while waiting for it
+                leftErrors = []
+                if journal is not None:
+                    leftEntries = journal.scan(ignore, leftErrors, leftEntries)
+                else:
+                    leftEntries = scan_tree(
+                        backupDestination, ignore, leftErrors
+                    )
+                progress.finish_progressbar()
+
+                with ReportWriter(reportFilepath, reportFormat) as report:
+                    summaries = compare_entries(
+                        backups,
+                        leftEntries,
+                        leftErrors,
+                        report,
+                        detectMoves,
+                        **options
+                    )
+
+                for backupFilepath, summary in zip(backups, summaries):
+                    print(f"{backupFilepath}:")
+                    print(summary, end="\n\n")
+                print(
+                    f"View {os.path.basename(reportFilepath)} "
+                    "for detailed report"
+                )
+
+                if hashCache is not None:
+                    hashCache.save()
+            except BACKUP_ERRORS as error:
+                if progress is not None:
+                    progress.finish_progressbar()
+                print(f"Comparison failed, {type(error).__name__}: {error}")
+
+            print(f"Waiting for drives with {backupFilename}")
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Backup Comparison Utility")
@@ -805,6 +4894,12 @@ if __name__ == "__main__":
         default="compared.txt",
         help="path of detailed report"
     )
+    parser.add_argument(
+        "--report-format",
+        choices=ReportWriter.formats,
+        default="text",
+        help="detailed report format, jsonl and csv are for other tools"
+    )
     parser.add_argument(
         "--preferred-encoding",
         default="cp866",
@@ -821,16 +4916,145 @@ if __name__ == "__main__":
         "--path",
         help="path of backup to compare with destination. disables auto discovery"
     )
+    parser.add_argument(
+        "--search-depth",
+        type=int,
+        default=0,
+        help="subdirectories levels below drives roots to look for backup in"
+    )
+    parser.add_argument(
+        "--probe-timeout",
+        type=float,
+        default=10.0,
+        help="seconds to wait for drives to respond when looking for backup"
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=8,
+        help="number of threads comparing backup directory subdirectories"
+    )
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="list only destination paths changed since the last comparison, requires --watch running"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="follow destination changes with inotify and write them to journal (linux only)"
+    )
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help="wait for drives to be mounted and compare backups found on them, keeping destination scanned (linux only)"
+    )
+    directoryMode = parser.add_mutually_exclusive_group()
+    directoryMode.add_argument(
+        "--compact",
+        action="store_true",
+        help="keep backup directory comparison results in a compact path tree"
+    )
+    directoryMode.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help="compare backup directory using sorted runs on disk, for very large trees"
+    )
+    parser.add_argument(
+        "--no-moves",
+        action="store_true",
+        help="don't detect moved files, report them as new and removed"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't cache checksums of destination files between runs"
+    )
+    parser.add_argument(
+        "--emit-delta",
+        metavar="DELTA",
+        default=None,
+        help="write destination files that differ from the backup and a list of deleted ones to zip"
+    )
+    parser.add_argument(
+        "--extract-differing",
+        metavar="DIR",
+        default=None,
+        help="extract zip backup members that differ from destination or are missing there"
+    )
+    parser.add_argument(
+        "--zip-index",
+        action="store_true",
+        help="load zip backups member list from sidecar index, writing it next to the backup if needed"
+    )
+    parser.add_argument(
+        "--apply-delta",
+        metavar="DELTA",
+        default=None,
+        help="fold delta zip into backup given with --path"
+    )
+    parser.add_argument(
+        "--verify",
+        choices=FileCmp.levels,
+        default=None,
+        help="most accurate tier of files comparison. zip backups are compared by whole files crc32 instead of sample, which is their default. defaults to full for directories"
+    )
     args = parser.parse_args()
 
-    if args.name and args.destination:
+    if args.monitor and args.name and args.destination:
+        try:
+            monitor_drives(
+                backupFilename=args.name,
+                backupDestination=args.destination,
+                backupPassword=args.password,
+                reportFilepath=args.report,
+                reportFormat=args.report_format,
+                preferredEncoding=args.preferred_encoding,
+                ignore=args.ignore,
+                verify=args.verify,
+                useCache=not args.no_cache,
+                workers=args.jobs,
+                detectMoves=not args.no_moves,
+                searchDepth=args.search_depth,
+                probeTimeout=args.probe_timeout,
+                useIndex=args.zip_index
+            )
+        except KeyboardInterrupt:
+            pass
+
+    elif args.watch and args.destination:
+        try:
+            ChangeJournal(args.destination).watch(args.ignore)
+        except KeyboardInterrupt:
+            pass
+
+    elif args.apply_delta and args.path:
+        DeltaArchive(args.apply_delta, args.preferred_encoding).apply(
+            args.path.rstrip("/").rstrip("\\"), args.password
+        )
+
+    elif args.name and args.destination:
         compare_backups(
             backupFilename=args.name,
             backupDestination=args.destination,
             backupPassword=args.password,
             reportFilepath=args.report,
+            reportFormat=args.report_format,
             preferredEncoding=args.preferred_encoding,
-            ignore=args.ignore
+            ignore=args.ignore,
+            verify=args.verify,
+            useCache=not args.no_cache,
+            workers=args.jobs,
+            detectMoves=not args.no_moves,
+            outOfCore=args.out_of_core,
+            compact=args.compact,
+            useJournal=args.journal,
+            deltaFilepath=args.emit_delta,
+            searchDepth=args.search_depth,
+            probeTimeout=args.probe_timeout,
+            extractPath=args.extract_differing,
+            useIndex=args.zip_index
         )
 
     elif args.destination and args.path:
@@ -839,7 +5063,18 @@ if __name__ == "__main__":
             backupDestination=args.destination,
             backupPassword=args.password,
             reportFilepath=args.report,
+            reportFormat=args.report_format,
             preferredEncoding=args.preferred_encoding,
             ignore=args.ignore,
-            path=args.path
+            path=args.path,
+            verify=args.verify,
+            useCache=not args.no_cache,
+            workers=args.jobs,
+            detectMoves=not args.no_moves,
+            outOfCore=args.out_of_core,
+            compact=args.compact,
+            useJournal=args.journal,
+            deltaFilepath=args.emit_delta,
+            extractPath=args.extract_differing,
+            useIndex=args.zip_index
         )
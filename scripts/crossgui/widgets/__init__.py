@@ -7,12 +7,16 @@ Copyright (c) 2022 Andrew Shteren
              Widgets For Scripts             
 ---------------------------------------------
 Dialog, input or options menu in a terminal,
-rofi, qt and more. Progress bar for an
-unknown process time
+rofi, qt and more. Progress bar with or
+without known total, progress of concurrent
+workers
 
 '''
 __all__ = (
     "ProgressBar",
+    "ProgressManager",
+    "ProgressRenderer",
+    "SharedValue",
     "show_dialog",
     "show_input",
     "show_menu"
@@ -21,4 +25,5 @@ __all__ = (
 from .dialog import show_dialog
 from .field import show_input
 from .menu import show_menu
-from .progressbar import ProgressBar
+from .progressbar import ProgressBar, ProgressRenderer, SharedValue
+from .progressmanager import ProgressManager
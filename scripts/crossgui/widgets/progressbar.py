@@ -7,7 +7,11 @@ Copyright (c) 2023 Andrew Shteren
                  Progressbar                 
 ---------------------------------------------
 Run a simplified progress bar for an unknown
-process time or use common
+process time or a determinate one with rate
+and ETA, when total is known
+
+Renderer thread can be reused for many short
+tasks, instead of starting a process for each
 
 '''
 import multiprocessing
@@ -28,10 +32,13 @@ class ProgressBar():
         prefix: str = "",
         frames: str = "-\|/=",
         timeout: float = 0.1,
-        clearMode: bool = False
+        clearMode: bool = False,
+        total: int = 0,
+        smoothing: float = 0.3
     ):
         '''
-        Progress bar for unknown process time
+        Progress bar for unknown process time, or
+        determinate one if total is set
 
         Args:
             size (int, optional): Bar length. Defaults to 30.
@@ -48,11 +55,18 @@ class ProgressBar():
                 are changing the prefix, unit, or even the size.
                 Otherwise, characters of previous frame will remain
                 in the terminal if it was longer. Defaults to False.
+            total (int, optional): Number of task units. If
+                positive, bar is filled by counter / total and
+                followed by rate and ETA. With unit "B" they are
+                formatted as sizes. Defaults to 0.
+            smoothing (float, optional): Weight of the latest
+                rate sample in the moving average. Defaults to 0.3.
 
         Modify the following special variables to control
         progress bar:
             counter (int): Number of completed task units.
                 Used in start_rendering()
+            total (int): Number of task units, 0 if unknown
             finished (bool): State that indicates that
                 progress bar has completed
         '''
@@ -62,10 +76,13 @@ class ProgressBar():
         self.frames = frames
         self.timeout = timeout
         self.clearMode = clearMode
+        self.smoothing = smoothing
         #  Special variables
         self.frame = 0
         self.counter = 0
+        self.total = total
         self.finished = False
+        self.reset()
 
     def __enter__(self) -> "ProgressBar":
         self.renderingThread = threading.Thread(target=self.start_rendering)
@@ -84,44 +101,161 @@ class ProgressBar():
             f"prefix=\"{self.prefix}\", "
             f"frames=\"{self.frames}\", "
             f"timeout={self.timeout}, "
-            f"clearMode={self.clearMode}"
+            f"clearMode={self.clearMode}, "
+            f"total={self.total}, "
+            f"smoothing={self.smoothing}"
             ")"
         )
 
-    def render(self, counter: int) -> bool:
+    #  Minimum time between rate samples, seconds
+    rateInterval = 0.5
+
+    def reset(self):
+        '''
+        Forget rate and the last rendered line,
+        called before rendering a new task
         '''
-        Render progress bar
+        self.rate = 0.0
+        self.startTime = time.monotonic()
+        self.endTime = None
+        self.lastSample = (self.startTime, 0)
+        self.lastLine = None
+
+    def format_count(self, value: float) -> str:
+        '''
+        Format counter, total or rate in task units
+
+        Args:
+            value (float): Number of task units
+
+        Returns:
+            str: Number, or size if unit is "B"
+        '''
+        if self.unit != "B":
+            return f"{value:.0f}" if value == int(value) else f"{value:.1f}"
+
+        for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+            if value < 1024 or unit == "TiB":
+                break
+            value /= 1024
+        return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+
+    def sample_rate(self, counter: int):
+        '''
+        Update exponentially weighted moving average of rate,
+        at most once in rateInterval so the text is stable
+
+        Args:
+            counter (int): Number of completed task units
+        '''
+        now = time.monotonic()
+        lastTime, lastCounter = self.lastSample
+        if now - lastTime < self.rateInterval:
+            return
+
+        rate = (counter - lastCounter) / (now - lastTime)
+        if self.rate:
+            rate = self.smoothing * rate + (1 - self.smoothing) * self.rate
+        self.rate = rate
+        self.lastSample = (now, counter)
+
+    def format_determinate(self, counter: int) -> str:
+        '''
+        Format determinate progress bar line
+
+        Args:
+            counter (int): Number of completed task units
+
+        Returns:
+            str: Progress bar, percentage, counter, rate and ETA
+        '''
+        fraction = min(max(counter, 0) / self.total, 1.0)
+        filled = int(self.size * fraction)
+        bar = self.frames[-1] * filled + self.frames[0] * (self.size - filled)
+
+        if self.finished:
+            #  Average rate of the whole task
+            if self.endTime is None:
+                self.endTime = time.monotonic()
+            self.rate = counter / max(self.endTime - self.startTime, 1e-3)
+        else:
+            self.sample_rate(counter)
+
+        unit = "" if self.unit == "B" else f" {self.unit}"
+        text = (
+            f"{fraction:4.0%} "
+            f"{self.format_count(counter)}/{self.format_count(self.total)}"
+            f"{unit}"
+        )
+        if self.rate:
+            text += f", {self.format_count(self.rate)}{unit}/s"
+            if not self.finished:
+                seconds = int(max(self.total - counter, 0) / self.rate)
+                minutes, seconds = divmod(seconds, 60)
+                hours, minutes = divmod(minutes, 60)
+                text += f", ETA {hours:02}:{minutes:02}:{seconds:02}"
+
+        return f"{self.prefix}[{bar}] {text}"
+
+    def format_line(self, counter: int) -> str:
+        '''
+        Format the next frame of progress bar
 
         Args:
             counter (int): Number of completed task units.
                 If the counter is negative, then it is omitted
 
         Returns:
-            bool: Should the next frame of the progress bar
-                be rendered (equals to not finished)
+            str: Progress bar line
         '''
+        if self.finished:
+            self.frame = -1
+        else:
+            self.frame += 1
+            self.frame %= len(self.frames) - 1
+
+        if self.total > 0:
+            return self.format_determinate(counter)
+
         if counter >= 0:
             counter = f" {counter}"
         else:
             counter = ""
+        return (
+            f"{self.prefix}[{self.frames[self.frame] * self.size}]"
+            f"{counter} {self.unit}"
+        )
 
-        if self.clearMode:
+    def render(self, counter: int) -> bool:
+        '''
+        Render progress bar. Frame is skipped if its
+        text hasn't changed since the previous one
+
+        Args:
+            counter (int): Number of completed task units.
+                If the counter is negative, then it is omitted
+
+        Returns:
+            bool: Should the next frame of the progress bar
+                be rendered (equals to not finished)
+        '''
+        if self.clearMode or self.finished:
             end = "\n"
         else:
             end = "\r"
 
-        if self.finished:
-            end = "\n"
-            self.frame = -1
-        else:
-            self.frame += 1
-            self.frame %= len(self.frames) - 1
+        line = self.format_line(counter)
 
-        print(
-            f"{self.prefix}[{self.frames[self.frame] * self.size}]{counter} {self.unit}",
-            end=end,
-            flush=True
-        )
+        if line == self.lastLine and not self.finished:
+            return True
+
+        if self.clearMode and self.lastLine is not None:
+            clear_screen(1)
+        elif self.lastLine is not None and len(line) < len(self.lastLine):
+            #  Erase the rest of the previous line
+            line = line.ljust(len(self.lastLine))
+        self.lastLine = line
+        print(line, end=end, flush=True)
 
         return not self.finished
 
@@ -135,13 +269,12 @@ class ProgressBar():
         If you change variables in one thread
         But if in several, then manage locks yourself
         '''
+        self.reset()
         change_cursor_visibility(False)
         while True:
             if not self.render(self.counter):
                 break
             time.sleep(self.timeout)
-            if self.clearMode:
-                clear_screen(1)
         change_cursor_visibility(True)
 
     def start_rendering_mp(
@@ -149,20 +282,27 @@ class ProgressBar():
         prefix: multiprocessing.Array,
         counter: multiprocessing.Value,
         unit: multiprocessing.Array,
-        finished: multiprocessing.Value
+        finished: multiprocessing.Value,
+        total: multiprocessing.Value = None
     ):
         '''
         Multiprocessing version of start_rendering
 
         Create counter and finished as multiprocessing.Value
-        and change them from MainProcess
+        and change them from MainProcess. SharedValue can be
+        used instead, when rendering with ProgressRenderer
 
         Args:
             prefix (multiprocessing.Array, 'c'): Prefix
             counter (multiprocessing.Value, 'i'): Counter
             unit (multiprocessing.Array, 'c'): Unit or postfix
             finished (multiprocessing.Value, 'b'): Finished
+            total (multiprocessing.Value, 'q', optional): Total,
+                set before start. Defaults to None.
         '''
+        if total is not None:
+            self.total = total.value
+        self.reset()
         change_cursor_visibility(False)
         while True:
             with (
@@ -178,6 +318,110 @@ class ProgressBar():
             if not self.render(self.counter):
                 break
             time.sleep(self.timeout)
-            if self.clearMode:
-                clear_screen(1)
         change_cursor_visibility(True)
+
+
+class SharedValue():
+    def __init__(self, value: int | bytes):
+        '''
+        Value shared between threads, with the same interface
+        as multiprocessing.Value and multiprocessing.Array,
+        but without shared memory and process lock
+
+        Args:
+            value (int | bytes): Initial value
+        '''
+        self.value = value
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"SharedValue({self.value!r})"
+
+    def get_lock(self) -> threading.Lock:
+        return self._lock
+
+
+class ProgressRenderer():
+    def __init__(
+        self,
+        progressbar: ProgressBar,
+        prefix: SharedValue,
+        counter: SharedValue,
+        unit: SharedValue,
+        finished: SharedValue,
+        total: SharedValue | None = None
+    ):
+        '''
+        Renders progress bar with start_rendering_mp() in a daemon
+        thread. Has the same interface as multiprocessing.Process,
+        but can be started again after join(), which reuses the
+        thread, so short tasks don't pay for process creation
+
+        Args:
+            progressbar (ProgressBar): Progress bar to render
+            prefix (SharedValue): Prefix, bytes
+            counter (SharedValue): Counter, int
+            unit (SharedValue): Unit or postfix, bytes
+            finished (SharedValue): Finished, bool
+            total (SharedValue | None, optional): Total, int,
+                read on each start. Defaults to None.
+        '''
+        self.progressbar = progressbar
+        self.args = (prefix, counter, unit, finished, total)
+        self._thread = None
+        self._start = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+
+    def __repr__(self) -> str:
+        return (
+            "ProgressRenderer("
+            f"progressbar={self.progressbar}, "
+            f"alive={self.is_alive()}"
+            ")"
+        )
+
+    def start(self):
+        '''
+        Start rendering until finished value is set
+
+        Raises:
+            RuntimeError: Renderer is already running
+        '''
+        if self.is_alive():
+            raise RuntimeError("Progress renderer is already running")
+
+        self._done.clear()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        self._start.set()
+
+    def run(self):
+        '''
+        Thread loop, renders progress bar each time it's started
+        '''
+        while True:
+            self._start.wait()
+            self._start.clear()
+            try:
+                self.progressbar.start_rendering_mp(*self.args)
+            finally:
+                self._done.set()
+
+    def is_alive(self) -> bool:
+        '''
+        Returns:
+            bool: Progress bar is being rendered
+        '''
+        return not self._done.is_set()
+
+    def join(self, timeout: float | None = None):
+        '''
+        Wait for the progress bar to render finished state
+
+        Args:
+            timeout (float | None, optional): Seconds to wait.
+                Defaults to None.
+        '''
+        self._done.wait(timeout)
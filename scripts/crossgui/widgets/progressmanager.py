@@ -0,0 +1,236 @@
+'''
+This file is part of 2trvl/crossgui
+Common widgets between different environments
+Which is released under BSD-2-Clause license
+Copyright (c) 2023 Andrew Shteren
+---------------------------------------------
+               Progress Manager
+---------------------------------------------
+Render progress bars of concurrent workers
+one per line, with an aggregate bar below
+
+'''
+import sys
+import threading
+import time
+
+from ..runtime.terminal import (
+    WINDOWS_VT_MODE,
+    change_cursor_visibility,
+    clear_screen
+)
+from .progressbar import ProgressBar
+
+
+class ProgressHandle():
+    def __init__(self, prefix: str = "", total: int = 0, unit: str = ""):
+        '''
+        Progress of a single worker, updated without locks,
+        so each handle should be changed by one thread only
+
+        Args:
+            prefix (str, optional): Prefix. Defaults to "".
+            total (int, optional): Number of task units,
+                0 if unknown. Defaults to 0.
+            unit (str, optional): Task unit or postfix.
+                Defaults to "".
+        '''
+        self.prefix = prefix
+        self.total = total
+        self.unit = unit
+        self.counter = 0
+        self.finished = False
+
+    def __repr__(self) -> str:
+        return (
+            "ProgressHandle("
+            f"prefix=\"{self.prefix}\", "
+            f"counter={self.counter}, "
+            f"total={self.total}, "
+            f"finished={self.finished}"
+            ")"
+        )
+
+    def update(self, increment: int = 1):
+        '''
+        Increment counter
+
+        Args:
+            increment (int, optional): Completed task
+                units. Defaults to 1.
+        '''
+        self.counter += increment
+
+    def finish(self):
+        self.finished = True
+
+
+class ProgressManager():
+    def __init__(
+        self,
+        size: int = 30,
+        unit: str = "",
+        aggregatePrefix: str | None = "Total : ",
+        timeout: float = 0.1
+    ):
+        '''
+        Renders progress bars of workers and an aggregate
+        of them in a thread. Each frame is written to the
+        terminal at once, frames that haven't changed are
+        skipped
+
+        Args:
+            size (int, optional): Bar length. Defaults to 30.
+            unit (str, optional): Default unit of bars, "B"
+                to format counters as sizes. Defaults to "".
+            aggregatePrefix (str | None, optional): Prefix of aggregate
+                bar, None to hide it. Defaults to "Total : ".
+            timeout (float, optional): Pause between frames.
+                Defaults to 0.1.
+
+        Aggregate bar is determinate if all bars have total,
+        and is finished when all of them are finished
+
+        Usage:
+            with ProgressManager(unit="files") as manager:
+                handle = manager.add("Drive C: ", total=10)
+                handle.update()
+                handle.finish()
+        '''
+        self.size = size
+        self.unit = unit
+        self.aggregatePrefix = aggregatePrefix
+        self.timeout = timeout
+        self.handles = []
+        self.bars = []
+        if aggregatePrefix is not None:
+            self.aggregate = ProgressBar(size, unit, aggregatePrefix)
+        else:
+            self.aggregate = None
+        self.finished = False
+        self.lines = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ProgressManager":
+        self.renderingThread = threading.Thread(
+            target=self.start_rendering, daemon=True
+        )
+        self.renderingThread.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.finished = True
+        self.renderingThread.join()
+
+    def __repr__(self) -> str:
+        return (
+            "ProgressManager("
+            f"size={self.size}, "
+            f"unit=\"{self.unit}\", "
+            f"aggregatePrefix=\"{self.aggregatePrefix}\", "
+            f"timeout={self.timeout}, "
+            f"bars={len(self.handles)}"
+            ")"
+        )
+
+    def add(
+        self, prefix: str = "", total: int = 0, unit: str | None = None
+    ) -> ProgressHandle:
+        '''
+        Add a bar for a worker or task
+
+        Args:
+            prefix (str, optional): Prefix. Defaults to "".
+            total (int, optional): Number of task units,
+                0 if unknown. Defaults to 0.
+            unit (str | None, optional): Task unit, manager
+                unit if None. Defaults to None.
+
+        Returns:
+            ProgressHandle: Handle to update the bar with
+        '''
+        if unit is None:
+            unit = self.unit
+        handle = ProgressHandle(prefix, total, unit)
+        with self._lock:
+            self.handles.append(handle)
+            self.bars.append(ProgressBar(self.size, unit, prefix, total=total))
+        return handle
+
+    def format_frame(self) -> list[str]:
+        '''
+        Copy handles to their bars and format lines
+
+        Returns:
+            list[str]: Lines of bars, aggregate is the last
+        '''
+        with self._lock:
+            bars = list(zip(self.handles, self.bars))
+
+        lines = []
+        for handle, bar in bars:
+            bar.prefix = handle.prefix
+            bar.total = handle.total
+            bar.unit = handle.unit
+            bar.finished = handle.finished
+            lines.append(bar.format_line(handle.counter))
+
+        if self.aggregate is not None:
+            handles = [handle for handle, _ in bars]
+            if handles and all(handle.total > 0 for handle in handles):
+                self.aggregate.total = sum(handle.total for handle in handles)
+            else:
+                self.aggregate.total = 0
+            self.aggregate.finished = self.finished or (
+                bool(handles) and all(handle.finished for handle in handles)
+            )
+            lines.append(
+                self.aggregate.format_line(
+                    sum(handle.counter for handle in handles)
+                )
+            )
+
+        return lines
+
+    def render(self) -> bool:
+        '''
+        Render bars, overwriting the previous frame
+
+        Returns:
+            bool: Should the next frame be rendered
+                (equals to not finished)
+        '''
+        finished = self.finished
+        lines = self.format_frame()
+        if lines == self.lines and not finished:
+            return True
+
+        #  Windows API is used to move cursor, if ANSI
+        #  escape sequences are unavailable
+        if WINDOWS_VT_MODE():
+            if self.lines:
+                clear_screen(len(self.lines))
+            frame = [f"{line}\n" for line in lines]
+        else:
+            #  Move up to the first bar, erase tail of each line
+            frame = [f"\033[{len(self.lines)}A\r"] if self.lines else []
+            frame.extend(f"{line}\033[K\n" for line in lines)
+        self.lines = lines
+
+        sys.stdout.write("".join(frame))
+        sys.stdout.flush()
+
+        return not finished
+
+    def start_rendering(self):
+        '''
+        Render frames until finished is set
+        '''
+        for bar in self.bars + [self.aggregate]:
+            if bar is not None:
+                bar.reset()
+        self.lines = []
+        change_cursor_visibility(False)
+        while self.render():
+            time.sleep(self.timeout)
+        change_cursor_visibility(True)
@@ -0,0 +1,187 @@
+'''
+Checks of archiver that write to the filesystem,
+run with "python -m unittest discover scripts/tests"
+'''
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archiver import PreadFile, ZipFile  # noqa: E402
+
+
+class CopyMemberTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    @unittest.skipUnless(shutil.which("zip"), "zip is needed to encrypt")
+    def test_encrypted_data_descriptor(self):
+        #  Member zipped from stdin has data descriptor
+        sourcePath = os.path.join(self.root, "source.zip")
+        subprocess.run(
+            ["zip", "-q", "-P", "password", sourcePath, "-"],
+            input=b"secret",
+            check=True
+        )
+        targetPath = os.path.join(self.root, "target.zip")
+
+        with ZipFile(file=sourcePath, mode="r", progressbar=False) as source, \
+            ZipFile(file=targetPath, mode="w", progressbar=False) as target:
+            member = source.infolist()[0]
+            self.assertEqual(member.flag_bits & 0x9, 0x9)
+            self.assertTrue(target.copy_member(source, member, "copied"))
+            self.assertEqual(target.read("copied", pwd=b"password"), b"secret")
+
+        with ZipFile(file=targetPath, mode="r", progressbar=False) as target:
+            self.assertEqual(target.read("copied", pwd=b"password"), b"secret")
+
+    def test_root_duplicate(self):
+        sourcePath = os.path.join(self.root, "source.zip")
+        with ZipFile(file=sourcePath, mode="w", progressbar=False) as source:
+            source.writestr("file.txt", "first")
+        targetPath = os.path.join(self.root, "target.zip")
+
+        with ZipFile(file=sourcePath, mode="r", progressbar=False) as source, \
+            ZipFile(file=targetPath, mode="w", progressbar=False) as target:
+            member = source.getinfo("file.txt")
+            self.assertTrue(target.copy_member(source, member))
+            self.assertTrue(target.copy_member(source, member))
+            self.assertEqual(target.namelist(), ["file.txt", "file (1).txt"])
+
+
+class PreadFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.zipPath = os.path.join(self.tempDir.name, "backup.zip")
+        with zipfile.ZipFile(
+            self.zipPath, "w", zipfile.ZIP_DEFLATED
+        ) as archive:
+            archive.writestr("first", b"1" * 100000)
+            archive.writestr("second", os.urandom(100000))
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    @unittest.skipUnless(hasattr(os, "pread"), "os.pread is unavailable")
+    def test_interleaved_readers(self):
+        with ZipFile(
+            file=self.zipPath, mode="r", progressbar=False
+        ) as archive:
+            expected = [archive.read("first"), archive.read("second")]
+            position = archive.fp.tell()
+
+            #  Readers don't share the archive file position
+            with archive.open("first") as first, \
+                archive.open("second") as second:
+                self.assertIsInstance(first._fileobj, PreadFile)
+                chunks = [[], []]
+                while True:
+                    chunks[0].append(first.read(4096))
+                    chunks[1].append(second.read(4096))
+                    if not chunks[0][-1] and not chunks[1][-1]:
+                        break
+
+            self.assertEqual([b"".join(chunk) for chunk in chunks], expected)
+            self.assertEqual(archive.fp.tell(), position)
+
+
+class SidecarIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.zipPath = os.path.join(self.tempDir.name, "backup.zip")
+        with zipfile.ZipFile(self.zipPath, "w") as archive:
+            archive.writestr("backup/", "")
+            archive.writestr("backup/file.txt", "data")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def open(self) -> ZipFile:
+        return ZipFile(
+            file=self.zipPath, mode="r", progressbar=False, useIndex=True
+        )
+
+    def members(self, archive: ZipFile) -> list[tuple]:
+        return [
+            (
+                info.filename,
+                info.header_offset,
+                info.CRC,
+                info.file_size,
+                info.date_time
+            )
+            for info in archive.infolist()
+        ]
+
+    def test_loaded(self):
+        with self.open() as archive:
+            expected = self.members(archive)
+        self.assertTrue(os.path.isfile(f"{self.zipPath}.idx"))
+
+        #  Names aren't decoded when central directory isn't parsed
+        with mock.patch.object(
+            ZipFile, "decode_filename", side_effect=AssertionError
+        ):
+            archive = self.open()
+        with archive:
+            self.assertEqual(self.members(archive), expected)
+            self.assertEqual(archive.read("backup/file.txt"), b"data")
+
+    def test_stale(self):
+        with self.open():
+            pass
+        with zipfile.ZipFile(self.zipPath, "a") as archive:
+            archive.writestr("backup/added.txt", "added")
+
+        with self.open() as archive:
+            self.assertEqual(archive.read("backup/added.txt"), b"added")
+
+
+class ExtractAllTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.zipPath = os.path.join(self.root, "backup.zip")
+        with zipfile.ZipFile(self.zipPath, "w") as archive:
+            archive.writestr("backup/", "")
+            archive.writestr("backup/skipped/", "")
+            archive.writestr("backup/skipped/first.txt", "1" * 100)
+            archive.writestr("backup/skipped/second.txt", "2" * 50)
+            archive.writestr("backup/kept.txt", "3" * 10)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_ignored_progress(self):
+        #  Counters are reset when progress bar finishes
+        with mock.patch.object(ZipFile, "_reset_progressbar"), \
+            contextlib.redirect_stdout(io.StringIO()), \
+            ZipFile(
+                file=self.zipPath,
+                mode="r",
+                ignore=["skipped"],
+                progressbar=True
+            ) as archive:
+            archive.extractall(self.root)
+            self.assertEqual(archive.total.value, 160)
+            self.assertEqual(archive.counter.value, 160)
+
+        self.assertEqual(
+            os.listdir(os.path.join(self.root, "backup")), ["kept.txt"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
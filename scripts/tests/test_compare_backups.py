@@ -0,0 +1,689 @@
+'''
+Checks of compare_backups that write to the filesystem,
+run with "python -m unittest discover scripts/tests"
+'''
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+import zlib
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archiver import ZipFile  # noqa: E402
+from compare_backups import (  # noqa: E402
+    BackupFinder,
+    ChangeJournal,
+    CmpStats,
+    DeltaArchive,
+    DirCmp,
+    FileCmp,
+    HashCache,
+    Inotify,
+    ReportWriter,
+    ScanCmp,
+    SnapshotEntry,
+    SortCmp,
+    ZipCmp,
+    file_checksums,
+    monitor_drives,
+    scan_tree,
+    write_comparison
+)
+
+
+class DeltaArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.base = os.path.join(self.root, "backup")
+        self.victim = os.path.join(self.root, "victim")
+        os.makedirs(os.path.join(self.base, "kept"))
+        os.makedirs(self.victim)
+        with open(os.path.join(self.victim, "file"), "w") as file:
+            file.write("victim")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def write_delta(self, members: dict[str, str], tombstones: str = ""):
+        deltaPath = os.path.join(self.root, "delta.zip")
+        with zipfile.ZipFile(deltaPath, "w") as delta:
+            delta.writestr("backup/", "")
+            for name, data in members.items():
+                delta.writestr(name, data)
+            delta.writestr(DeltaArchive.tombstonesName, tombstones)
+        return DeltaArchive(deltaPath, "utf-8")
+
+    def assertUntouched(self):
+        self.assertTrue(os.path.isfile(os.path.join(self.victim, "file")))
+        self.assertTrue(os.path.isdir(os.path.join(self.base, "kept")))
+
+    def test_tombstone_outside(self):
+        for name in (
+            "../victim", "../victim/", self.victim, "kept/../../victim"
+        ):
+            delta = self.write_delta({}, f"kept\n{name}\n")
+            with self.assertRaises(ValueError):
+                delta.apply_dir(self.base)
+            self.assertUntouched()
+
+    def test_member_outside(self):
+        delta = self.write_delta({"backup/../escaped": "data"}, "kept\n")
+        with self.assertRaises(ValueError):
+            delta.apply_dir(self.base)
+        self.assertUntouched()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "escaped")))
+
+    def test_member_through_symlink(self):
+        delta = self.write_delta({
+            "backup/__symlink__link": f"link,{self.victim},True",
+            "backup/link/file": "overwritten"
+        })
+        with self.assertRaises(ValueError):
+            delta.apply_dir(self.base)
+        self.assertUntouched()
+        with open(os.path.join(self.victim, "file")) as file:
+            self.assertEqual(file.read(), "victim")
+
+    def test_apply_zip_failed(self):
+        basePath = os.path.join(self.root, "backup.zip")
+        with zipfile.ZipFile(basePath, "w") as base:
+            base.writestr("backup/", "")
+            base.writestr("backup/kept", "data")
+        delta = self.write_delta({"backup/new": "data"})
+
+        #  Fails after the root directory is written
+        copy_member = ZipFile.copy_member
+
+        def copy_dirs(target, source, info, *args):
+            if not info.is_dir():
+                raise OSError("disk is full")
+            return copy_member(target, source, info, *args)
+
+        with mock.patch.object(ZipFile, "copy_member", copy_dirs), \
+            self.assertRaises(OSError):
+            delta.apply_zip(basePath)
+        self.assertFalse(os.path.exists(f"{basePath}.delta"))
+        with zipfile.ZipFile(basePath) as base:
+            self.assertEqual(base.namelist(), ["backup/", "backup/kept"])
+
+    def test_apply(self):
+        delta = self.write_delta({"backup/new/file": "data"}, "kept/\n")
+        delta.apply_dir(self.base)
+        self.assertFalse(os.path.exists(os.path.join(self.base, "kept")))
+        with open(os.path.join(self.base, "new", "file")) as file:
+            self.assertEqual(file.read(), "data")
+
+
+class BackupFinderTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.drives = {}
+        for drive, backup in (
+            ("first", "backup.zip"),
+            ("second", os.path.join("dir", "backup.zip")),
+            ("stale", "backup.zip")
+        ):
+            path = os.path.join(self.root, drive, backup)
+            os.makedirs(os.path.dirname(path))
+            open(path, "w").close()
+            self.drives[drive] = path
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_timeout(self):
+        finder = BackupFinder(
+            "backup.zip", depth=1, timeout=0.2, useCache=False
+        )
+        stale = os.path.join(self.root, "stale")
+        released = threading.Event()
+        self.addCleanup(released.set)
+        probe = finder.probe
+
+        def hanging_probe(drive: str, cached: dict | None = None) -> dict:
+            if drive == stale:
+                released.wait()
+            return probe(drive, cached)
+
+        output = io.StringIO()
+        with mock.patch.object(finder, "probe", hanging_probe), \
+            contextlib.redirect_stdout(output):
+            start = time.monotonic()
+            backups = finder.find(
+                {os.path.join(self.root, drive) for drive in self.drives}
+            )
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(
+            backups, [self.drives["first"], self.drives["second"]]
+        )
+        self.assertIn(f"Skipped {stale}", output.getvalue())
+
+
+class MonitorDrivesTest(unittest.TestCase):
+    class Stop(Exception):
+        pass
+
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.destination = os.path.join(self.root, "dest")
+        os.makedirs(self.destination)
+        with open(os.path.join(self.destination, "kept.txt"), "w") as file:
+            file.write("kept")
+
+        self.broken = os.path.join(self.root, "broken")
+        os.makedirs(self.broken)
+        with open(os.path.join(self.broken, "backup.zip"), "w") as file:
+            file.write("not a zip")
+        self.drive = os.path.join(self.root, "drive")
+        os.makedirs(self.drive)
+        zipPath = os.path.join(self.drive, "backup.zip")
+        with zipfile.ZipFile(zipPath, "w") as archive:
+            archive.writestr("backup/kept.txt", "kept")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def change_destination(self):
+        with open(os.path.join(self.destination, "new.txt"), "w") as file:
+            file.write("new")
+        ChangeJournal(self.destination).append(["changed new.txt"])
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_mounts(self):
+        reportPath = os.path.join(self.root, "report.jsonl")
+        #  Broken backup is mounted, then destination changes
+        #  and the next drive is mounted
+        events = [None, self.change_destination]
+
+        def poll():
+            if not events:
+                raise self.Stop()
+            event = events.pop(0)
+            if event is not None:
+                event()
+
+        poller = mock.Mock()
+        poller.poll.side_effect = poll
+
+        output = io.StringIO()
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": self.root}), \
+            mock.patch.object(
+                ChangeJournal, "is_watched", return_value=True
+            ), \
+            mock.patch("select.poll", return_value=poller), \
+            mock.patch(
+                "compare_backups.get_storage_drives",
+                side_effect=[set(), {self.broken}, {self.broken, self.drive}]
+            ), \
+            contextlib.redirect_stdout(output), \
+            self.assertRaises(self.Stop):
+            monitor_drives(
+                "backup.zip",
+                self.destination,
+                reportFilepath=reportPath,
+                reportFormat="jsonl",
+                useCache=False
+            )
+
+        self.assertIn("( failed, BadZipFile", output.getvalue())
+        with open(reportPath) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(
+            [(record["status"], record["path"]) for record in records[:-1]],
+            [("removed", "new.txt")]
+        )
+
+
+class CmpStatsTest(unittest.TestCase):
+    def test_skip(self):
+        def entries():
+            raise AssertionError("entries are listed without tracking")
+            yield
+
+        stats = CmpStats()
+        stats.skip(entries())
+        self.assertEqual(stats.processed, 0)
+
+        with tempfile.TemporaryDirectory() as root:
+            os.mkdir(os.path.join(root, "dir"))
+            with open(os.path.join(root, "file"), "wb") as file:
+                file.write(b"12345")
+            stats.tracking = True
+            with os.scandir(root) as scanner:
+                stats.skip(scanner)
+        self.assertEqual(stats.processed, 5)
+
+
+class FileCmpTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.left = os.path.join(self.tempDir.name, "left")
+        self.right = os.path.join(self.tempDir.name, "right")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def compare(self, left: bytes, right: bytes, verify: str) -> FileCmp:
+        for path, data in ((self.left, left), (self.right, right)):
+            with open(path, "wb") as file:
+                file.write(data)
+        os.utime(self.right, ns=(os.stat(self.left).st_mtime_ns,) * 2)
+
+        comparator = FileCmp(verify)
+        #  Blocks at 0, 6 and 12 of 16 bytes files
+        comparator.sampleSize = 4
+        self.same = comparator.compare(self.left, self.right)
+        return comparator
+
+    def test_tiers(self):
+        data = b"0123456789abcdef"
+        #  Differs between the sampled blocks
+        unsampled = b"01234X6789abcdef"
+
+        for left, right, verify, same, tier in (
+            (data, data[:-1], "full", False, "stat"),
+            (data, unsampled, "stat", True, "stat"),
+            (data, b"X" + data[1:], "sample", False, "sample"),
+            (data, unsampled, "sample", True, "sample"),
+            (data, unsampled, "full", False, "full"),
+            (data, data, "full", True, "full")
+        ):
+            with self.subTest(right=right, verify=verify):
+                comparator = self.compare(left, right, verify)
+                self.assertEqual(self.same, same)
+                self.assertEqual(comparator.resolved[tier], 1)
+                self.assertEqual(sum(comparator.resolved.values()), 1)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            FileCmp("crc")
+
+
+class HashCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.left = os.path.join(self.root, "left")
+        self.cachePath = os.path.join(self.root, "cache", "left.cache")
+        os.makedirs(self.left)
+        for name in ("kept", "changed", "removed"):
+            self.write(name, name)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def write(self, name: str, data: str):
+        with open(os.path.join(self.left, name), "w") as file:
+            file.write(data)
+
+    def test_reused(self):
+        cache = HashCache(self.left, self.cachePath)
+        for name in ("kept", "changed", "removed"):
+            self.assertEqual(
+                cache.checksums(name)[0], zlib.crc32(name.encode())
+            )
+        cache.save()
+
+        os.remove(os.path.join(self.left, "removed"))
+        self.write("changed", "changed again")
+        os.utime(os.path.join(self.left, "changed"), ns=(0, 0))
+
+        #  Only the changed file is read again
+        cache = HashCache(self.left, self.cachePath)
+        with mock.patch(
+            "compare_backups.file_checksums", wraps=file_checksums
+        ) as checksums:
+            self.assertEqual(
+                cache.checksums("kept")[0], zlib.crc32(b"kept")
+            )
+            self.assertEqual(
+                cache.checksums("changed")[0], zlib.crc32(b"changed again")
+            )
+        self.assertEqual(checksums.call_count, 1)
+
+        #  Entries that weren't looked up are dropped
+        cache.save()
+        cache = HashCache(self.left, self.cachePath)
+        self.assertEqual(sorted(cache.entries), ["changed", "kept"])
+
+
+class ChangeJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tempDir.name, "root")
+        for name in ("top", "a/file", "a/b/deep"):
+            self.write(name)
+        self.journal = ChangeJournal(
+            self.root, os.path.join(self.tempDir.name, "journal")
+        )
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def write(self, name: str):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(name)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "Linux only")
+    def test_inotify(self):
+        with Inotify() as inotify:
+            wd = inotify.add_watch(self.root, ChangeJournal.mask)
+            self.write("created")
+            events = [*inotify.read_events()]
+        self.assertIn((wd, Inotify.IN_CREATE, "created"), events)
+
+    @mock.patch.object(ChangeJournal, "is_watched", return_value=True)
+    def test_scan(self, _):
+        self.journal.scan([])
+        self.assertTrue(self.journal.fullScan)
+
+        #  Only journal names are listed, others come from snapshot
+        shutil.rmtree(os.path.join(self.root, "a", "b"))
+        self.write("a/new")
+        self.write("c/added")
+        self.journal.append([
+            f"changed {os.path.join('a', 'b')}{os.sep}",
+            f"changed {os.path.join('a', 'new')}",
+            f"changed c{os.sep}"
+        ])
+        with mock.patch(
+            "compare_backups.scan_tree", side_effect=AssertionError
+        ):
+            entries = self.journal.scan([])
+        self.assertFalse(self.journal.fullScan)
+        self.assertEqual(sorted(entries), sorted(scan_tree(self.root, [])))
+        self.assertIsInstance(entries["top"], SnapshotEntry)
+        self.assertEqual(entries["top"].stat().st_size, 3)
+
+        #  Missed changes lead to full scan
+        self.journal.append(["overflow"])
+        self.journal.scan([])
+        self.assertTrue(self.journal.fullScan)
+
+
+class DirCmpTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.left = os.path.join(self.root, "left")
+        self.right = os.path.join(self.root, "right")
+        files = {
+            "left": ("same", "a/same", "a/diff", "a/b/removed", "c/removed"),
+            "right": ("same", "a/same", "a/diff", "a/new", "d/e/new")
+        }
+        for side, names in files.items():
+            for name in names:
+                path = os.path.join(self.root, side, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as file:
+                    file.write(side if name.endswith("diff") else name)
+        os.symlink("same", os.path.join(self.left, "link"))
+        with open(os.path.join(self.right, "link"), "w") as file:
+            file.write("same")
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_compact(self):
+        default = DirCmp(self.left, self.right)
+        compact = DirCmp(self.left, self.right, compact=True)
+        for attr in (
+            "left_only", "right_only", "diff_files", "same_files", "funny_files"
+        ):
+            self.assertEqual(
+                sorted(getattr(compact, attr)),
+                sorted(getattr(default, attr)),
+                attr
+            )
+        self.assertIs(compact.left_only, compact.left_only)
+        with self.assertRaisesRegex(AttributeError, "compact mode"):
+            compact.common_dirs
+        with self.assertRaises(ValueError):
+            DirCmp(self.left, self.right, workers=2, compact=True)
+
+    def test_failed_subdir(self):
+        compared = DirCmp(self.left, self.right, workers=2)
+        with mock.patch.object(
+            DirCmp, "compare_subdir", side_effect=OSError("unreadable")
+        ):
+            with self.assertRaises(OSError):
+                compared.left_only
+        self.assertTrue(compared.executor._shutdown)
+
+    def test_out_of_core_symlink(self):
+        with SortCmp(self.left, self.right) as compared:
+            self.assertEqual(
+                list(compared.section_names("Modified")),
+                [os.path.join("a", "diff"), "link"]
+            )
+            self.assertEqual(list(compared.section_names("Error")), [])
+
+    def test_scanned_symlink(self):
+        with ScanCmp(self.left, self.right) as compared:
+            self.assertEqual(
+                sorted(compared.diff_files), [os.path.join("a", "diff"), "link"]
+            )
+            self.assertEqual(compared.funny_files, [])
+
+    def test_streamed_report(self):
+        reportPath = os.path.join(self.root, "report.jsonl")
+        with ReportWriter(reportPath, "jsonl") as report:
+            compared = ScanCmp(
+                self.left,
+                self.right,
+                onEntry=report.entry_writer(self.right, detectMoves=False)
+            )
+            report.output.flush()
+            with open(reportPath) as file:
+                streamed = [json.loads(line) for line in file]
+            write_comparison(
+                compared, self.left, self.right, report, detectMoves=False
+            )
+
+        with open(reportPath) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(records[:len(streamed)], streamed)
+        self.assertEqual(
+            sorted(record["status"] for record in streamed),
+            ["modified"] * 2 + ["new"] * 4 + ["removed"] * 4
+        )
+        self.assertEqual(records[-1]["status"], "summary")
+        entries = [
+            (record["status"], record["path"]) for record in records[:-1]
+        ]
+        self.assertEqual(len(entries), len(set(entries)))
+
+
+class CmpMovesTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.left = os.path.join(self.root, "left")
+        self.right = os.path.join(self.root, "right")
+        files = {
+            "left": {
+                "old/name.txt": "moved",
+                "gone.txt": "gone",
+                "first": "copy",
+                "second": "copy"
+            },
+            "right": {
+                "new/name.txt": "moved",
+                "fresh.txt": "frsh",
+                "copies/first": "copy",
+                "copies/second": "copy"
+            }
+        }
+        for side, names in files.items():
+            for name, data in names.items():
+                path = os.path.join(self.root, side, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as file:
+                    file.write(data)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def test_find_moved(self):
+        #  Files of the same size with other content aren't moved,
+        #  same content is paired in names order
+        expected = {
+            "first": os.path.join("copies", "first"),
+            "second": os.path.join("copies", "second"),
+            os.path.join("old", "name.txt"): os.path.join("new", "name.txt")
+        }
+        for cmpClass in (DirCmp, ScanCmp):
+            with self.subTest(cmpClass=cmpClass.__name__):
+                compared = cmpClass(self.left, self.right)
+                self.assertEqual(compared.find_moved(), expected)
+
+    def test_report(self):
+        reportPath = os.path.join(self.root, "report.jsonl")
+        with ReportWriter(reportPath, "jsonl") as report:
+            write_comparison(
+                ScanCmp(self.left, self.right), self.left, self.right, report
+            )
+
+        with open(reportPath) as file:
+            records = [json.loads(line) for line in file]
+        entries = {
+            (record["status"], record["path"], record.get("target"))
+            for record in records[:-1]
+        }
+        self.assertIn(
+            (
+                "moved",
+                os.path.join("old", "name.txt"),
+                os.path.join("new", "name.txt")
+            ),
+            entries
+        )
+        self.assertIn(("removed", "gone.txt", None), entries)
+        self.assertIn(("new", "fresh.txt", None), entries)
+        self.assertIn(
+            ("moved", "first", os.path.join("copies", "first")), entries
+        )
+        self.assertNotIn(("removed", "first", None), entries)
+
+
+class ZipCmpTest(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.root = self.tempDir.name
+        self.left = os.path.join(self.root, "left")
+        self.outside = os.path.join(self.root, "outside")
+        self.extractPath = os.path.join(self.root, "out", "x")
+        os.makedirs(self.left)
+        os.makedirs(self.outside)
+
+    def tearDown(self):
+        self.tempDir.cleanup()
+
+    def compare(self, members: dict[str, str], **kwargs) -> ZipCmp:
+        zipPath = os.path.join(self.root, "backup.zip")
+        with zipfile.ZipFile(zipPath, "w") as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+        with ZipFile(
+            file=zipPath,
+            mode="r",
+            preferredEncoding="utf-8",
+            progressbar=False
+        ) as archive:
+            options = dict(verify="full", extractPath=self.extractPath)
+            options.update(kwargs)
+            return ZipCmp(self.left, archive, "backup", **options)
+
+    def test_member_outside(self):
+        compared = self.compare({
+            "backup/b/../../escaped.txt": "data",
+            "backup//abs.txt": "data",
+            "backup/kept.txt": "data"
+        })
+        self.assertEqual(
+            sorted(compared.funny_files), ["/abs.txt", "b/../../escaped.txt"]
+        )
+        self.assertEqual(compared.extracted, 1)
+        for _, _, files in os.walk(self.root):
+            self.assertNotIn("escaped.txt", files)
+            self.assertNotIn("abs.txt", files)
+
+    def test_central_directory(self):
+        for name, data in (("same.txt", "data"), ("modified.txt", "old!")):
+            with open(os.path.join(self.left, name), "w") as file:
+                file.write(data)
+        os.mkdir(os.path.join(self.left, "removed"))
+        os.symlink("same.txt", os.path.join(self.left, "link"))
+
+        #  Files are compared with CRC32 of members, nothing is extracted
+        with mock.patch.object(
+            ZipFile, "extractall", side_effect=AssertionError
+        ), mock.patch.object(ZipFile, "extract", side_effect=AssertionError):
+            compared = self.compare(
+                {
+                    "backup/same.txt": "data",
+                    "backup/modified.txt": "new!",
+                    "backup/new.txt": "new",
+                    "backup/__symlink__link": "link,same.txt,False"
+                },
+                verify="crc",
+                extractPath=None
+            )
+
+        self.assertEqual(sorted(compared.same_files), ["link", "same.txt"])
+        self.assertEqual(compared.diff_files, ["modified.txt"])
+        self.assertEqual([*compared.left_only], [f"removed{os.sep}"])
+        self.assertEqual([*compared.right_only], ["new.txt"])
+        self.assertEqual(compared.resolved, {"stat": 1, "crc": 2, "full": 0})
+
+    def test_full_verify_single_read(self):
+        with open(os.path.join(self.left, "same.txt"), "w") as file:
+            file.write("data")
+        hashCache = HashCache(self.left, os.path.join(self.root, "cache"))
+
+        #  Checksums for the cache come from the content comparison
+        with mock.patch("compare_backups.file_checksums") as checksums:
+            compared = self.compare(
+                {"backup/same.txt": "data"}, hashCache=hashCache
+            )
+        checksums.assert_not_called()
+        self.assertEqual(compared.same_files, ["same.txt"])
+        fileStat = os.stat(os.path.join(self.left, "same.txt"))
+        self.assertEqual(
+            hashCache.cached("same.txt", fileStat)[0], zlib.crc32(b"data")
+        )
+
+        #  Cached CRC rejects changed member without reading
+        with mock.patch.object(ZipCmp, "compare_contents") as contents:
+            compared = self.compare(
+                {"backup/same.txt": "diff"}, hashCache=hashCache
+            )
+        contents.assert_not_called()
+        self.assertEqual(compared.diff_files, ["same.txt"])
+
+    def test_member_through_symlink(self):
+        compared = self.compare({
+            "backup/__symlink__a": f"a,{self.outside},True",
+            "backup/a/passwd": "overwritten"
+        })
+        self.assertEqual(compared.funny_files, [os.path.join("a", "passwd")])
+        self.assertEqual(os.listdir(self.outside), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
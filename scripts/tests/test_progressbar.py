@@ -0,0 +1,103 @@
+'''
+Checks of progress bar rendering and formatting,
+run with "python -m unittest discover scripts/tests"
+'''
+import contextlib
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crossgui.widgets import (  # noqa: E402
+    ProgressBar,
+    ProgressRenderer,
+    SharedValue
+)
+
+
+class ProgressRendererTest(unittest.TestCase):
+    def setUp(self):
+        self.counter = SharedValue(0)
+        self.unit = SharedValue(b"files")
+        self.finished = SharedValue(False)
+        self.renderer = ProgressRenderer(
+            ProgressBar(10, timeout=0.01),
+            SharedValue(b""),
+            self.counter,
+            self.unit,
+            self.finished,
+            SharedValue(0)
+        )
+
+    def render_task(self, counter: int) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.finished.value = False
+            self.renderer.start()
+            self.counter.value = counter
+            self.finished.value = True
+            self.renderer.join(5)
+        self.assertFalse(self.renderer.is_alive())
+        return output.getvalue()
+
+    def test_reused(self):
+        #  Second task is rendered by the thread of the first one
+        self.assertIn("[==========] 3 files", self.render_task(3))
+        thread = self.renderer._thread
+        self.assertIn("[==========] 7 files", self.render_task(7))
+        self.assertIs(self.renderer._thread, thread)
+
+    def test_start_running(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.renderer.start()
+            try:
+                with self.assertRaises(RuntimeError):
+                    self.renderer.start()
+            finally:
+                self.finished.value = True
+                self.renderer.join(5)
+
+
+class DeterminateTest(unittest.TestCase):
+    @mock.patch("crossgui.widgets.progressbar.time")
+    def test_sizes(self, clock):
+        clock.monotonic.return_value = 0.0
+        bar = ProgressBar(10, "B", "Copy : ", total=4096, smoothing=0.5)
+        bar.reset()
+
+        clock.monotonic.return_value = 1.0
+        self.assertEqual(
+            bar.format_line(1024),
+            "Copy : [==--------]  25% 1.0 KiB/4.0 KiB, 1.0 KiB/s, ETA 00:00:03"
+        )
+
+        #  Rate is a moving average of samples
+        clock.monotonic.return_value = 2.0
+        self.assertEqual(
+            bar.format_line(3072),
+            "Copy : [=======---]  75% 3.0 KiB/4.0 KiB, 1.5 KiB/s, ETA 00:00:00"
+        )
+        #  and isn't sampled again within rateInterval
+        clock.monotonic.return_value = 2.2
+        self.assertIn(", 1.5 KiB/s, ", bar.format_line(3584))
+
+        #  Finished bar shows average rate of the whole task
+        bar.finished = True
+        clock.monotonic.return_value = 8.0
+        self.assertEqual(
+            bar.format_line(4096),
+            "Copy : [==========] 100% 4.0 KiB/4.0 KiB, 512 B/s"
+        )
+
+    def test_units(self):
+        bar = ProgressBar(4, "files", total=10)
+        self.assertEqual(bar.format_line(5), "[==--]  50% 5/10 files")
+        #  Counter above total doesn't overflow the bar
+        self.assertEqual(bar.format_line(12)[:12], "[====] 100% ")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+'''
+Checks of progress bars frames, nothing is rendered,
+run with "python -m unittest discover scripts/tests"
+'''
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crossgui.widgets import ProgressManager  # noqa: E402
+
+
+class FormatFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.manager = ProgressManager(size=10, unit="files")
+
+    def test_aggregate_total(self):
+        first = self.manager.add("A : ", total=10)
+        second = self.manager.add("B : ", total=30)
+        first.update(5)
+        second.update(15)
+
+        lines = self.manager.format_frame()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(" 50% 5/10 files", lines[0])
+        self.assertIn(" 50% 15/30 files", lines[1])
+        self.assertTrue(lines[2].startswith("Total : [====="))
+        self.assertIn(" 50% 20/40 files", lines[2])
+
+    def test_finished(self):
+        first = self.manager.add("A : ", total=10)
+        second = self.manager.add("B : ", total=10)
+        first.update(10)
+        first.finish()
+
+        self.manager.format_frame()
+        self.assertFalse(self.manager.aggregate.finished)
+
+        second.update(10)
+        second.finish()
+        lines = self.manager.format_frame()
+        self.assertTrue(self.manager.aggregate.finished)
+        self.assertIn("[==========] 100% 20/20 files", lines[2])
+        self.assertNotIn("ETA", lines[2])
+
+    def test_mixed_totals(self):
+        #  Aggregate of a bar with unknown total is indeterminate
+        self.manager.add("A : ", total=10).update(4)
+        self.manager.add("B : ").update(3)
+
+        lines = self.manager.format_frame()
+        self.assertIn(" 40% 4/10 files", lines[0])
+        self.assertEqual(self.manager.aggregate.total, 0)
+        self.assertNotIn("%", lines[2])
+        self.assertTrue(lines[2].endswith(" 7 files"))
+
+
+if __name__ == "__main__":
+    unittest.main()